@@ -0,0 +1,77 @@
+"""
+Benchmark `helpers.preprocess.extract_functional_connectivity` against the
+original sequential chain of nilearn `ConnectivityMeasure` objects.
+
+Synthetic ROI time series with a shared correlation structure are generated
+for every subject, and both implementations are timed and compared for
+numerical equivalence.
+
+Usage (from the tutorial directory)::
+
+    python benchmarks/bench_connectivity.py --n-subjects 1000 --n-rois 200 --n-jobs -1
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+from nilearn.connectome import ConnectivityMeasure
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from helpers.preprocess import (  # noqa: E402
+    AVAILABLE_FC_MEASURES,
+    extract_functional_connectivity,
+)
+from synthetic import make_time_series  # noqa: E402
+
+
+def reference(data, measures):
+    """The original sequential implementation of the connectivity extraction."""
+    for i, k in enumerate(reversed(measures), 1):
+        islast = i == len(measures)
+        measure = ConnectivityMeasure(
+            kind=AVAILABLE_FC_MEASURES[k], vectorize=islast, discard_diagonal=islast
+        )
+        data = measure.fit_transform(data)
+    return data
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--n-subjects", type=int, default=1000)
+    parser.add_argument("--n-rois", type=int, default=100)
+    parser.add_argument("--measures", nargs="+", default=["tangent", "pearson"])
+    parser.add_argument("--n-jobs", type=int, default=-1)
+    args = parser.parse_args()
+
+    data = make_time_series(args.n_subjects, args.n_rois)
+
+    start = time.perf_counter()
+    expected = reference(data, args.measures)
+    baseline = time.perf_counter() - start
+
+    header = f"{'variant':<24}{'time (s)':>10}{'speedup':>10}{'max abs diff':>16}"
+    print(
+        f"measures={'-'.join(args.measures)} subjects={args.n_subjects} rois={args.n_rois}"
+    )
+    print(header)
+    print("-" * len(header))
+    print(f"{'reference':<24}{baseline:>10.3f}{1:>10.2f}{0:>16.2e}")
+
+    for name, kwargs in (
+        ("n_jobs=1", {"n_jobs": 1}),
+        (f"n_jobs={args.n_jobs}", {"n_jobs": args.n_jobs}),
+        (f"n_jobs={args.n_jobs} float32", {"n_jobs": args.n_jobs, "dtype": np.float32}),
+    ):
+        start = time.perf_counter()
+        features = extract_functional_connectivity(data, args.measures, **kwargs)
+        elapsed = time.perf_counter() - start
+        diff = np.abs(features - expected).max()
+        print(f"{name:<24}{elapsed:>10.3f}{baseline / elapsed:>10.2f}{diff:>16.2e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+"""
+Compare the memory, time, and accuracy of the FC features in each `DATASET.DTYPE`.
+
+For every config, the features are loaded in float64, float32, and float16,
+and the model variants of the tutorial are fitted with the same folds and
+candidates. The report lists the size of the features, the loading and
+fitting times, and the cross-validated score of the best candidate, and
+flags any drift of the per-candidate scores from float64 beyond a tolerance,
+in which case the script exits with a non-zero status.
+
+Usage (from the tutorial directory)::
+
+    python benchmarks/bench_dtype.py --cfg configs/skf/base.yml configs/lpgo/base.yml
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+from kale.pipeline.multi_domain_adapter import AutoMIDAClassificationTrainer as Trainer
+from sklearn.model_selection import LeavePGroupsOut, RepeatedStratifiedKFold
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import get_cfg_defaults  # noqa: E402
+from helpers.data import load_data  # noqa: E402
+from helpers.parsing import parse_param_grid  # noqa: E402
+from helpers.preprocess import preprocess_phenotypic_data  # noqa: E402
+
+DTYPES = ["float64", "float32", "float16"]
+
+
+def fit_variants(cfg, fc, labels, sites, phenotypes, models):
+    """Fit the model variants of the tutorial and return their `cv_results_`."""
+    cv = RepeatedStratifiedKFold(
+        n_splits=cfg.CROSS_VALIDATION.NUM_FOLDS,
+        n_repeats=cfg.CROSS_VALIDATION.NUM_REPEATS,
+        random_state=cfg.RANDOM_STATE,
+    )
+    if cfg.CROSS_VALIDATION.SPLIT == "lpgo":
+        cv = LeavePGroupsOut(cfg.CROSS_VALIDATION.NUM_FOLDS)
+
+    excluded = {
+        "PARAM_GRID",
+        "HALVING",
+        "OUT_OF_CORE",
+        "FEATURE_SELECTION",
+        "SHARED_POOL",
+    }
+    trainer_cfg = {k.lower(): v for k, v in cfg.TRAINER.items() if k not in excluded}
+    trainer_cfg = {**trainer_cfg, "cv": cv, "random_state": cfg.RANDOM_STATE}
+
+    variants = {
+        "baseline": (
+            {
+                "use_mida": False,
+                "param_grid": parse_param_grid(
+                    cfg.TRAINER.PARAM_GRID, "domain_adapter"
+                ),
+            },
+            {},
+        ),
+        "site_only": ({"use_mida": True}, {"group_labels": sites}),
+        "all_phenotypes": ({"use_mida": True}, {"group_labels": phenotypes}),
+    }
+
+    results = {}
+    for model in models:
+        init_args, fit_args = variants[model]
+        trainer = Trainer(**init_args, **trainer_cfg)
+        start = time.perf_counter()
+        trainer.fit(fc, labels, groups=sites, **fit_args)
+        results[model] = (trainer.cv_results_, time.perf_counter() - start)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument(
+        "--cfg", nargs="+", default=["configs/skf/base.yml", "configs/lpgo/base.yml"]
+    )
+    parser.add_argument(
+        "--models",
+        nargs="+",
+        default=["baseline", "site_only", "all_phenotypes"],
+    )
+    parser.add_argument("--tolerance", type=float, default=0.01)
+    args = parser.parse_args()
+
+    header = (
+        f"{'config':<22}{'model':<16}{'dtype':<9}{'size (MB)':>10}{'load (s)':>10}"
+        f"{'fit (s)':>10}{'best':>9}{'drift':>9}"
+    )
+    print(header)
+    print("-" * len(header))
+
+    flagged = []
+    for cfg_path in args.cfg:
+        cfg = get_cfg_defaults()
+        cfg.merge_from_file(cfg_path)
+        refit = cfg.TRAINER.REFIT
+
+        reference = {}
+        for dtype in DTYPES:
+            start = time.perf_counter()
+            fc, phenotypes, _, _ = load_data(
+                cfg.DATASET.DATA_DIR,
+                cfg.DATASET.ATLAS,
+                cfg.DATASET.FC,
+                top_k_sites=cfg.DATASET.TOP_K_SITES,
+                dtype=dtype,
+                verbose=False,
+            )
+            load_time = time.perf_counter() - start
+            labels, sites, phenotypes = preprocess_phenotypic_data(
+                phenotypes, cfg.PHENOTYPE.STANDARDIZE
+            )
+
+            results = fit_variants(cfg, fc, labels, sites, phenotypes, args.models)
+            for model, (cv_results, fit_time) in results.items():
+                scores = np.asarray(cv_results[f"mean_test_{refit}"])
+                best = scores[np.argmin(cv_results[f"rank_test_{refit}"])]
+
+                # Same folds and candidates, so the scores compare one to one
+                reference.setdefault(model, scores)
+                drift = np.abs(scores - reference[model]).max()
+                status = ""
+                if drift > args.tolerance:
+                    status = "  DRIFT"
+                    flagged.append((cfg_path, model, dtype, drift))
+
+                print(
+                    f"{cfg_path:<22}{model:<16}{dtype:<9}{fc.nbytes / 1e6:>10.1f}"
+                    f"{load_time:>10.2f}{fit_time:>10.2f}{best:>9.4f}{drift:>9.4f}{status}"
+                )
+
+    if flagged:
+        print(f"\nCV {refit} drift beyond the tolerance of {args.tolerance}:")
+        for cfg_path, model, dtype, drift in flagged:
+            print(f"  {cfg_path} {model} {dtype}: {drift:.4f}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+"""
+Resume an interrupted sweep of the brain model variants from the fold cache.
+
+The three model variants of the tutorial are fitted with `run_variants` on
+shared folds, first without a cache as a reference. With a `FoldCache`, an
+interrupted sweep is then mimicked by a run over the first half of the folds
+only, followed by the full run, which should load the finished (variant,
+candidate, fold) tasks instead of fitting them again. The wall time and the
+number of fitted and cached tasks of every run are shown, with the largest
+score difference from the reference. With `--synthetic`, the variants are
+fitted offline on synthetic ABIDE-shaped data instead. The script exits with
+a non-zero status if the full run fits a finished task again, or if its
+scores differ from the reference.
+
+Usage (from the tutorial directory)::
+
+    python benchmarks/bench_fold_cache.py --cfg configs/skf/base.yml
+    python benchmarks/bench_fold_cache.py --cfg configs/skf/base.yml --synthetic 300
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+from kale.pipeline.multi_domain_adapter import AutoMIDAClassificationTrainer as Trainer
+from sklearn.model_selection import LeavePGroupsOut, RepeatedStratifiedKFold
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import get_cfg_defaults  # noqa: E402
+from helpers.data import load_data  # noqa: E402
+from helpers.parsing import parse_param_grid  # noqa: E402
+from helpers.preprocess import preprocess_phenotypic_data  # noqa: E402
+from helpers.runner import run_variants  # noqa: E402
+from helpers.sweep import FoldCache  # noqa: E402
+from synthetic import make_dataset  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--cfg", default="configs/skf/base.yml")
+    parser.add_argument(
+        "--synthetic",
+        type=int,
+        default=None,
+        help="Number of synthetic subjects used instead of the ABIDE data",
+    )
+    args = parser.parse_args()
+
+    cfg = get_cfg_defaults()
+    cfg.merge_from_file(args.cfg)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        data_dir = cfg.DATASET.DATA_DIR
+        if args.synthetic is not None:
+            data_dir = tmp_dir
+            make_dataset(data_dir, cfg.DATASET.ATLAS, args.synthetic)
+        fc, phenotypes, _, _ = load_data(
+            data_dir,
+            cfg.DATASET.ATLAS,
+            cfg.DATASET.FC,
+            top_k_sites=cfg.DATASET.TOP_K_SITES,
+            verbose=False,
+        )
+    labels, sites, phenotypes = preprocess_phenotypic_data(
+        phenotypes, cfg.PHENOTYPE.STANDARDIZE
+    )
+
+    cv = RepeatedStratifiedKFold(
+        n_splits=cfg.CROSS_VALIDATION.NUM_FOLDS,
+        n_repeats=cfg.CROSS_VALIDATION.NUM_REPEATS,
+        random_state=cfg.RANDOM_STATE,
+    )
+    if cfg.CROSS_VALIDATION.SPLIT == "lpgo":
+        cv = LeavePGroupsOut(cfg.CROSS_VALIDATION.NUM_FOLDS)
+    splits = list(cv.split(fc, labels, sites))
+
+    excluded = {
+        "PARAM_GRID",
+        "HALVING",
+        "OUT_OF_CORE",
+        "FEATURE_SELECTION",
+        "SHARED_POOL",
+    }
+    trainer_cfg = {k.lower(): v for k, v in cfg.TRAINER.items() if k not in excluded}
+    trainer_cfg = {**trainer_cfg, "random_state": cfg.RANDOM_STATE}
+    param_grid = parse_param_grid(cfg.TRAINER.PARAM_GRID, "domain_adapter")
+
+    def make_variants(folds):
+        """The model variants of the tutorial, cross-validated on some folds."""
+        return {
+            "baseline": (
+                Trainer(use_mida=False, param_grid=param_grid, cv=folds, **trainer_cfg),
+                {},
+            ),
+            "site_only": (
+                Trainer(use_mida=True, cv=folds, **trainer_cfg),
+                {"group_labels": sites},
+            ),
+            "all_phenotypes": (
+                Trainer(use_mida=True, cv=folds, **trainer_cfg),
+                {"group_labels": phenotypes},
+            ),
+        }
+
+    header = f"{'run':<20}{'folds':>8}{'time (s)':>10}{'fitted':>8}{'cached':>8}"
+    print(header)
+    print("-" * len(header))
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        fold_cache = FoldCache(cache_dir)
+        results = {}
+        for name, folds, cache in (
+            ("no cache", splits, None),
+            ("interrupted", splits[: len(splits) // 2], fold_cache),
+            ("resumed", splits, fold_cache),
+        ):
+            start = time.perf_counter()
+            _, results[name], timings = run_variants(
+                make_variants(folds),
+                fc,
+                labels,
+                groups=sites,
+                n_jobs=cfg.TRAINER.N_JOBS,
+                fold_cache=cache,
+            )
+            elapsed = time.perf_counter() - start
+            stages = timings["stage"].value_counts()
+            fitted, cached = stages.get("cv", 0), stages.get("cached", 0)
+            print(f"{name:<20}{len(folds):>8}{elapsed:>10.2f}{fitted:>8}{cached:>8}")
+
+    refit = cfg.TRAINER.REFIT
+    key = f"mean_test_{refit}"
+    difference = max(
+        np.abs(results["resumed"][model][key] - results["no cache"][model][key]).max()
+        for model in results["no cache"]
+    )
+    print(f"\nLargest difference of the mean {refit} from no cache: {difference:.2e}")
+
+    # The resumed run must only fit the folds the interrupted run did not reach
+    n_candidates = sum(len(r["params"]) for r in results["no cache"].values())
+    expected = n_candidates * (len(splits) // 2)
+    if cached != expected or difference > 1e-12:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
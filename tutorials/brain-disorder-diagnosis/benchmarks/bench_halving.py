@@ -0,0 +1,148 @@
+"""
+Compare successive halving against the full random search of the brain trainer.
+
+Both strategies fit the three model variants of the tutorial with the same
+candidates budget (`TRAINER.NUM_SEARCH_ITER`) and report the wall time and
+the cross-validated score of the selected candidate. With `--synthetic`,
+the variants are fitted offline on synthetic ABIDE-shaped data instead. The
+out-of-core trainer with `classifier="auto"`, whose candidates differ by
+their loss, is halved last. The script exits with a non-zero status if
+halving stops after its first round, so every variant goes through the
+rounds scoring the survivors.
+
+Usage (from the tutorial directory)::
+
+    python benchmarks/bench_halving.py --cfg configs/skf/base.yml
+    python benchmarks/bench_halving.py --cfg configs/skf/base.yml --synthetic 300
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+from kale.pipeline.multi_domain_adapter import AutoMIDAClassificationTrainer as Trainer
+from sklearn.model_selection import LeavePGroupsOut, RepeatedStratifiedKFold
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import get_cfg_defaults  # noqa: E402
+from helpers.data import load_data  # noqa: E402
+from helpers.incremental import IncrementalTrainer  # noqa: E402
+from helpers.parsing import parse_param_grid  # noqa: E402
+from helpers.preprocess import preprocess_phenotypic_data  # noqa: E402
+from helpers.sweep import successive_halving  # noqa: E402
+from synthetic import make_dataset  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--cfg", default="configs/skf/base.yml")
+    parser.add_argument(
+        "--synthetic",
+        type=int,
+        default=None,
+        help="Number of synthetic subjects used instead of the ABIDE data",
+    )
+    args = parser.parse_args()
+
+    cfg = get_cfg_defaults()
+    cfg.merge_from_file(args.cfg)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        data_dir = cfg.DATASET.DATA_DIR
+        if args.synthetic is not None:
+            data_dir = tmp_dir
+            make_dataset(data_dir, cfg.DATASET.ATLAS, args.synthetic)
+        fc, phenotypes, _, _ = load_data(
+            data_dir,
+            cfg.DATASET.ATLAS,
+            cfg.DATASET.FC,
+            top_k_sites=cfg.DATASET.TOP_K_SITES,
+            verbose=False,
+        )
+    labels, sites, phenotypes = preprocess_phenotypic_data(
+        phenotypes, cfg.PHENOTYPE.STANDARDIZE
+    )
+
+    cv = RepeatedStratifiedKFold(
+        n_splits=cfg.CROSS_VALIDATION.NUM_FOLDS,
+        n_repeats=cfg.CROSS_VALIDATION.NUM_REPEATS,
+        random_state=cfg.RANDOM_STATE,
+    )
+    if cfg.CROSS_VALIDATION.SPLIT == "lpgo":
+        cv = LeavePGroupsOut(cfg.CROSS_VALIDATION.NUM_FOLDS)
+
+    excluded = {
+        "PARAM_GRID",
+        "HALVING",
+        "OUT_OF_CORE",
+        "FEATURE_SELECTION",
+        "SHARED_POOL",
+    }
+    trainer_cfg = {k.lower(): v for k, v in cfg.TRAINER.items() if k not in excluded}
+    trainer_cfg = {**trainer_cfg, "cv": cv, "random_state": cfg.RANDOM_STATE}
+    trainer_cfg["search_strategy"] = "random"
+
+    variants = {
+        "baseline": (
+            {
+                "use_mida": False,
+                "param_grid": parse_param_grid(
+                    cfg.TRAINER.PARAM_GRID, "domain_adapter"
+                ),
+            },
+            {},
+        ),
+        "site_only": ({"use_mida": True}, {"group_labels": sites}),
+        "all_phenotypes": ({"use_mida": True}, {"group_labels": phenotypes}),
+    }
+    halving_cfg = {k.lower(): v for k, v in cfg.TRAINER.HALVING.items()}
+    refit = cfg.TRAINER.REFIT
+
+    header = f"{'model':<16}{'strategy':<10}{'time (s)':>10}{refit:>12}{'std':>10}"
+    print(header)
+    print("-" * len(header))
+    keys = ["search_strategy", "num_search_iter", "scoring", "refit"]
+    keys += ["n_jobs", "verbose", "cv", "random_state"]
+    incremental_cfg = {k: trainer_cfg[k] for k in keys}
+    incremental_cfg["param_grid"] = parse_param_grid(
+        cfg.TRAINER.PARAM_GRID, "domain_adapter"
+    )
+    incremental_cfg["chunk_size"] = cfg.TRAINER.OUT_OF_CORE.CHUNK_SIZE
+    incremental_cfg["num_epochs"] = cfg.TRAINER.OUT_OF_CORE.NUM_EPOCHS
+    variants["out_of_core"] = ({"classifier": "auto"}, {"group_labels": sites})
+
+    single_round = []
+    for model, (init_args, fit_args) in variants.items():
+        for strategy in ("random", "halving"):
+            if model == "out_of_core":
+                trainer = IncrementalTrainer(**init_args, **incremental_cfg)
+            else:
+                trainer = Trainer(**init_args, **trainer_cfg)
+
+            start = time.perf_counter()
+            if strategy == "halving":
+                trainer, results = successive_halving(
+                    trainer, fc, labels, groups=sites, **fit_args, **halving_cfg
+                )
+                if len(trainer.halving_results_) < 2:
+                    single_round.append(model)
+            else:
+                trainer.fit(fc, labels, groups=sites, **fit_args)
+                results = trainer.cv_results_
+            elapsed = time.perf_counter() - start
+
+            best = list(results[f"rank_test_{refit}"]).index(1)
+            mean = results[f"mean_test_{refit}"][best]
+            std = results[f"std_test_{refit}"][best]
+            print(f"{model:<16}{strategy:<10}{elapsed:>10.2f}{mean:>12.4f}{std:>10.4f}")
+
+    if single_round:
+        print(f"\nHalving ran a single round for: {', '.join(single_round)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
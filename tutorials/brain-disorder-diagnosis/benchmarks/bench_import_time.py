@@ -0,0 +1,103 @@
+"""
+Check the import time of the brain helpers against a budget.
+
+Each helper module is imported in a fresh interpreter with `python -X importtime`
+after the dependencies every helper needs (numpy, pandas, joblib and the
+scikit-learn parameter validation) are loaded, so the reported time is the
+cost the helper itself adds on startup. The script exits with a non-zero
+status if a module exceeds the budget or eagerly imports one of the heavy
+libraries that must only be loaded on first use.
+
+Usage (from the tutorial directory)::
+
+    python benchmarks/bench_import_time.py --budget-ms 100 --repeats 5
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+
+TUTORIAL_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+MODULES = [
+    "helpers.cache",
+    "helpers.data",
+    "helpers.download",
+    "helpers.incremental",
+    "helpers.parsing",
+    "helpers.phenotypes",
+    "helpers.preprocess",
+    "helpers.profiling",
+    "helpers.runner",
+    "helpers.selection",
+    "helpers.store",
+    "helpers.sweep",
+    "helpers.visualization",
+]
+
+# Imported by every helper, hence excluded from the measured cost
+BASELINE = "import numpy, pandas, joblib, sklearn.base, sklearn.utils._param_validation"
+
+# Libraries that must only be imported when they are used
+DEFERRED = ("matplotlib", "seaborn", "nilearn", "gdown")
+
+
+def measure(module):
+    """Import a module in a fresh interpreter and parse the `-X importtime` log."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"{BASELINE}; import {module}"],
+        cwd=TUTORIAL_DIR,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+    # The log lists each module once, in the order its import completes
+    lines = result.stderr.splitlines()
+    start = max(i for i, line in enumerate(lines) if line.endswith("| sklearn.base"))
+    imported, elapsed = set(), None
+    for line in lines[start + 1 :]:
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        imported.add(name.strip().split(".")[0])
+        if name.strip() == module:
+            elapsed = int(cumulative) / 1000
+
+    return elapsed, sorted(imported.intersection(DEFERRED))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--budget-ms", type=float, default=100.0)
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    header = f"{'module':<24}{'time (ms)':>12}{'budget':>10}  eager imports"
+    print(header)
+    print("-" * len(header))
+
+    failures = []
+    for module in MODULES:
+        runs = [measure(module) for _ in range(args.repeats)]
+        # The minimum is the least affected by noise from other processes
+        elapsed = min(run[0] for run in runs)
+        eager = runs[0][1]
+
+        ok = elapsed <= args.budget_ms and not eager
+        status = "ok" if ok else "FAIL"
+        print(
+            f"{module:<24}{elapsed:>12.1f}{args.budget_ms:>10.0f}  "
+            f"{', '.join(eager) or '-'}  {status}"
+        )
+        if not ok:
+            failures.append(module)
+
+    if failures:
+        print(f"\nImport budget exceeded by: {', '.join(failures)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""
+Benchmark the eager and memory-mapped paths of `helpers.data.load_data`.
+
+For each atlas, a synthetic ABIDE-shaped dataset is written to a temporary
+directory and `load_data` is called in a fresh process so that the reported
+peak resident set size (RSS) only accounts for the loading itself.
+
+Usage (from the tutorial directory)::
+
+    python benchmarks/bench_load_data.py --n-subjects 1000 --top-k-sites 10
+"""
+
+import argparse
+import os
+import resource
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from synthetic import ATLAS_ROIS, make_dataset  # noqa: E402
+
+
+def _run(data_dir, atlas, top_k_sites, mmap_mode):
+    from helpers.data import load_data
+
+    baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.perf_counter()
+    fc, *_ = load_data(
+        data_dir, atlas, top_k_sites=top_k_sites, mmap_mode=mmap_mode, verbose=False
+    )
+    elapsed = time.perf_counter() - start
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    # ru_maxrss is reported in kilobytes on Linux
+    return elapsed, (peak - baseline) / 1024, fc.nbytes / 1024**2
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--atlases", nargs="+", default=list(ATLAS_ROIS))
+    parser.add_argument("--n-subjects", type=int, default=1000)
+    parser.add_argument("--top-k-sites", type=int, default=None)
+    args = parser.parse_args()
+
+    header = f"{'atlas':<10}{'mode':<8}{'time (s)':>10}{'peak RSS (MB)':>16}{'output (MB)':>14}"
+    print(header)
+    print("-" * len(header))
+
+    for atlas in args.atlases:
+        with tempfile.TemporaryDirectory() as data_dir:
+            make_dataset(data_dir, atlas, args.n_subjects)
+            for mmap_mode in (None, "r"):
+                # A fresh process per run keeps the RSS high-water marks independent
+                with ProcessPoolExecutor(1, mp_context=get_context("spawn")) as pool:
+                    elapsed, rss, size = pool.submit(
+                        _run, data_dir, atlas, args.top_k_sites, mmap_mode
+                    ).result()
+                mode = "eager" if mmap_mode is None else "mmap"
+                print(f"{atlas:<10}{mode:<8}{elapsed:>10.3f}{rss:>16.1f}{size:>14.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,261 @@
+"""
+Time the brain helpers on synthetic ABIDE-shaped data across cohort sizes.
+
+For every scale, a phenotype CSV file with the columns of `SELECTED_PHENOTYPES`,
+a connectivity cube per atlas (with the ROI counts of the supported atlases),
+and ROI time series are generated offline. Then `load_data` (eager and
+memory-mapped), `preprocess_phenotypic_data`, `extract_functional_connectivity`,
+`compile_results` (on as many candidates as subjects), and the plotting
+functions are timed with the run profile of `helpers.profiling`, which also
+records CPU time, peak memory, and array sizes. All the records are written
+to a JSON file with the commit and library versions, and a file from a
+previous commit can be passed to `--compare` to flag slowdowns, in which case
+the script exits with a non-zero status.
+
+The largest scales write several GB per atlas (e.g., about 12 GB for cc400
+with 10k subjects), one atlas at a time, so `--atlases` and `--temp-dir` may
+need to be set accordingly.
+
+Usage (from the tutorial directory)::
+
+    python benchmarks/bench_suite.py --scales 100 1000 10000 --output bench.json
+    python benchmarks/bench_suite.py --scales 100 1000 --compare bench.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+from datetime import datetime, timezone
+
+import matplotlib
+import numpy as np
+import pandas as pd
+import sklearn
+
+matplotlib.use("Agg")
+
+import matplotlib.pyplot as plt  # noqa: E402
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from helpers.data import load_data  # noqa: E402
+from helpers.parsing import compile_results  # noqa: E402
+from helpers.preprocess import (  # noqa: E402
+    extract_functional_connectivity,
+    preprocess_phenotypic_data,
+)
+from helpers.profiling import stage, start_profiling, stop_profiling  # noqa: E402
+from helpers.visualization import (  # noqa: E402
+    plot_connectivity_matrix,
+    plot_phenotypic_distribution,
+)
+from synthetic import (  # noqa: E402
+    ATLAS_ROIS,
+    make_cv_results,
+    make_time_series,
+    write_atlas,
+    write_fc_cube,
+    write_phenotypes,
+)
+
+# Columns identifying the same measurement across runs
+KEYS = ("name", "scale", "atlas")
+
+
+def run_scale(n_subjects, args, profile):
+    """Generate the inputs of one scale and time every step on them."""
+
+    def timed(name, func, *func_args, atlas=None, **kwargs):
+        for repeat in range(args.repeats):
+            start = len(profile.records)
+            with stage(name):
+                result = func(*func_args, **kwargs)
+            # Nested records of the profiled helpers are tagged as well
+            for record in profile.records[start:]:
+                record.update(scale=n_subjects, atlas=atlas, repeat=repeat)
+        return result
+
+    with tempfile.TemporaryDirectory(dir=args.temp_dir) as data_dir:
+        write_phenotypes(data_dir, n_subjects)
+        for atlas in args.atlases:
+            write_atlas(data_dir, atlas)
+            path = write_fc_cube(data_dir, atlas, n_subjects)
+            for name, mmap_mode in (("load_data", None), ("load_data_mmap", "r")):
+                fc, phenotypes, rois, _ = timed(
+                    name,
+                    load_data,
+                    data_dir,
+                    atlas,
+                    mmap_mode=mmap_mode,
+                    verbose=False,
+                    atlas=atlas,
+                )
+            if atlas == args.plot_atlas:
+                plot_fc = np.array(fc[0])
+                plot_rois = rois
+            del fc
+            # Only one cube is on disk at a time
+            os.remove(path)
+
+        timed("preprocess_phenotypic_data", preprocess_phenotypic_data, phenotypes)
+        timed(
+            "preprocess_phenotypic_data_site",
+            preprocess_phenotypic_data,
+            phenotypes,
+            "site",
+        )
+
+    time_series = make_time_series(n_subjects, ATLAS_ROIS[args.ts_atlas])
+    timed(
+        "extract_functional_connectivity",
+        extract_functional_connectivity,
+        time_series,
+        args.measures,
+        n_jobs=args.n_jobs,
+        atlas=args.ts_atlas,
+    )
+    del time_series
+
+    cv_results = make_cv_results(n_subjects)
+    timed("compile_results", compile_results, cv_results, "accuracy")
+
+    values = [
+        ("Site", phenotypes["SITE_ID"], "category"),
+        ("Gender", phenotypes["SEX"], "category"),
+        ("Age", phenotypes["AGE_AT_SCAN"], "double"),
+        ("FIQ", phenotypes["FIQ"], "double"),
+    ]
+    plots = [
+        (
+            "plot_phenotypic_distribution",
+            None,
+            plot_phenotypic_distribution,
+            values,
+            {},
+        ),
+    ]
+    if args.plot_atlas in args.atlases:
+        for renderer in ("heatmap", "imshow"):
+            plots.append(
+                (
+                    f"plot_connectivity_matrix_{renderer}",
+                    args.plot_atlas,
+                    plot_connectivity_matrix,
+                    [plot_fc, plot_rois],
+                    {"renderer": renderer},
+                )
+            )
+
+    for name, atlas, func, func_args, kwargs in plots:
+        # Figures are closed after each call so they do not pile up in memory
+        timed(name, lambda: plt.close(func(*func_args, **kwargs)[0]), atlas=atlas)
+
+
+def summarize(records):
+    """Minimum wall time and peak memory increase of each top-level step."""
+    summary = {}
+    for record in records:
+        if record["depth"] != 0:
+            continue
+        key = tuple(record[k] for k in KEYS)
+        wall_time, rss = summary.get(key, (np.inf, 0.0))
+        summary[key] = (
+            min(wall_time, record["wall_time"]),
+            max(rss, record["peak_rss_increase_mb"] or 0.0),
+        )
+    return summary
+
+
+def metadata():
+    """Commit, versions, and machine of the run."""
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+
+    return {
+        "commit": commit,
+        "date": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "scikit-learn": sklearn.__version__,
+        "matplotlib": matplotlib.__version__,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--scales", nargs="+", type=int, default=[100, 1000, 10000])
+    parser.add_argument("--atlases", nargs="+", default=list(ATLAS_ROIS))
+    parser.add_argument("--ts-atlas", default="cc200")
+    parser.add_argument("--plot-atlas", default="cc200")
+    parser.add_argument("--measures", nargs="+", default=["pearson"])
+    parser.add_argument("--n-jobs", type=int, default=None)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--temp-dir", default=None)
+    parser.add_argument("--output", default="bench_suite.json")
+    parser.add_argument("--compare", default=None)
+    parser.add_argument("--max-slowdown", type=float, default=1.25)
+    parser.add_argument("--min-time", type=float, default=0.05)
+    args = parser.parse_args()
+
+    profile = start_profiling()
+    for n_subjects in args.scales:
+        run_scale(n_subjects, args, profile)
+    stop_profiling()
+
+    run = {"meta": metadata(), "args": vars(args), "records": profile.records}
+    with open(args.output, "w") as f:
+        json.dump(run, f, indent=2)
+
+    summary = summarize(profile.records)
+    reference = {}
+    if args.compare is not None:
+        with open(args.compare, "r") as f:
+            reference = summarize(json.load(f)["records"])
+
+    header = (
+        f"{'step':<36}{'atlas':<10}{'scale':>7}{'time (s)':>10}"
+        f"{'peak RSS +MB':>14}{'vs ref':>9}"
+    )
+    print(header)
+    print("-" * len(header))
+
+    flagged = []
+    for (name, scale, atlas), (wall_time, rss) in summary.items():
+        ratio = ""
+        if (name, scale, atlas) in reference:
+            ref_time = reference[(name, scale, atlas)][0]
+            ratio = wall_time / ref_time
+            # Very short steps are dominated by noise
+            if ratio > args.max_slowdown and ref_time >= args.min_time:
+                flagged.append((name, scale, atlas, ratio))
+            ratio = f"{ratio:.2f}x"
+        print(
+            f"{name:<36}{atlas or '-':<10}{scale:>7}{wall_time:>10.3f}"
+            f"{rss:>14.1f}{ratio:>9}"
+        )
+
+    print(f"\nRecords written to {args.output}")
+    if flagged:
+        print(f"\nSlower than {args.compare} by more than {args.max_slowdown}x:")
+        for name, scale, atlas, ratio in flagged:
+            print(f"  {name} ({atlas or '-'}, {scale} subjects): {ratio:.2f}x")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+"""
+Synthetic ABIDE-shaped inputs shared by the benchmarks.
+
+The generated files follow the layout `load_data` expects under `data_dir`,
+so the benchmarks run offline without downloading anything.
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+
+# Approximate number of ROIs for each of the supported atlases
+ATLAS_ROIS = {
+    "aal": 116,
+    "cc200": 200,
+    "cc400": 392,
+    "difumo64": 64,
+    "dos160": 161,
+    "hcp-ica": 100,
+    "ho": 111,
+    "tt": 97,
+}
+
+MODELS = ["baseline", "site_only", "all_phenotypes"]
+
+
+def make_phenotypes(n_subjects, n_sites=20, seed=0):
+    """Generate raw phenotypes with the columns and codes of the ABIDE CSV file.
+
+    Sites have uneven sizes, and FIQ and handedness include the missing value
+    codes handled by `preprocess_phenotypic_data`.
+    """
+    rng = np.random.default_rng(seed)
+    site_weights = rng.dirichlet(np.ones(n_sites))
+    sites = rng.choice(
+        [f"SITE_{i}" for i in range(n_sites)], n_subjects, p=site_weights
+    )
+
+    fiq = rng.normal(105, 15, n_subjects).round()
+    fiq[rng.random(n_subjects) < 0.05] = -9999
+    fiq[rng.random(n_subjects) < 0.02] = np.nan
+
+    handedness = ["R", "L", "Mixed", "Ambi", "L->R", "R->L", "-9999", None]
+    handedness = rng.choice(
+        np.array(handedness, dtype=object),
+        n_subjects,
+        p=[0.7, 0.1, 0.04, 0.04, 0.02, 0.02, 0.03, 0.05],
+    )
+
+    return pd.DataFrame(
+        {
+            "SUB_ID": 50000 + np.arange(n_subjects),
+            "SITE_ID": sites,
+            "SEX": rng.choice([1, 2], n_subjects, p=[0.85, 0.15]),
+            "AGE_AT_SCAN": rng.uniform(6, 60, n_subjects).round(2),
+            "FIQ": fiq,
+            "HANDEDNESS_CATEGORY": handedness,
+            "EYE_STATUS_AT_SCAN": rng.choice([1, 2], n_subjects, p=[0.7, 0.3]),
+            "DX_GROUP": rng.choice([1, 2], n_subjects),
+        }
+    )
+
+
+def write_phenotypes(data_dir, n_subjects, n_sites=20, seed=0):
+    """Write the phenotype CSV file of `make_phenotypes`."""
+    abide_dir = os.path.join(data_dir, "abide")
+    os.makedirs(abide_dir, exist_ok=True)
+    phenotypes = make_phenotypes(n_subjects, n_sites, seed)
+    phenotypes.to_csv(os.path.join(abide_dir, "phenotypes.csv"), index=False)
+
+
+def write_atlas(data_dir, atlas, seed=0):
+    """Write the ROI labels and coordinates of an atlas."""
+    rng = np.random.default_rng(seed)
+    n_rois = ATLAS_ROIS[atlas]
+
+    atlas_type = "probabilistic" if atlas in {"difumo64"} else "deterministic"
+    atlas_dir = os.path.join(data_dir, "atlas", atlas_type, atlas)
+    os.makedirs(atlas_dir, exist_ok=True)
+    with open(os.path.join(atlas_dir, "labels.txt"), "w") as f:
+        f.write("\n".join(f"ROI_{i}" for i in range(n_rois)))
+    np.save(os.path.join(atlas_dir, "coords.npy"), rng.standard_normal((n_rois, 3)))
+
+
+def write_fc_cube(data_dir, atlas, n_subjects, fc="tangent-pearson", seed=0):
+    """Write a cube of symmetric connectivity matrices, in chunks of subjects.
+
+    Returns
+    -------
+    path : str
+        Path of the written `.npy` file.
+    """
+    rng = np.random.default_rng(seed)
+    n_rois = ATLAS_ROIS[atlas]
+
+    fc_dir = os.path.join(data_dir, "abide", "fc", atlas)
+    os.makedirs(fc_dir, exist_ok=True)
+    path = os.path.join(fc_dir, f"{fc}.npy")
+    cube = np.lib.format.open_memmap(
+        path, mode="w+", dtype=np.float64, shape=(n_subjects, n_rois, n_rois)
+    )
+    chunk_size = max(1, 2**24 // n_rois**2)
+    for start in range(0, n_subjects, chunk_size):
+        x = rng.standard_normal((min(chunk_size, n_subjects - start), n_rois, n_rois))
+        cube[start : start + len(x)] = (x + x.transpose(0, 2, 1)) / 2
+    cube.flush()
+    del cube
+    return path
+
+
+def make_dataset(data_dir, atlas, n_subjects, n_sites=20, seed=0):
+    """Write the phenotypes, and the connectivity cube and files of one or more atlases."""
+    atlases = [atlas] if isinstance(atlas, str) else atlas
+    write_phenotypes(data_dir, n_subjects, n_sites, seed)
+    for name in atlases:
+        write_atlas(data_dir, name, seed)
+        write_fc_cube(data_dir, name, n_subjects, seed=seed)
+
+
+def make_time_series(n_subjects, n_rois, n_timepoints=(100, 200), seed=0):
+    """Generate ROI time series of varying length with a shared correlation structure."""
+    rng = np.random.default_rng(seed)
+    mixing = rng.standard_normal((n_rois, n_rois)) / np.sqrt(n_rois)
+    lengths = rng.integers(*n_timepoints, size=n_subjects)
+    return [
+        rng.standard_normal((t, n_rois))
+        @ (mixing + 0.1 * rng.standard_normal(mixing.shape))
+        for t in lengths
+    ]
+
+
+def make_cv_results(n_candidates, n_splits=10, scoring=("accuracy", "roc_auc"), seed=0):
+    """Generate `cv_results_` of the model variants, as passed to `compile_results`."""
+    rng = np.random.default_rng(seed)
+    cv_results = {}
+    for model in MODELS:
+        results = {"params": [{"C": c} for c in np.logspace(-3, 3, n_candidates)]}
+        for name in scoring:
+            scores = rng.uniform(0.5, 0.8, (n_candidates, n_splits))
+            for j in range(n_splits):
+                results[f"split{j}_test_{name}"] = scores[:, j]
+            mean = scores.mean(axis=1)
+            results[f"mean_test_{name}"] = mean
+            results[f"std_test_{name}"] = scores.std(axis=1)
+            results[f"rank_test_{name}"] = np.argsort(np.argsort(-mean)) + 1
+        cv_results[model] = pd.DataFrame(results)
+    return cv_results
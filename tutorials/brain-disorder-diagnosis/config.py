@@ -29,6 +29,15 @@ _C.DATASET.ATLAS = "cc200"
 _C.DATASET.FC = "tangent-pearson"
 # Number of top sites to load for the runtime.
 _C.DATASET.TOP_K_SITES = None
+# Floating-point precision of the FC features
+# Available options:
+# - "float64" (precision of the stored FC files)
+# - "float32"
+# - "float16" (storage only, estimators compute in float32/float64)
+_C.DATASET.DTYPE = "float64"
+# Read the phenotypes from a parquet store under DATA_DIR/cache/phenotypes
+# with a precomputed site index (requires pyarrow)
+_C.DATASET.PHENOTYPE_STORE = False
 
 # Phenotype configuration
 _C.PHENOTYPE = CfgNode()
@@ -47,6 +56,13 @@ _C.CROSS_VALIDATION.SPLIT = "skf"
 _C.CROSS_VALIDATION.NUM_FOLDS = 10
 # Number of repeats for cross-validation
 _C.CROSS_VALIDATION.NUM_REPEATS = 5
+# Directory of the on-disk fold cache shared by the model variants and reruns
+# (None: folds are drawn by each trainer). Cached folds are keyed by the data
+# and the split configuration, so with RANDOM_STATE = None they are drawn once.
+# The scores of every (candidate, fold) are cached too, so a rerun of an
+# interrupted search only fits the pending ones (except with CLASSIFIER "auto"
+# or TRAINER.OUT_OF_CORE).
+_C.CROSS_VALIDATION.FOLD_CACHE_DIR = None
 
 # Trainer configuration
 _C.TRAINER = CfgNode()
@@ -67,11 +83,53 @@ _C.TRAINER.PARAM_GRID = None
 # Use non-linear transformations (no interpretability)
 _C.TRAINER.NONLINEAR = False
 # Search strategy for hyperparameter tuning
+# Available options:
+# - "random" (all candidates on all folds)
+# - "halving" (successive halving over random candidates)
 _C.TRAINER.SEARCH_STRATEGY = "random"
 # Number of iterations for hyperparameter search
+# or number of candidates in the first halving round
 _C.TRAINER.NUM_SEARCH_ITER = int(1e3)
+# Successive halving configuration (only used if SEARCH_STRATEGY = "halving")
+_C.TRAINER.HALVING = CfgNode()
+# Proportion of candidates kept, and budget growth, at each round
+_C.TRAINER.HALVING.FACTOR = 3
+# Budget growing over the rounds
+# Available options:
+# - "folds" (number of cross-validation folds)
+# - "subjects" (fraction of training subjects in each fold)
+_C.TRAINER.HALVING.RESOURCE = "folds"
+# Budget of the first round (None: chosen so that the last round uses the full budget)
+_C.TRAINER.HALVING.MIN_RESOURCES = None
 # Number of iterations for solver
 _C.TRAINER.NUM_SOLVER_ITER = int(1e6)
+# Fold-safe screening of the FC edges before the hyperparameter search
+# (not supported with HALVING unless OUT_OF_CORE is enabled)
+_C.TRAINER.FEATURE_SELECTION = CfgNode()
+# Statistic used to rank the edges
+# Available options:
+# - None (no screening)
+# - "f_classif" (ANOVA F-statistic between the classes)
+# - "variance"
+_C.TRAINER.FEATURE_SELECTION.METHOD = None
+# Number of edges kept
+_C.TRAINER.FEATURE_SELECTION.NUM_FEATURES = 1000
+# Out-of-core training streaming the features in chunks through SGD linear
+# models (only for CLASSIFIER "lr", "linear_svm", "ridge", or "auto")
+_C.TRAINER.OUT_OF_CORE = CfgNode()
+# Whether to train out of core instead of fitting on the full feature matrix
+_C.TRAINER.OUT_OF_CORE.ENABLED = False
+# Number of subjects read at a time
+_C.TRAINER.OUT_OF_CORE.CHUNK_SIZE = 256
+# Number of passes over the training subjects
+_C.TRAINER.OUT_OF_CORE.NUM_EPOCHS = 5
+# Fit the (variant, candidate, fold) tasks of all the models on one shared
+# process pool of N_JOBS workers (not supported with OUT_OF_CORE or HALVING)
+_C.TRAINER.SHARED_POOL = CfgNode()
+# Whether to schedule the models together instead of one after another
+_C.TRAINER.SHARED_POOL.ENABLED = False
+# Maximum number of BLAS threads in each worker
+_C.TRAINER.SHARED_POOL.INNER_MAX_NUM_THREADS = 1
 # List of scoring metrics
 # Available options:
 # - "accuracy"
@@ -90,6 +148,13 @@ _C.TRAINER.PRE_DISPATCH = "2*n_jobs"
 # Verbosity level
 _C.TRAINER.VERBOSE = 0
 
+# Run profile of the helper calls (wall and CPU time, peak memory, array sizes)
+_C.PROFILE = CfgNode()
+# Whether to record the run profile
+_C.PROFILE.ENABLED = False
+# Output path of the run profile, written as CSV if it ends with ".csv"
+_C.PROFILE.OUTPUT = "results/profile.json"
+
 # Random state for reproducibility
 # Seed for random number generators
 _C.RANDOM_STATE = None
@@ -0,0 +1,203 @@
+import hashlib
+import json
+import os
+import tempfile
+
+import numpy as np
+
+__all__ = ["file_digest", "feature_cache_key", "load_features", "save_features"]
+
+DIGEST_INDEX = "digests.json"
+
+
+def file_digest(path, cache_dir=None, block_size=1 << 20):
+    """
+    Compute the SHA-256 digest of a file's content.
+
+    Hashing large connectivity files is expensive, so digests are memoized in
+    `cache_dir` (if given) and reused as long as the file size and
+    modification time are unchanged.
+
+    Parameters
+    ----------
+    path : str
+        Path to the file to hash.
+
+    cache_dir : str or None, optional (default=None)
+        Directory storing the memoized digests. If None, the digest is always
+        recomputed.
+
+    block_size : int, optional (default=1 MiB)
+        Number of bytes read at a time.
+
+    Returns
+    -------
+    digest : str
+        Hexadecimal SHA-256 digest of the file content.
+    """
+    stat = os.stat(path)
+    stamp = [stat.st_size, stat.st_mtime_ns]
+    abspath = os.path.abspath(path)
+
+    index = {}
+    if cache_dir is not None:
+        index = _read_json(os.path.join(cache_dir, DIGEST_INDEX), default={})
+        entry = index.get(abspath)
+        if entry is not None and entry["stamp"] == stamp:
+            return entry["digest"]
+
+    sha = hashlib.sha256()
+    with open(path, "rb") as f:
+        while block := f.read(block_size):
+            sha.update(block)
+    digest = sha.hexdigest()
+
+    if cache_dir is not None:
+        index[abspath] = {"stamp": stamp, "digest": digest}
+        _write_json(os.path.join(cache_dir, DIGEST_INDEX), index)
+
+    return digest
+
+
+def feature_cache_key(*paths, cache_dir=None, **params):
+    """
+    Build a content-addressed cache key from source files and loader arguments.
+
+    Parameters
+    ----------
+    *paths : str
+        Source files whose content determines the cached features.
+
+    cache_dir : str or None, optional (default=None)
+        Directory used to memoize the file digests.
+
+    **params : dict
+        JSON-serializable loader arguments affecting the cached features.
+
+    Returns
+    -------
+    key : str
+        Hexadecimal key identifying the cache entry.
+    """
+    payload = {
+        "files": [file_digest(path, cache_dir) for path in paths],
+        "params": params,
+    }
+    payload = json.dumps(payload, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def load_features(cache_dir, key, mmap_mode="r"):
+    """
+    Load cached features and their aligned row index.
+
+    Parameters
+    ----------
+    cache_dir : str
+        Directory storing the cache entries.
+
+    key : str
+        Cache key returned by `feature_cache_key`.
+
+    mmap_mode : {None, "r", "r+", "c"}, optional (default="r")
+        Memory-map mode used to open the cached features.
+
+    Returns
+    -------
+    cached : tuple of (np.ndarray, np.ndarray) or None
+        The cached features and the positional index of the rows they were
+        gathered from, or None on a cache miss.
+    """
+    features_path = os.path.join(cache_dir, f"{key}.npy")
+    index_path = os.path.join(cache_dir, f"{key}.index.npy")
+    if not (os.path.exists(features_path) and os.path.exists(index_path)):
+        return None
+
+    # Refresh the access time to keep recently used entries on eviction
+    os.utime(features_path)
+    return np.load(features_path, mmap_mode=mmap_mode), np.load(index_path)
+
+
+def save_features(cache_dir, key, features, index, max_bytes=None):
+    """
+    Atomically store features and their aligned row index in the cache.
+
+    Parameters
+    ----------
+    cache_dir : str
+        Directory storing the cache entries.
+
+    key : str
+        Cache key returned by `feature_cache_key`.
+
+    features : np.ndarray
+        Features to store.
+
+    index : np.ndarray
+        Positional index of the rows the features were gathered from.
+
+    max_bytes : int or None, optional (default=None)
+        Size budget of the cache. The least recently used entries are evicted
+        once the budget is exceeded. If None, nothing is evicted.
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+    _atomic_save(os.path.join(cache_dir, f"{key}.index.npy"), index)
+    _atomic_save(os.path.join(cache_dir, f"{key}.npy"), features)
+
+    if max_bytes is not None:
+        _evict(cache_dir, max_bytes, keep=key)
+
+
+def _evict(cache_dir, max_bytes, keep=None):
+    """Remove the least recently used entries until the cache fits the budget."""
+    entries = []
+    for name in os.listdir(cache_dir):
+        if not name.endswith(".npy") or name.endswith(".index.npy"):
+            continue
+        key = name[: -len(".npy")]
+        paths = [
+            os.path.join(cache_dir, f"{key}{ext}") for ext in (".npy", ".index.npy")
+        ]
+        size = sum(os.path.getsize(p) for p in paths if os.path.exists(p))
+        entries.append((os.path.getmtime(paths[0]), key, size, paths))
+
+    total = sum(size for _, _, size, _ in entries)
+    for _, key, size, paths in sorted(entries):
+        if total <= max_bytes:
+            break
+        if key == keep:
+            continue
+        for path in paths:
+            if os.path.exists(path):
+                os.remove(path)
+        total -= size
+
+
+def _atomic_save(path, array):
+    """Save an array to a temporary file and move it into place."""
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            np.save(f, array)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+
+def _read_json(path, default=None):
+    if not os.path.exists(path):
+        return default
+    try:
+        with open(path, "r") as f:
+            return json.load(f)
+    except json.JSONDecodeError:
+        return default
+
+
+def _write_json(path, obj):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    with os.fdopen(fd, "w") as f:
+        json.dump(obj, f)
+    os.replace(tmp_path, path)
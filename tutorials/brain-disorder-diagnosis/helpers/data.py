@@ -1,8 +1,11 @@
 import os
-import json
 import numpy as np
 import pandas as pd
-import gdown
+
+from .cache import feature_cache_key, load_features, save_features
+from .download import fetch
+from .phenotypes import open_phenotype_store
+from .profiling import profiled
 
 from sklearn.utils._param_validation import (
     StrOptions,
@@ -12,6 +15,7 @@ from sklearn.utils._param_validation import (
 )
 
 
+@profiled
 @validate_params(
     {
         "data_dir": [str],
@@ -34,6 +38,12 @@ from sklearn.utils._param_validation import (
         ],
         "vectorize": ["boolean"],
         "top_k_sites": [None, Interval(Integral, 1, None, closed="left")],
+        "mmap_mode": [None, StrOptions({"r", "r+", "c"})],
+        "chunk_size": [Interval(Integral, 1, None, closed="left")],
+        "cache": ["boolean"],
+        "cache_size": [None, Interval(Integral, 0, None, closed="left")],
+        "phenotype_store": ["boolean"],
+        "dtype": [None, StrOptions({"float64", "float32", "float16"})],
         "verbose": ["boolean"],
     },
     prefer_skip_nested_validation=False,
@@ -44,6 +54,12 @@ def load_data(
     fc="tangent-pearson",
     vectorize=True,
     top_k_sites=None,
+    mmap_mode=None,
+    chunk_size=64,
+    cache=False,
+    cache_size=2 * 1024**3,
+    phenotype_store=False,
+    dtype=None,
     verbose=True,
 ):
     """
@@ -70,6 +86,41 @@ def load_data(
         If specified, only the top K sites with the most subjects will be used.
         If None, all sites will be used.
 
+    mmap_mode : {None, "r", "r+", "c"}, optional (default=None)
+        If not None, open the connectivity file as a memory map with the given
+        mode (see `numpy.load`). Only the subjects kept by `top_k_sites` are
+        read, in chunks of `chunk_size` subjects, and vectorized into a single
+        preallocated array. Without vectorization and site filtering, the
+        memory map itself is returned.
+
+    chunk_size : int, optional (default=64)
+        Number of subjects read from the memory map at a time when `mmap_mode`
+        is set. Larger values are faster but use more memory.
+
+    cache : bool, optional (default=False)
+        Whether to cache the vectorized, site-filtered features in `dtype`
+        (float32 if None) under `{data_dir}/cache/features`. Entries are keyed by the content of
+        the source files and the loader arguments, so a warm call only opens
+        the cached features as a memory map. Only used if `vectorize=True`.
+
+    cache_size : int or None, optional (default=2 GiB)
+        Size budget of the feature cache in bytes. The least recently used
+        entries are evicted once it is exceeded. If None, nothing is evicted.
+
+    phenotype_store : bool, optional (default=False)
+        Whether to read the phenotypes from a parquet store with categorical
+        dtypes, and to select the top K sites from its precomputed site index.
+        The store is written under `{data_dir}/cache/phenotypes`, built from
+        `abide/phenotypes.csv` on first use and whenever the CSV changes, and
+        requires `pyarrow`, which is not in the tutorial requirements. Falls
+        back to parsing the CSV file if `pyarrow` is not installed.
+
+    dtype : {None, "float64", "float32", "float16"}, optional (default=None)
+        Floating-point precision of the returned features. The subjects are
+        converted while they are gathered, so the full-precision features are
+        never held in memory with `mmap_mode`. If None, the precision of the
+        connectivity file is kept (float32 for cached features).
+
     verbose : bool, optional (default=True)
         Whether to print download and progress messages.
 
@@ -93,31 +144,59 @@ def load_data(
         If the required file paths are not found after attempted download.
     """
     # Paths
-    fc_path = os.path.join(data_dir, "abide", "fc", atlas, f"{fc}.npy")
-    is_proba = atlas in {"difumo64"}
-    atlas_type = "probabilistic" if is_proba else "deterministic"
-    atlas_path = os.path.join(data_dir, "atlas", atlas_type, atlas)
-    phenotypes_path = os.path.join(data_dir, "abide", "phenotypes.csv")
+    fc_path, phenotypes_path, atlas_path = _data_paths(data_dir, atlas, fc)
 
     # Ensure all files exist (download if needed)
-    _ensure_abide_file(data_dir, fc_path, verbose)
-    _ensure_abide_file(data_dir, phenotypes_path, verbose)
-    _ensure_atlas_folder(data_dir, atlas_path, verbose)
-
-    # Load connectivity data
-    fc_data = np.load(fc_path)
-    if vectorize:
-        row, col = np.triu_indices(fc_data.shape[1], 1)
-        fc_data = fc_data[..., row, col]
+    fetch(
+        data_dir,
+        files=[fc_path, phenotypes_path],
+        folders=[atlas_path],
+        verbose=verbose,
+    )
 
-    phenotypes = pd.read_csv(phenotypes_path)
+    store = None
+    if phenotype_store:
+        try:
+            store = open_phenotype_store(
+                phenotypes_path, os.path.join(data_dir, "cache", "phenotypes")
+            )
+        except ImportError:
+            pass
+    phenotypes = pd.read_csv(phenotypes_path) if store is None else store.phenotypes
 
     with open(os.path.join(atlas_path, "labels.txt"), "r") as f:
         rois = np.array(f.read().strip().split("\n"))
     coords = np.load(os.path.join(atlas_path, "coords.npy"))
 
-    sites = phenotypes["SITE_ID"].value_counts()
-    if top_k_sites is not None:
+    use_cache = cache and vectorize
+    if use_cache:
+        cache_dtype = dtype or "float32"
+        cache_dir = os.path.join(data_dir, "cache", "features")
+        key = feature_cache_key(
+            fc_path,
+            phenotypes_path,
+            cache_dir=cache_dir,
+            atlas=atlas,
+            fc=fc,
+            top_k_sites=top_k_sites,
+            dtype=cache_dtype,
+        )
+        cached = load_features(cache_dir, key)
+        if cached is not None:
+            fc_data, indices = cached
+            phenotypes = (
+                phenotypes.iloc[indices] if store is None else store.take(indices)
+            )
+            return fc_data, phenotypes, rois, coords
+
+    # Select the subjects before touching the connectivity data
+    # so that only the kept subjects are ever read from disk
+    indices = None
+    if top_k_sites is not None and store is not None:
+        indices = store.top_k_rows(top_k_sites)
+        phenotypes = store.take(indices)
+    elif top_k_sites is not None:
+        sites = phenotypes["SITE_ID"].value_counts()
         if top_k_sites > len(sites):
             raise ValueError(
                 f"top_k_sites ({top_k_sites}) cannot be greater than the number of sites ({len(sites)})"
@@ -125,62 +204,113 @@ def load_data(
         top_sites = sites.nlargest(top_k_sites).index
         mask = phenotypes["SITE_ID"].isin(top_sites)
         phenotypes = phenotypes[mask]
-        fc_data = fc_data[mask]
+        indices = np.flatnonzero(mask.to_numpy())
+
+    # Load connectivity data
+    fc_data = np.load(fc_path, mmap_mode=mmap_mode)
+    if mmap_mode is not None:
+        fc_data = _gather_subjects(fc_data, indices, vectorize, chunk_size, dtype)
+    else:
+        if indices is not None:
+            fc_data = fc_data[indices]
+        if vectorize:
+            row, col = np.triu_indices(fc_data.shape[1], 1)
+            fc_data = fc_data[..., row, col]
+        if dtype is not None:
+            fc_data = fc_data.astype(dtype, copy=False)
+
+    if use_cache:
+        if indices is None:
+            indices = np.arange(len(fc_data))
+        fc_data = fc_data.astype(cache_dtype, copy=False)
+        save_features(cache_dir, key, fc_data, indices, cache_size)
 
     return fc_data, phenotypes, rois, coords
 
 
-def _ensure_abide_file(data_dir, target_path, verbose):
-    """Ensure abide file exists locally; download from manifest if missing."""
-    if os.path.exists(target_path):
-        if verbose:
-            print(f"✔ File found: {target_path}")
-        return
-
-    manifest_path = os.path.join(os.getcwd(), "manifests", "abide.json")
-    with open(manifest_path, "r") as f:
-        manifest = json.load(f)
-
-    rel_path = os.path.relpath(target_path, data_dir).replace("\\", "/")
-    for file_entry in manifest:
-        if file_entry["path"] == rel_path:
-            if verbose:
-                print(f"⬇ Downloading {rel_path} ...")
-            os.makedirs(os.path.dirname(target_path), exist_ok=True)
-            gdown.download(file_entry["url"], output=target_path, quiet=not verbose)
-            if os.path.exists(target_path):
-                return
-            else:
-                break
-
-    raise FileNotFoundError(f"File not found and not found in manifest: {target_path}")
-
-
-def _ensure_atlas_folder(data_dir, atlas_path, verbose):
-    """Ensure atlas folder exists locally; download using gdown.download_folder if missing."""
-    if os.path.exists(atlas_path):
-        if verbose:
-            print(f"✔ Atlas folder found: {atlas_path}")
-        return
-
-    manifest_path = os.path.join(os.getcwd(), "manifests", "atlas.json")
-    with open(manifest_path, "r") as f:
-        manifest = json.load(f)
-
-    rel_path = os.path.relpath(atlas_path, data_dir).replace("\\", "/")
-    for folder_entry in manifest:
-        if folder_entry["path"] == rel_path:
-            if verbose:
-                print(f"⬇ Downloading atlas folder {rel_path} ...")
-            os.makedirs(os.path.dirname(atlas_path), exist_ok=True)
-            gdown.download_folder(
-                id=folder_entry["id"], output=atlas_path, quiet=not verbose
-            )
-            if os.path.exists(atlas_path):
-                return
-            else:
-                break
+@profiled
+def prefetch_data(
+    data_dir="data",
+    atlas="cc200",
+    fc="tangent-pearson",
+    transport=None,
+    max_workers=4,
+    verbose=True,
+):
+    """
+    Download all files required by one or more atlas and FC combinations at once.
+
+    Parameters
+    ----------
+    data_dir : str, optional (default="data")
+        Local directory to store the dataset.
+
+    atlas : str or list of str, optional (default="cc200")
+        Atlas name(s) to fetch.
+
+    fc : str or list of str, optional (default="tangent-pearson")
+        Functional connectivity file name(s) to fetch for every atlas.
+
+    transport : object or None, optional (default=None)
+        Download backend, see `helpers.download.fetch`. If None, files are
+        downloaded from Google Drive with `gdown`.
+
+    max_workers : int, optional (default=4)
+        Number of concurrent downloads.
+
+    verbose : bool, optional (default=True)
+        Whether to print download and progress messages.
+    """
+    atlases = [atlas] if isinstance(atlas, str) else list(atlas)
+    fcs = [fc] if isinstance(fc, str) else list(fc)
 
-    raise FileNotFoundError(
-        f"Atlas folder not found and not found in manifest: {atlas_path}"
+    files, folders = [], []
+    for a in atlases:
+        for f in fcs:
+            fc_path, phenotypes_path, atlas_path = _data_paths(data_dir, a, f)
+            files.append(fc_path)
+        folders.append(atlas_path)
+    files.append(phenotypes_path)
+
+    fetch(
+        data_dir,
+        files=files,
+        folders=folders,
+        transport=transport,
+        max_workers=max_workers,
+        verbose=verbose,
     )
+
+
+def _data_paths(data_dir, atlas, fc):
+    """Return the FC, phenotype, and atlas paths inside the data directory."""
+    fc_path = os.path.join(data_dir, "abide", "fc", atlas, f"{fc}.npy")
+    is_proba = atlas in {"difumo64"}
+    atlas_type = "probabilistic" if is_proba else "deterministic"
+    atlas_path = os.path.join(data_dir, "atlas", atlas_type, atlas)
+    phenotypes_path = os.path.join(data_dir, "abide", "phenotypes.csv")
+    return fc_path, phenotypes_path, atlas_path
+
+
+def _gather_subjects(fc_data, indices, vectorize, chunk_size, dtype=None):
+    """Read the selected subjects from a memory-mapped connectivity array
+    chunk by chunk into one preallocated output."""
+    if indices is None:
+        if not vectorize and (dtype is None or fc_data.dtype == dtype):
+            return fc_data
+        indices = np.arange(len(fc_data))
+
+    n_rois = fc_data.shape[1]
+    dtype = fc_data.dtype if dtype is None else dtype
+    if vectorize:
+        row, col = np.triu_indices(n_rois, 1)
+        out = np.empty((len(indices), len(row)), dtype=dtype)
+    else:
+        out = np.empty((len(indices), n_rois, n_rois), dtype=dtype)
+
+    for start in range(0, len(indices), chunk_size):
+        stop = start + chunk_size
+        chunk = fc_data[indices[start:stop]]
+        out[start:stop] = chunk[:, row, col] if vectorize else chunk
+
+    return out
@@ -0,0 +1,359 @@
+import hashlib
+import json
+import math
+import os
+import shutil
+import tempfile
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
+import numpy as np
+
+__all__ = [
+    "GdownTransport",
+    "LocalTransport",
+    "HTTPTransport",
+    "load_manifest",
+    "record_checksums",
+    "fetch",
+]
+
+# Files required from each atlas folder when the manifest does not list them
+ATLAS_FILES = ("labels.txt", "coords.npy")
+
+
+class GdownTransport:
+    """Download manifest entries from Google Drive with `gdown`."""
+
+    def __init__(self, quiet=True):
+        self.quiet = quiet
+
+    def fetch_file(self, entry, output):
+        import gdown
+
+        gdown.download(entry["url"], output=output, quiet=self.quiet)
+
+    def fetch_folder(self, entry, output):
+        import gdown
+
+        gdown.download_folder(id=entry["id"], output=output, quiet=self.quiet)
+
+
+class LocalTransport:
+    """Copy manifest entries from a local mirror of the data directory."""
+
+    def __init__(self, root):
+        self.root = root
+
+    def fetch_file(self, entry, output):
+        shutil.copyfile(os.path.join(self.root, entry["path"]), output)
+
+    def fetch_folder(self, entry, output):
+        shutil.copytree(os.path.join(self.root, entry["path"]), output)
+
+
+class HTTPTransport:
+    """Download manifest entries from a plain HTTP mirror of the data directory."""
+
+    def __init__(self, base_url, timeout=60):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+
+    def fetch_file(self, entry, output):
+        url = f"{self.base_url}/{entry['path']}"
+        with urllib.request.urlopen(url, timeout=self.timeout) as response:
+            with open(output, "wb") as f:
+                shutil.copyfileobj(response, f)
+
+    def fetch_folder(self, entry, output):
+        os.makedirs(output)
+        for name in entry.get("files", ATLAS_FILES):
+            file_entry = {"path": f"{entry['path']}/{name}"}
+            self.fetch_file(file_entry, os.path.join(output, name))
+
+
+@lru_cache(maxsize=None)
+def _parse_manifest(manifest_path, mtime_ns):
+    with open(manifest_path, "r") as f:
+        manifest = json.load(f)
+    return {entry["path"]: entry for entry in manifest}
+
+
+def load_manifest(manifest_path):
+    """
+    Parse a manifest file once and index its entries by relative path.
+
+    The parsed manifest is cached until the file is modified.
+
+    Parameters
+    ----------
+    manifest_path : str
+        Path to a JSON manifest, i.e., a list of entries with at least a
+        "path" key and optionally "size" (bytes) and "sha256" keys.
+
+    Returns
+    -------
+    manifest : dict of str -> dict
+        Manifest entries indexed by their path relative to the data directory.
+    """
+    return _parse_manifest(manifest_path, os.stat(manifest_path).st_mtime_ns)
+
+
+def record_checksums(manifest_path, data_dir):
+    """
+    Record the size and SHA-256 checksum of the local copy of every manifest file.
+
+    Run once on a verified copy of the data directory, so that `fetch`
+    rejects truncated or corrupted downloads of the recorded files. For
+    folder entries, e.g., atlas folders, the size and checksum of each file
+    directly inside the folder are recorded under "files". Entries without a
+    local copy are left unchanged.
+
+    Parameters
+    ----------
+    manifest_path : str
+        Path to a JSON manifest, updated in place.
+
+    data_dir : str
+        Local directory storing a verified copy of the dataset.
+
+    Returns
+    -------
+    n_recorded : int
+        Number of entries whose sizes and checksums were recorded.
+    """
+    with open(manifest_path, "r") as f:
+        manifest = json.load(f)
+
+    n_recorded = 0
+    for entry in manifest:
+        path = os.path.join(data_dir, entry["path"])
+        if os.path.isfile(path):
+            entry["size"] = os.path.getsize(path)
+            entry["sha256"] = _sha256(path)
+            n_recorded += 1
+        elif os.path.isdir(path):
+            names = sorted(
+                name
+                for name in os.listdir(path)
+                if os.path.isfile(os.path.join(path, name))
+            )
+            if not names:
+                continue
+            entry["files"] = {
+                name: {
+                    "size": os.path.getsize(os.path.join(path, name)),
+                    "sha256": _sha256(os.path.join(path, name)),
+                }
+                for name in names
+            }
+            n_recorded += 1
+
+    with open(manifest_path, "w") as f:
+        json.dump(manifest, f, indent=4)
+        f.write("\n")
+    return n_recorded
+
+
+def fetch(
+    data_dir,
+    files=(),
+    folders=(),
+    manifest_dir=None,
+    transport=None,
+    max_workers=4,
+    verbose=True,
+):
+    """
+    Ensure files and folders exist locally, downloading the missing ones in parallel.
+
+    Downloads are written to temporary paths and moved into place once
+    complete and verified against the size and checksum recorded in the
+    manifest (see `record_checksums`), so interrupted downloads are never
+    mistaken for complete ones and are simply retried on the next call.
+    NumPy files are also checked against the size implied by their header,
+    which catches truncated downloads of entries without a checksum.
+
+    Parameters
+    ----------
+    data_dir : str
+        Local directory storing the dataset.
+
+    files : iterable of str, optional (default=())
+        File paths (inside `data_dir`) listed in `manifests/abide.json`.
+
+    folders : iterable of str, optional (default=())
+        Folder paths (inside `data_dir`) listed in `manifests/atlas.json`.
+
+    manifest_dir : str or None, optional (default=None)
+        Directory containing the manifests. If None, `manifests` in the current
+        working directory is used.
+
+    transport : object or None, optional (default=None)
+        Object with `fetch_file(entry, output)` and `fetch_folder(entry, output)`
+        methods, e.g., `LocalTransport` or `HTTPTransport`. If None,
+        `GdownTransport` is used.
+
+    max_workers : int, optional (default=4)
+        Number of concurrent downloads.
+
+    verbose : bool, optional (default=True)
+        Whether to print download and progress messages.
+
+    Raises
+    ------
+    FileNotFoundError
+        If a missing path is not listed in its manifest or could not be downloaded.
+    """
+    if manifest_dir is None:
+        manifest_dir = os.path.join(os.getcwd(), "manifests")
+    if transport is None:
+        transport = GdownTransport(quiet=not verbose)
+
+    tasks = []
+    for paths, name, is_folder in ((files, "abide", False), (folders, "atlas", True)):
+        manifest = None
+        for target_path in paths:
+            kind = "Atlas folder" if is_folder else "File"
+            rel_path = os.path.relpath(target_path, data_dir).replace("\\", "/")
+
+            if manifest is None:
+                manifest = _load_optional_manifest(manifest_dir, name)
+            entry = manifest.get(rel_path)
+
+            if os.path.exists(target_path) and (
+                is_folder or entry is None or _is_valid(target_path, entry, False)
+            ):
+                if verbose:
+                    print(f"✔ {kind} found: {target_path}")
+                continue
+
+            if entry is None:
+                raise FileNotFoundError(
+                    f"{kind} not found and not found in manifest: {target_path}"
+                )
+            if verbose:
+                kind = "atlas folder " if is_folder else ""
+                print(f"⬇ Downloading {kind}{rel_path} ...")
+            tasks.append((entry, target_path, is_folder))
+
+    if not tasks:
+        return
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = [pool.submit(_fetch_one, transport, *task) for task in tasks]
+        for future in futures:
+            future.result()
+
+
+def _load_optional_manifest(manifest_dir, name):
+    manifest_path = os.path.join(manifest_dir, f"{name}.json")
+    if not os.path.exists(manifest_path):
+        return {}
+    return load_manifest(manifest_path)
+
+
+def _fetch_one(transport, entry, target_path, is_folder):
+    """Download one entry to a temporary path and move it into place."""
+    parent = os.path.dirname(target_path)
+    os.makedirs(parent, exist_ok=True)
+
+    if is_folder:
+        tmp_dir = tempfile.mkdtemp(dir=parent, prefix=".download-")
+        tmp_path = os.path.join(tmp_dir, os.path.basename(target_path))
+        try:
+            transport.fetch_folder(entry, tmp_path)
+            if not os.path.isdir(tmp_path):
+                raise FileNotFoundError(
+                    f"Failed to download atlas folder: {target_path}"
+                )
+            # Recorded files have a size and checksum, see `record_checksums`
+            files = entry.get("files")
+            recorded = files if isinstance(files, dict) else {}
+            missing = sorted(set(recorded) - set(os.listdir(tmp_path)))
+            if missing:
+                raise FileNotFoundError(
+                    f"Failed to download {', '.join(missing)} of atlas folder: "
+                    f"{target_path}"
+                )
+            for name in os.listdir(tmp_path):
+                path = os.path.join(tmp_path, name)
+                if os.path.isfile(path):
+                    file_entry = {"path": f"{entry['path']}/{name}"}
+                    _is_valid(path, {**file_entry, **recorded.get(name, {})}, True)
+            if os.path.exists(target_path):
+                shutil.rmtree(target_path)
+            os.replace(tmp_path, target_path)
+        finally:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+        return
+
+    fd, tmp_path = tempfile.mkstemp(dir=parent, prefix=".download-", suffix=".part")
+    os.close(fd)
+    try:
+        transport.fetch_file(entry, tmp_path)
+        if not os.path.exists(tmp_path) or os.path.getsize(tmp_path) == 0:
+            raise FileNotFoundError(f"Failed to download file: {target_path}")
+        _is_valid(tmp_path, entry, True)
+        os.replace(tmp_path, target_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def _is_valid(path, entry, strict):
+    """Check a file against its manifest entry and, for NumPy files, its header."""
+    size = entry.get("size")
+    if size is not None and os.path.getsize(path) != size:
+        if strict:
+            raise OSError(
+                f"Size mismatch for {entry['path']}: "
+                f"expected {size} bytes, got {os.path.getsize(path)}"
+            )
+        return False
+
+    if entry["path"].endswith(".npy") and (size is None or strict):
+        expected = _npy_size(path)
+        if expected is None:
+            if strict:
+                raise OSError(f"Corrupted header in NumPy file {entry['path']}")
+            return False
+        if expected != os.path.getsize(path):
+            if strict:
+                raise OSError(
+                    f"Truncated or corrupted NumPy file {entry['path']}: "
+                    f"expected {expected} bytes, got {os.path.getsize(path)}"
+                )
+            return False
+
+    checksum = entry.get("sha256")
+    # Only hash freshly downloaded files, existing ones are checked by size
+    if checksum is not None and strict and _sha256(path) != checksum:
+        raise OSError(f"Checksum mismatch for {entry['path']}")
+
+    return True
+
+
+def _npy_size(path):
+    """Size in bytes of a NumPy file as declared by its header, or None if unreadable."""
+    with open(path, "rb") as f:
+        try:
+            version = np.lib.format.read_magic(f)
+            if version == (1, 0):
+                shape, _, dtype = np.lib.format.read_array_header_1_0(f)
+            else:
+                shape, _, dtype = np.lib.format.read_array_header_2_0(f)
+        except ValueError:
+            return None
+        if dtype.hasobject:
+            return os.path.getsize(path)
+        return f.tell() + dtype.itemsize * math.prod(shape)
+
+
+def _sha256(path):
+    sha = hashlib.sha256()
+    with open(path, "rb") as f:
+        while block := f.read(1 << 20):
+            sha.update(block)
+    return sha.hexdigest()
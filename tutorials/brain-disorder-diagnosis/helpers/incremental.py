@@ -0,0 +1,482 @@
+import math
+import time
+
+import numpy as np
+import pandas as pd
+from joblib import Parallel, delayed
+from sklearn.base import BaseEstimator, ClassifierMixin, clone
+from sklearn.metrics import (
+    accuracy_score,
+    f1_score,
+    matthews_corrcoef,
+    precision_score,
+    recall_score,
+    roc_auc_score,
+)
+from sklearn.model_selection import ParameterGrid, ParameterSampler, StratifiedKFold
+from sklearn.preprocessing import StandardScaler
+from sklearn.utils import check_random_state
+
+from .preprocess import PhenotypeEncoder
+from .selection import EdgeScreener, edge_scores
+from .sweep import _format_results
+
+__all__ = ["IncrementalTrainer"]
+
+# Losses of the SGD equivalents of the `TRAINER.CLASSIFIER` options
+LOSSES = {"lr": "log_loss", "linear_svm": "hinge", "ridge": "squared_error"}
+
+# Metric function and prediction method of each `TRAINER.SCORING` option
+METRICS = {
+    "accuracy": (accuracy_score, "predict"),
+    "precision": (precision_score, "predict"),
+    "recall": (recall_score, "predict"),
+    "f1": (f1_score, "predict"),
+    "roc_auc": (roc_auc_score, "decision_function"),
+    "matthews_corrcoef": (matthews_corrcoef, "predict"),
+}
+
+DEFAULT_PARAM_GRID = {
+    "alpha": list(np.logspace(-5, 1, 13)),
+    "penalty": ["l2", "l1", "elasticnet"],
+    "l1_ratio": [0.15, 0.5, 0.85],
+}
+
+
+class IncrementalTrainer(ClassifierMixin, BaseEstimator):
+    """Out-of-core hyperparameter search and training with SGD linear models.
+
+    The features are never loaded as a whole. For every fold, the training
+    subjects are streamed in chunks from the (memory-mapped) feature matrix,
+    first to fit a `StandardScaler`, then for `num_epochs` passes in which each
+    chunk is read once and passed to `partial_fit` of all the candidates.
+    The test subjects are scored chunk by chunk as well. The folds come from
+    the same `cv` as `AutoMIDAClassificationTrainer`, and `cv_results_` has the
+    layout of scikit-learn searches, so it can be passed to `compile_results`.
+
+    Parameters
+    ----------
+    classifier : {"lr", "linear_svm", "ridge", "auto"}, optional (default="lr")
+        Classifier, trained as an `SGDClassifier` with the logistic, hinge, or
+        squared loss. "auto" adds the loss to the searched parameters.
+
+    param_grid : dict, list of dict, or None, optional (default=None)
+        Parameters of `SGDClassifier` to search. A `C` parameter is converted to
+        `alpha = 1 / (C * n_samples)`. If None, `DEFAULT_PARAM_GRID` is used.
+
+    search_strategy : {"random", "grid"}, optional (default="random")
+        Whether to sample `num_search_iter` candidates or try them all.
+
+    num_search_iter : int, optional (default=100)
+        Number of candidates sampled by the random search.
+
+    num_epochs : int, optional (default=5)
+        Number of passes over the training subjects.
+
+    chunk_size : int, optional (default=256)
+        Number of subjects read at a time.
+
+    feature_selection : {None, "f_classif", "variance"}, optional (default=None)
+        If given, only the top `num_features` FC edges by this statistic are
+        read and used. The statistic is computed on the training subjects of
+        each fold once, in a single pass shared by all the candidates.
+
+    num_features : int, optional (default=1000)
+        Number of FC edges kept by `feature_selection`.
+
+    cv : cross-validation generator, list of (train, test), or None, optional (default=None)
+        Cross-validation strategy. If None, a 5-fold stratified split is used.
+
+    scoring : str or list of str, optional (default="accuracy")
+        Scoring metric names, keys of `METRICS`.
+
+    refit : str or False, optional (default="accuracy")
+        Metric used to select and refit the best candidate on all subjects.
+
+    n_jobs : int or None, optional (default=None)
+        Number of folds processed in parallel.
+
+    random_state : int, RandomState instance, or None, optional (default=None)
+        Seed of the candidate sampling and the chunk shuffling.
+
+    verbose : int, optional (default=0)
+        Verbosity level of the parallel folds.
+
+    Attributes
+    ----------
+    cv_results_ : dict of str -> np.ndarray or list
+        Per-candidate and per-fold scores and fit times.
+
+    best_index_, best_params_, best_score_ : int, dict, float
+        Candidate selected by `refit`.
+
+    best_estimator_ : SGDClassifier
+        Best candidate refitted on the standardized features of all subjects.
+
+    scaler_ : StandardScaler
+        Scaler fitted on all subjects.
+
+    screener_ : EdgeScreener or None
+        Edge selection fitted on all subjects, if `feature_selection` is set.
+
+    coef_, intercept_ : np.ndarray
+        Coefficients of `best_estimator_` in the original feature space, i.e.,
+        the FC edges followed by the encoded `group_labels` (if any). The
+        edges dropped by `feature_selection` have zero coefficients.
+    """
+
+    def __init__(
+        self,
+        classifier="lr",
+        param_grid=None,
+        search_strategy="random",
+        num_search_iter=100,
+        num_epochs=5,
+        chunk_size=256,
+        feature_selection=None,
+        num_features=1000,
+        cv=None,
+        scoring="accuracy",
+        refit="accuracy",
+        n_jobs=None,
+        random_state=None,
+        verbose=0,
+    ):
+        self.classifier = classifier
+        self.param_grid = param_grid
+        self.search_strategy = search_strategy
+        self.num_search_iter = num_search_iter
+        self.num_epochs = num_epochs
+        self.chunk_size = chunk_size
+        self.feature_selection = feature_selection
+        self.num_features = num_features
+        self.cv = cv
+        self.scoring = scoring
+        self.refit = refit
+        self.n_jobs = n_jobs
+        self.random_state = random_state
+        self.verbose = verbose
+
+    def fit(self, x, y, groups=None, group_labels=None):
+        """Search the candidates on every fold and refit the best one.
+
+        Parameters
+        ----------
+        x : array-like of shape (n_subjects, n_features)
+            Features, e.g., a memory-mapped array returned by `load_data`.
+
+        y : array-like of shape (n_subjects,)
+            Labels.
+
+        groups : array-like of shape (n_subjects,) or None, optional (default=None)
+            Group labels used by the cross-validation, e.g., sites.
+
+        group_labels : array-like or pd.DataFrame of shape (n_subjects, ...) or None, optional (default=None)
+            Sites or phenotypes one-hot encoded and appended to the features.
+
+        Returns
+        -------
+        self : IncrementalTrainer
+            The fitted trainer.
+        """
+        if self.classifier not in {*LOSSES, "auto"}:
+            raise ValueError(
+                f"classifier must be one of {sorted({*LOSSES, 'auto'})} for "
+                f"out-of-core training, got '{self.classifier}' instead."
+            )
+        if self.search_strategy not in {"random", "grid"}:
+            raise ValueError(
+                f"search_strategy must be 'random' or 'grid', got '{self.search_strategy}' instead."
+            )
+
+        scoring = [self.scoring] if isinstance(self.scoring, str) else self.scoring
+        scoring = list(scoring)
+        unknown = set(scoring).difference(METRICS)
+        if unknown:
+            raise ValueError(f"Unsupported scoring metrics: {sorted(unknown)}.")
+
+        y = np.asarray(y)
+        self.classes_ = np.unique(y)
+        self.n_features_in_ = x.shape[1]
+        extra = self._encode_group_labels(group_labels, fit=True)
+
+        cv = self.cv if self.cv is not None else StratifiedKFold(5)
+        splits = list(cv.split(x, y, groups)) if hasattr(cv, "split") else list(cv)
+
+        rng = check_random_state(self.random_state)
+        candidates = self._candidates(rng)
+        estimators = [self._estimator(params, len(y)) for params in candidates]
+        seeds = rng.randint(np.iinfo(np.int32).max, size=len(splits) + 1)
+
+        fold_results = Parallel(n_jobs=self.n_jobs, verbose=self.verbose)(
+            delayed(_fit_fold)(
+                x,
+                extra,
+                y,
+                train,
+                test,
+                self._screener(),
+                estimators,
+                self.classes_,
+                scoring,
+                self.num_epochs,
+                self.chunk_size,
+                seed,
+            )
+            for (train, test), seed in zip(splits, seeds)
+        )
+
+        tasks = [(i, j) for j in range(len(splits)) for i in range(len(candidates))]
+        results = [result for fold in fold_results for result in fold]
+        self.cv_results_ = _format_results(
+            candidates, len(splits), scoring, tasks, results
+        )
+
+        if self.refit:
+            self.best_index_ = int(
+                np.argmin(self.cv_results_[f"rank_test_{self.refit}"])
+            )
+            self.best_params_ = candidates[self.best_index_]
+            self.best_score_ = self.cv_results_[f"mean_test_{self.refit}"][
+                self.best_index_
+            ]
+
+            estimator = self._estimator(self.best_params_, len(y))
+            estimator.set_params(random_state=seeds[-1])
+            self.screener_ = _fit_screener(
+                self._screener(), x, y, np.arange(len(y)), self.chunk_size
+            )
+            self.scaler_, _ = _partial_fit(
+                x,
+                extra,
+                self.screener_,
+                y,
+                np.arange(len(y)),
+                [estimator],
+                self.classes_,
+                self.num_epochs,
+                self.chunk_size,
+                np.random.RandomState(seeds[-1]),
+            )
+            self.best_estimator_ = estimator
+
+        return self
+
+    @property
+    def coef_(self):
+        coef = self.best_estimator_.coef_ / self.scaler_.scale_
+        if self.screener_ is None:
+            return coef
+        return self.screener_.inverse_transform_coef(coef)
+
+    @property
+    def intercept_(self):
+        coef = self.best_estimator_.coef_ / self.scaler_.scale_
+        return self.best_estimator_.intercept_ - coef @ self.scaler_.mean_
+
+    def decision_function(self, x, group_labels=None):
+        """Compute the decision function chunk by chunk.
+
+        Parameters
+        ----------
+        x : array-like of shape (n_subjects, n_features)
+            Features.
+
+        group_labels : array-like or pd.DataFrame or None, optional (default=None)
+            Sites or phenotypes, as passed to `fit`.
+
+        Returns
+        -------
+        scores : np.ndarray of shape (n_subjects,) or (n_subjects, n_classes)
+            Decision function of the best candidate.
+        """
+        extra = self._encode_group_labels(group_labels)
+        return _predict(
+            self.best_estimator_,
+            self.scaler_,
+            x,
+            extra,
+            self.screener_,
+            np.arange(x.shape[0]),
+            self.chunk_size,
+            "decision_function",
+        )
+
+    def predict(self, x, group_labels=None):
+        """Predict the labels chunk by chunk.
+
+        Parameters
+        ----------
+        x : array-like of shape (n_subjects, n_features)
+            Features.
+
+        group_labels : array-like or pd.DataFrame or None, optional (default=None)
+            Sites or phenotypes, as passed to `fit`.
+
+        Returns
+        -------
+        y_pred : np.ndarray of shape (n_subjects,)
+            Labels predicted by the best candidate.
+        """
+        extra = self._encode_group_labels(group_labels)
+        return _predict(
+            self.best_estimator_,
+            self.scaler_,
+            x,
+            extra,
+            self.screener_,
+            np.arange(x.shape[0]),
+            self.chunk_size,
+            "predict",
+        )
+
+    def _candidates(self, rng):
+        param_grid = self.param_grid
+        if param_grid is None:
+            param_grid = dict(DEFAULT_PARAM_GRID)
+        if self.classifier == "auto" and isinstance(param_grid, dict):
+            param_grid = {"loss": list(LOSSES.values()), **param_grid}
+
+        if self.search_strategy == "grid":
+            return list(ParameterGrid(param_grid))
+
+        n_candidates = self.num_search_iter
+        if all(hasattr(v, "__len__") for v in _grid_values(param_grid)):
+            # Sampling without replacement cannot exceed the grid size
+            n_candidates = min(n_candidates, len(ParameterGrid(param_grid)))
+        return list(ParameterSampler(param_grid, n_candidates, random_state=rng))
+
+    def _screener(self):
+        if self.feature_selection is None:
+            return None
+        return EdgeScreener(self.feature_selection, self.num_features, self.chunk_size)
+
+    def _estimator(self, params, n_samples):
+        params = dict(params)
+        if "C" in params:
+            params["alpha"] = 1.0 / (params.pop("C") * n_samples)
+        params.setdefault("loss", LOSSES.get(self.classifier, "log_loss"))
+        # Deferred, as it imports most of scikit-learn's linear models
+        from sklearn.linear_model import SGDClassifier
+
+        return SGDClassifier(**params)
+
+    def _encode_group_labels(self, group_labels, fit=False):
+        if fit:
+            self.group_encoder_ = None
+        if group_labels is None:
+            if getattr(self, "group_encoder_", None) is not None:
+                raise ValueError("group_labels are required as they were used in fit.")
+            return None
+
+        if not isinstance(group_labels, pd.DataFrame):
+            group_labels = np.asarray(group_labels)
+            group_labels = pd.DataFrame(
+                group_labels.reshape(len(group_labels), -1)
+            ).astype(object)
+
+        if fit:
+            self.group_encoder_ = PhenotypeEncoder(dtype=np.float64).fit(group_labels)
+        return self.group_encoder_.transform(group_labels)
+
+
+def _grid_values(param_grid):
+    grids = [param_grid] if isinstance(param_grid, dict) else param_grid
+    return [v for grid in grids for v in grid.values()]
+
+
+def _chunks(indices, chunk_size):
+    return np.array_split(indices, max(1, math.ceil(len(indices) / chunk_size)))
+
+
+def _fit_screener(screener, x, y, indices, chunk_size):
+    """Score the edges on the given subjects only, keeping the selection fold-safe."""
+    if screener is None:
+        return None
+    scores = edge_scores(x, y, screener.method, indices, chunk_size)
+    return screener.set_support(scores)
+
+
+def _read(x, extra, screener, indices):
+    """Read the rows of a chunk, keeping the screened edges and appending the
+    encoded group labels."""
+    chunk = np.asarray(x[indices], dtype=np.float64)
+    if screener is not None:
+        chunk = chunk[:, screener.support_]
+    if extra is None:
+        return chunk
+    return np.hstack([chunk, extra[indices]])
+
+
+def _partial_fit(
+    x, extra, screener, y, indices, estimators, classes, num_epochs, chunk_size, rng
+):
+    """Stream the chunks of the given subjects through the estimators."""
+    chunks = _chunks(indices, chunk_size)
+
+    scaler = StandardScaler()
+    for chunk in chunks:
+        scaler.partial_fit(_read(x, extra, screener, chunk))
+
+    fit_times = np.zeros(len(estimators))
+    for _ in range(num_epochs):
+        for k in rng.permutation(len(chunks)):
+            chunk = chunks[k][rng.permutation(len(chunks[k]))]
+            x_chunk = scaler.transform(_read(x, extra, screener, chunk))
+            for i, estimator in enumerate(estimators):
+                start = time.perf_counter()
+                estimator.partial_fit(x_chunk, y[chunk], classes=classes)
+                fit_times[i] += time.perf_counter() - start
+
+    return scaler, fit_times
+
+
+def _predict(estimator, scaler, x, extra, screener, indices, chunk_size, method):
+    outputs = [
+        getattr(estimator, method)(scaler.transform(_read(x, extra, screener, chunk)))
+        for chunk in _chunks(indices, chunk_size)
+    ]
+    return np.concatenate(outputs)
+
+
+def _fit_fold(
+    x,
+    extra,
+    y,
+    train,
+    test,
+    screener,
+    estimators,
+    classes,
+    scoring,
+    num_epochs,
+    chunk_size,
+    seed,
+):
+    """Train all candidates on one fold and score them on its test subjects."""
+    rng = np.random.RandomState(seed)
+    estimators = [
+        clone(estimator).set_params(random_state=seed) for estimator in estimators
+    ]
+    screener = _fit_screener(screener, x, y, train, chunk_size)
+    scaler, fit_times = _partial_fit(
+        x, extra, screener, y, train, estimators, classes, num_epochs, chunk_size, rng
+    )
+
+    # Standardize each test chunk once for all the candidates
+    chunks = _chunks(test, chunk_size)
+    x_chunks = [scaler.transform(_read(x, extra, screener, chunk)) for chunk in chunks]
+
+    results = []
+    for estimator, fit_time in zip(estimators, fit_times):
+        outputs = {
+            method: np.concatenate([getattr(estimator, method)(c) for c in x_chunks])
+            for method in {METRICS[name][1] for name in scoring}
+        }
+        scores = {
+            name: METRICS[name][0](y[test], outputs[METRICS[name][1]])
+            for name in scoring
+        }
+        results.append((scores, fit_time))
+
+    return results
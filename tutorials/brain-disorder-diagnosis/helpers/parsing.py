@@ -1,8 +1,16 @@
+import os
+
+import numpy as np
 import pandas as pd
-from collections import defaultdict
-from sklearn.utils._param_validation import validate_params, StrOptions
+from sklearn.utils._param_validation import Integral, StrOptions, validate_params
+
+from .profiling import profiled
 
-__all__ = ["compile_results"]
+__all__ = [
+    "compile_results",
+    "format_results",
+    "parse_param_grid",
+]
 
 # Mapping for model and score display names
 MODEL = ["baseline", "site_only", "all_phenotypes"]
@@ -14,61 +22,138 @@ SCORE["roc_auc"] = "AUROC"
 SCORE["matthews_corrcoef"] = "MCC"
 
 
+@profiled
 @validate_params(
-    {"cv_results": [dict], "sort_by": [StrOptions(set(SCORE))]},
+    {
+        "cv_results": [dict],
+        "sort_by": [StrOptions(set(SCORE))],
+        "formatted": ["boolean"],
+    },
     prefer_skip_nested_validation=True,
 )
-def compile_results(cv_results, sort_by):
+def compile_results(cv_results, sort_by, formatted=True):
     """
-    Compile and summarize cross-validation results into a formatted DataFrame.
+    Compile and summarize cross-validation results into a DataFrame.
 
     Parameters
     ----------
-    cv_results : dict of str -> pd.DataFrame or dict of str -> dict of str -> list
+    cv_results : dict of str -> pd.DataFrame, dict of str -> list, str, or list of str
         Dictionary mapping model names to cross-validation results.
-        Each entry should either be a DataFrame or a dictionary of dictionary of list.
+        Each entry should either be a DataFrame, a dictionary of list (e.g.,
+        `cv_results_`), or the path(s) to per-run parquet files of such results.
+        Parquet files are streamed one at a time and only their score
+        columns are read.
 
     sort_by : str
         Metric to use for selecting the best-performing model variant.
         Available ones include: "accuracy", "precision", "recall", "f1", "roc_auc",
         and "matthews_corrcoef".
 
+    formatted : bool, optional (default=True)
+        Whether to format the scores as "mean ± std" strings, averaging the
+        runs of each model. If False, the numeric mean and std of the best
+        candidate of every run are returned instead.
+
     Returns
     -------
     compiled_results : pd.DataFrame
-        Summary table with models as rows and formatted score strings (mean ± std) as columns.
+        Summary table with models as rows and formatted score strings (mean ± std)
+        as columns. If `formatted=False`, the rows are indexed by model and run,
+        and the columns by score and statistic ("mean" or "std").
     """
-    compiled_results = defaultdict(list)
+    rows, index = [], []
+    for model, results in cv_results.items():
+        if isinstance(results, (str, os.PathLike)):
+            results = [results]
+
+        if isinstance(results, list):
+            runs = (_read_score_columns(path) for path in results)
+        else:
+            runs = [results]
+
+        for run, columns in enumerate(runs):
+            rows.append(_best_scores(columns, sort_by))
+            index.append((MODEL.get(model, model), run))
+
+    compiled_results = pd.DataFrame(
+        rows, index=pd.MultiIndex.from_tuples(index, names=["Model", "Run"])
+    )
+    compiled_results.columns = pd.MultiIndex.from_tuples(
+        compiled_results.columns, names=["Score", "Statistic"]
+    )
+
+    if formatted:
+        compiled_results = format_results(compiled_results)
 
-    for model in cv_results:
-        # Ensure results are in DataFrame format
-        if not isinstance(cv_results[model], pd.DataFrame):
-            cv_results[model] = pd.DataFrame(cv_results[model])
+    return compiled_results
 
-        # Extract all available test scores
-        scores = [
-            score.replace("rank_test_", "")
-            for score in cv_results[model].columns
-            if "rank_test" in score
-        ]
 
-        # Select the best row (lowest rank) based on the given metric
-        cv_result = cv_results[model].sort_values(f"rank_test_{sort_by}").iloc[0]
+@profiled
+@validate_params(
+    {"compiled_results": [pd.DataFrame], "precision": [Integral]},
+    prefer_skip_nested_validation=True,
+)
+def format_results(compiled_results, precision=4):
+    """
+    Format numeric compiled results as "mean ± std" strings.
 
-        compiled_results["Model"].append(MODEL[model])
+    Parameters
+    ----------
+    compiled_results : pd.DataFrame
+        Numeric results returned by `compile_results(..., formatted=False)`.
+        Runs of the same model are averaged, with the standard deviations
+        pooled over runs.
 
-        for score in scores:
-            mean_score = cv_result[f"mean_test_{score}"]
-            std_score = cv_result[f"std_test_{score}"]
-            compiled_results[SCORE[score]].append(f"{mean_score:.4f} ± {std_score:.4f}")
+    precision : int, optional (default=4)
+        Number of decimals of the formatted scores.
 
-    # Convert to DataFrame and index by model name
-    compiled_results = pd.DataFrame(compiled_results)
-    compiled_results = compiled_results.set_index("Model")
+    Returns
+    -------
+    formatted_results : pd.DataFrame
+        Summary table with models as rows and formatted score strings as columns.
+    """
+    means = compiled_results.xs("mean", axis=1, level="Statistic")
+    variances = compiled_results.xs("std", axis=1, level="Statistic") ** 2
 
-    return compiled_results
+    means = means.groupby(level="Model", sort=False).mean()
+    stds = variances.groupby(level="Model", sort=False).mean() ** 0.5
+
+    fmt = f"{{:.{precision}f}}".format
+    formatted_results = means.map(fmt) + " ± " + stds.map(fmt)
+    formatted_results.columns.name = None
+
+    return formatted_results
+
+
+def _best_scores(columns, sort_by):
+    """Select the scores of the best candidate (lowest rank) without copying."""
+    names = columns.keys() if isinstance(columns, dict) else columns.columns
+    scores = [name[len("rank_test_") :] for name in names if "rank_test_" in name]
+
+    best = np.argmin(np.asarray(columns[f"rank_test_{sort_by}"]))
+
+    best_scores = {}
+    for score in scores:
+        for stat in ("mean", "std"):
+            value = np.asarray(columns[f"{stat}_test_{score}"])[best]
+            best_scores[(SCORE.get(score, score), stat)] = float(value)
+
+    return best_scores
+
+
+def _read_score_columns(path):
+    """Read only the rank, mean, and std test score columns of a parquet file."""
+    import pyarrow.parquet as pq
+
+    names = [
+        name
+        for name in pq.read_schema(path).names
+        if name.startswith(("rank_test_", "mean_test_", "std_test_"))
+    ]
+    return pd.read_parquet(path, columns=names)
 
 
+@profiled
 @validate_params(
     {"param_grid": [list, None], "exclude": [str, None]},
     prefer_skip_nested_validation=True,
@@ -0,0 +1,200 @@
+import json
+import os
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from .cache import file_digest
+
+__all__ = ["PhenotypeStore", "open_phenotype_store"]
+
+TABLE_FILE = "phenotypes.parquet"
+SITE_INDEX_FILE = "site_index.npz"
+META_FILE = "meta.json"
+
+
+class PhenotypeStore:
+    """Typed phenotypes with a precomputed site to row-index map.
+
+    The rows of each site are stored contiguously, ordered by decreasing
+    number of subjects per site, so selecting the top K sites or the
+    subjects of one site are slices of a single index array instead of
+    scans over the `SITE_ID` column.
+
+    Parameters
+    ----------
+    phenotypes : pd.DataFrame of shape (n_subjects, n_phenotypes)
+        Phenotypes with categorical dtypes applied to the string columns.
+
+    sites : np.ndarray of shape (n_sites,)
+        Site IDs ordered by decreasing number of subjects.
+
+    offsets : np.ndarray of shape (n_sites + 1,)
+        Start of the rows of each site in `rows`.
+
+    rows : np.ndarray of shape (n_subjects,)
+        Row indices of the subjects, grouped by site.
+    """
+
+    def __init__(self, phenotypes, sites, offsets, rows):
+        self.phenotypes = phenotypes
+        self.sites = sites
+        self.offsets = offsets
+        self.rows = rows
+        self._site_codes = {site: i for i, site in enumerate(sites)}
+
+    @property
+    def counts(self):
+        """Number of subjects of each site, aligned with `sites`."""
+        return np.diff(self.offsets)
+
+    def site_rows(self, site):
+        """Get the sorted row indices of the subjects of a site.
+
+        Parameters
+        ----------
+        site : str
+            Site ID.
+
+        Returns
+        -------
+        indices : np.ndarray of shape (n_site_subjects,)
+            Row indices of the subjects of the site.
+        """
+        i = self._site_codes[site]
+        return self.rows[self.offsets[i] : self.offsets[i + 1]]
+
+    def top_k_rows(self, k):
+        """Get the sorted row indices of the subjects of the K largest sites.
+
+        Parameters
+        ----------
+        k : int
+            Number of sites, ties being broken as in `pd.Series.nlargest`.
+
+        Returns
+        -------
+        indices : np.ndarray of shape (n_selected_subjects,)
+            Row indices of the subjects of the selected sites.
+
+        Raises
+        ------
+        ValueError
+            If `k` is greater than the number of sites.
+        """
+        if k > len(self.sites):
+            raise ValueError(
+                f"top_k_sites ({k}) cannot be greater than the number of sites ({len(self.sites)})"
+            )
+        return np.sort(self.rows[: self.offsets[k]])
+
+    def take(self, indices):
+        """Select subjects, dropping the categories no longer used.
+
+        Parameters
+        ----------
+        indices : array-like of shape (n_selected_subjects,)
+            Row indices of the subjects.
+
+        Returns
+        -------
+        phenotypes : pd.DataFrame of shape (n_selected_subjects, n_phenotypes)
+            Phenotypes of the selected subjects.
+        """
+        phenotypes = self.phenotypes.iloc[indices]
+        categorical = phenotypes.select_dtypes("category").columns
+        if len(categorical) == 0:
+            return phenotypes
+        return phenotypes.assign(
+            **{c: phenotypes[c].cat.remove_unused_categories() for c in categorical}
+        )
+
+
+def open_phenotype_store(csv_path, store_dir, site_column="SITE_ID"):
+    """
+    Open the columnar store of a phenotype CSV file, building it if needed.
+
+    The CSV file is parsed once into a parquet file with categorical dtypes
+    applied to its string columns, along with the site to row-index map of
+    `PhenotypeStore`. The store is rebuilt automatically when the content of
+    the CSV file changes, which is checked by size and modification time
+    before falling back to its digest. Requires `pyarrow`.
+
+    Parameters
+    ----------
+    csv_path : str
+        Path to the phenotype CSV file, e.g., `abide/phenotypes.csv`.
+
+    store_dir : str
+        Directory of the store, created if missing.
+
+    site_column : str, optional (default="SITE_ID")
+        Column with the site of each subject.
+
+    Returns
+    -------
+    store : PhenotypeStore
+        The phenotypes and their site index.
+    """
+    stat = os.stat(csv_path)
+    stamp = [stat.st_size, stat.st_mtime_ns]
+    meta_path = os.path.join(store_dir, META_FILE)
+
+    meta = None
+    if os.path.exists(meta_path):
+        with open(meta_path, "r") as f:
+            meta = json.load(f)
+
+    if meta is None or meta["stamp"] != stamp:
+        digest = file_digest(csv_path)
+        if meta is None or meta["digest"] != digest:
+            _build_store(csv_path, store_dir, site_column)
+        _atomic_write(meta_path, json.dumps({"stamp": stamp, "digest": digest}))
+
+    phenotypes = pd.read_parquet(os.path.join(store_dir, TABLE_FILE))
+    with np.load(os.path.join(store_dir, SITE_INDEX_FILE), allow_pickle=False) as f:
+        sites, offsets, rows = f["sites"], f["offsets"], f["rows"]
+
+    return PhenotypeStore(phenotypes, sites, offsets, rows)
+
+
+def _build_store(csv_path, store_dir, site_column):
+    """Convert the CSV file to parquet and precompute the site index."""
+    os.makedirs(store_dir, exist_ok=True)
+    phenotypes = pd.read_csv(csv_path)
+
+    # Counted before casting to categories, so that ties between sites are
+    # ordered as by `value_counts` on the raw column and match `nlargest`
+    counts = phenotypes[site_column].value_counts()
+
+    strings = phenotypes.select_dtypes(include=["object", "string"]).columns
+    phenotypes = phenotypes.astype({column: "category" for column in strings})
+
+    codes = pd.Categorical(phenotypes[site_column], categories=counts.index).codes
+    # Subjects without a site are placed after all sites
+    codes = np.where(codes < 0, len(counts), codes)
+    rows = np.argsort(codes, kind="stable")
+    offsets = np.concatenate([[0], np.cumsum(counts.to_numpy())])
+
+    fd, tmp_path = tempfile.mkstemp(dir=store_dir, suffix=".tmp")
+    os.close(fd)
+    phenotypes.to_parquet(tmp_path, index=False)
+    os.replace(tmp_path, os.path.join(store_dir, TABLE_FILE))
+
+    fd, tmp_path = tempfile.mkstemp(dir=store_dir, suffix=".npz")
+    os.close(fd)
+    np.savez(
+        tmp_path,
+        sites=counts.index.to_numpy(dtype=str),
+        offsets=offsets,
+        rows=rows,
+    )
+    os.replace(tmp_path, os.path.join(store_dir, SITE_INDEX_FILE))
+
+
+def _atomic_write(path, content):
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    with os.fdopen(fd, "w") as f:
+        f.write(content)
+    os.replace(tmp_path, path)
@@ -1,17 +1,31 @@
 import logging
+import os
+import re
 
 import numpy as np
 import pandas as pd
-from nilearn.connectome import ConnectivityMeasure
+from joblib import Parallel, delayed, effective_n_jobs
+from sklearn.base import BaseEstimator, TransformerMixin, clone
 from sklearn.preprocessing import StandardScaler
 from sklearn.utils._param_validation import (
+    HasMethods,
     Integral,
     Interval,
     StrOptions,
     validate_params,
 )
 
-__all__ = ["preprocess_phenotypic_data", "extract_functional_connectivity"]
+from .profiling import profiled
+from .store import append_feature_store, read_feature_store
+
+__all__ = [
+    "preprocess_phenotypic_data",
+    "extract_functional_connectivity",
+    "stream_functional_connectivity",
+    "SiteStandardScaler",
+    "PhenotypeEncoder",
+    "append_phenotypes",
+]
 
 SELECTED_PHENOTYPES = [
     "SUB_ID",
@@ -49,11 +63,340 @@ AVAILABLE_FC_MEASURES = {
 }
 
 
+class SiteStandardScaler(TransformerMixin, BaseEstimator):
+    """Standardize features by removing the mean and scaling to unit variance
+    within each site.
+
+    The per-site statistics are computed in a single pass with segment
+    reductions and stored, so that the scaler fitted on training subjects can
+    be reused to transform held-out subjects. Subjects from sites unseen
+    during fitting are standardized with the statistics of all fitted subjects.
+
+    Attributes
+    ----------
+    sites_ : np.ndarray of shape (n_sites,)
+        The sites seen during fitting.
+
+    mean_ : np.ndarray of shape (n_sites, n_features)
+        The per-site mean of each feature.
+
+    scale_ : np.ndarray of shape (n_sites, n_features)
+        The per-site standard deviation of each feature, with zeros replaced by ones.
+
+    global_mean_ : np.ndarray of shape (n_features,)
+        The mean of each feature over all fitted subjects.
+
+    global_scale_ : np.ndarray of shape (n_features,)
+        The standard deviation of each feature over all fitted subjects.
+    """
+
+    def fit(self, X, sites):
+        """Compute the per-site mean and standard deviation.
+
+        Parameters
+        ----------
+        X : array-like of shape (n_subjects, n_features)
+            The values to standardize.
+
+        sites : array-like of shape (n_subjects,)
+            The site of each subject.
+
+        Returns
+        -------
+        self : SiteStandardScaler
+            The fitted scaler.
+        """
+        X = np.asarray(X, dtype=float)
+        self.sites_, codes = np.unique(np.asarray(sites), return_inverse=True)
+        self.mean_, self.scale_ = _segment_mean_std(X, codes, len(self.sites_))
+        self.global_mean_, self.global_scale_ = _segment_mean_std(
+            X, np.zeros(len(X), dtype=int), 1
+        )
+        self.global_mean_ = self.global_mean_[0]
+        self.global_scale_ = self.global_scale_[0]
+        return self
+
+    def transform(self, X, sites):
+        """Standardize the values with the statistics of their sites.
+
+        Parameters
+        ----------
+        X : array-like of shape (n_subjects, n_features)
+            The values to standardize.
+
+        sites : array-like of shape (n_subjects,)
+            The site of each subject.
+
+        Returns
+        -------
+        X_scaled : np.ndarray of shape (n_subjects, n_features)
+            The standardized values.
+        """
+        X = np.asarray(X, dtype=float)
+        sites = np.asarray(sites)
+
+        # Append the global statistics as a fallback for unseen sites
+        mean = np.vstack([self.mean_, self.global_mean_])
+        scale = np.vstack([self.scale_, self.global_scale_])
+
+        codes = np.searchsorted(self.sites_, sites)
+        codes = np.clip(codes, 0, len(self.sites_) - 1)
+        codes[self.sites_[codes] != sites] = len(self.sites_)
+
+        return (X - mean[codes]) / scale[codes]
+
+    def fit_transform(self, X, sites):
+        """Fit to the values, then standardize them.
+
+        Parameters
+        ----------
+        X : array-like of shape (n_subjects, n_features)
+            The values to standardize.
+
+        sites : array-like of shape (n_subjects,)
+            The site of each subject.
+
+        Returns
+        -------
+        X_scaled : np.ndarray of shape (n_subjects, n_features)
+            The standardized values.
+        """
+        return self.fit(X, sites).transform(X, sites)
+
+
+def _segment_mean_std(X, codes, n_segments):
+    """Compute the mean and standard deviation of each column within each segment."""
+    counts = np.bincount(codes, minlength=n_segments)[:, None]
+    sums = np.stack(
+        [np.bincount(codes, X[:, j], n_segments) for j in range(X.shape[1])], axis=1
+    )
+    mean = sums / counts
+    # Two-pass variance for numerical stability
+    centered = (X - mean[codes]) ** 2
+    var = np.stack(
+        [np.bincount(codes, centered[:, j], n_segments) for j in range(X.shape[1])],
+        axis=1,
+    )
+    scale = np.sqrt(var / counts)
+    scale[scale == 0] = 1.0
+    return mean, scale
+
+
+class PhenotypeEncoder(TransformerMixin, BaseEstimator):
+    """One-hot encode categorical phenotypes into a compact NumPy or sparse block.
+
+    Numeric columns are kept as they are, followed by one indicator column per
+    category of each categorical column, i.e., the layout of `pd.get_dummies`.
+    The categories are fixed when fitting, so the column schema is stable
+    across folds and cohorts, and subjects with unseen or missing categories
+    get all-zero indicators. The indicators are written from the category
+    codes directly, without building intermediate pandas frames.
+
+    Parameters
+    ----------
+    sparse_output : bool, optional (default=False)
+        Whether to return a `scipy.sparse.csr_matrix` instead of a NumPy array.
+
+    dtype : data-type or None, optional (default=None)
+        Data type of the output. If None, np.uint8 is used when all columns
+        are categorical and np.float32 otherwise.
+
+    categories : dict of str -> list or None, optional (default=None)
+        Categories of some columns, e.g., to share a schema between cohorts.
+        The categories of the other columns are taken from their categorical
+        dtype or, otherwise, from the sorted unique values seen during fitting.
+
+    Attributes
+    ----------
+    feature_names_in_ : np.ndarray of shape (n_features_in,)
+        The columns seen during fitting.
+
+    numeric_columns_ : list of str
+        The columns passed through unchanged.
+
+    categories_ : dict of str -> np.ndarray
+        The categories of each categorical column.
+    """
+
+    def __init__(self, sparse_output=False, dtype=None, categories=None):
+        self.sparse_output = sparse_output
+        self.dtype = dtype
+        self.categories = categories
+
+    def fit(self, X, y=None):
+        """Record the numeric columns and the categories of the other columns.
+
+        Parameters
+        ----------
+        X : pd.DataFrame of shape (n_subjects, n_features_in)
+            The phenotypes to encode.
+
+        y : None
+            Ignored.
+
+        Returns
+        -------
+        self : PhenotypeEncoder
+            The fitted encoder.
+        """
+        categories = self.categories or {}
+        self.feature_names_in_ = np.asarray(X.columns, dtype=object)
+        self.numeric_columns_ = []
+        self.categories_ = {}
+        for column in X.columns:
+            values = X[column]
+            if column in categories:
+                self.categories_[column] = np.asarray(categories[column])
+            elif isinstance(values.dtype, pd.CategoricalDtype):
+                self.categories_[column] = values.cat.categories.to_numpy()
+            elif pd.api.types.is_numeric_dtype(values) and not (
+                pd.api.types.is_bool_dtype(values)
+            ):
+                self.numeric_columns_.append(column)
+            else:
+                self.categories_[column] = np.sort(values.dropna().unique())
+        return self
+
+    def transform(self, X):
+        """Encode the phenotypes with the fitted schema.
+
+        Parameters
+        ----------
+        X : pd.DataFrame of shape (n_subjects, n_features_in)
+            The phenotypes to encode, with the columns seen during fitting.
+
+        Returns
+        -------
+        X_encoded : np.ndarray or scipy.sparse.csr_matrix of shape (n_subjects, n_features_out)
+            The numeric columns followed by the category indicators.
+        """
+        from scipy import sparse
+
+        missing = set(self.feature_names_in_).difference(X.columns)
+        if missing:
+            raise ValueError(f"Missing phenotype columns: {sorted(missing)}.")
+
+        n_subjects = len(X)
+        n_numeric = len(self.numeric_columns_)
+        dtype = self.dtype
+        if dtype is None:
+            dtype = np.float32 if n_numeric else np.uint8
+
+        # Column of each subject's category, -1 if unseen or missing
+        offset = n_numeric
+        rows, cols = [], []
+        for column, categories in self.categories_.items():
+            codes = pd.Categorical(X[column], categories=categories).codes
+            valid = codes >= 0
+            rows.append(np.flatnonzero(valid))
+            cols.append(codes[valid] + offset)
+            offset += len(categories)
+        rows = np.concatenate(rows) if rows else np.empty(0, dtype=int)
+        cols = np.concatenate(cols) if cols else np.empty(0, dtype=int)
+
+        numeric = X[self.numeric_columns_].to_numpy(dtype=dtype)
+        if self.sparse_output:
+            numeric = sparse.csr_matrix(numeric)
+            indicators = sparse.csr_matrix(
+                (np.ones(len(rows), dtype=dtype), (rows, cols - n_numeric)),
+                shape=(n_subjects, offset - n_numeric),
+            )
+            return sparse.hstack([numeric, indicators], format="csr", dtype=dtype)
+
+        encoded = np.zeros((n_subjects, offset), dtype=dtype)
+        encoded[:, :n_numeric] = numeric
+        encoded[rows, cols] = 1
+        return encoded
+
+    def get_feature_names_out(self, input_features=None):
+        """Get the names of the encoded columns, as named by `pd.get_dummies`.
+
+        Parameters
+        ----------
+        input_features : None
+            Ignored.
+
+        Returns
+        -------
+        feature_names_out : np.ndarray of shape (n_features_out,)
+            The numeric columns followed by "<column>_<category>" names.
+        """
+        names = list(self.numeric_columns_)
+        for column, categories in self.categories_.items():
+            names.extend(f"{column}_{category}" for category in categories)
+        return np.asarray(names, dtype=object)
+
+
+@profiled
+@validate_params(
+    {
+        "features": ["array-like"],
+        "phenotypes": ["array-like", "sparse matrix"],
+        "out": [np.ndarray, None],
+        "chunk_size": [Interval(Integral, 1, None, closed="left")],
+    },
+    prefer_skip_nested_validation=False,
+)
+def append_phenotypes(features, phenotypes, out=None, chunk_size=1024):
+    """Join the FC features with an encoded phenotype block column-wise.
+
+    The result is written into a single preallocated array in the dtype of
+    the features, so no pandas frame or intermediate copy of the features
+    is created, and sparse blocks are only densified chunk by chunk.
+
+    Parameters
+    ----------
+    features : np.ndarray of shape (n_subjects, n_features)
+        The FC features, e.g., a memory-mapped array returned by `load_data`.
+
+    phenotypes : np.ndarray or scipy.sparse matrix of shape (n_subjects, n_phenotypes)
+        The encoded phenotypes, e.g., returned by `PhenotypeEncoder`.
+
+    out : np.ndarray of shape (n_subjects, n_features + n_phenotypes) or None, optional (default=None)
+        Array to write the result into, e.g., a writable memory map.
+
+    chunk_size : int, optional (default=1024)
+        Number of subjects copied at a time.
+
+    Returns
+    -------
+    joined : np.ndarray of shape (n_subjects, n_features + n_phenotypes)
+        The features followed by the phenotypes.
+    """
+    from scipy import sparse
+
+    n_subjects, n_features = features.shape
+    if phenotypes.shape[0] != n_subjects:
+        raise ValueError(
+            f"Got {n_subjects} subjects of features but {phenotypes.shape[0]} of phenotypes."
+        )
+
+    shape = (n_subjects, n_features + phenotypes.shape[1])
+    if out is None:
+        out = np.empty(shape, dtype=features.dtype)
+    elif out.shape != shape:
+        raise ValueError(f"Expected out of shape {shape}, got {out.shape}.")
+
+    if sparse.issparse(phenotypes):
+        phenotypes = phenotypes.tocsr()
+
+    for start in range(0, n_subjects, chunk_size):
+        stop = min(start + chunk_size, n_subjects)
+        block = phenotypes[start:stop]
+        out[start:stop, :n_features] = features[start:stop]
+        out[start:stop, n_features:] = (
+            block.toarray() if sparse.issparse(block) else block
+        )
+
+    return out
+
+
+@profiled
 @validate_params(
     {
         "data": [pd.DataFrame],
         "standardize": [StrOptions({"site", "all"}), "boolean"],
-        "one_hot_encode": ["boolean"],
+        "one_hot_encode": ["boolean", StrOptions({"dense", "sparse"})],
     },
     prefer_skip_nested_validation=False,
 )
@@ -71,8 +414,12 @@ def preprocess_phenotypic_data(data, standardize=False, one_hot_encode=True):
                 standardizes the values over all subjects while "site"
                 standardizes according to the site.
 
-    one_hot_encode : boolean (default=True)
+    one_hot_encode : boolean or str of ("dense", "sparse"), (default=True)
                 Whether to one-hot encode categorical variables in the phenotypes.
+                Setting to "dense" or "sparse" returns the encoded phenotypes as
+                a compact NumPy array or `scipy.sparse.csr_matrix` from
+                `PhenotypeEncoder` instead of a pd.DataFrame, with the
+                columns of `PhenotypeEncoder.get_feature_names_out`.
 
     Returns
     -------
@@ -83,7 +430,7 @@ def preprocess_phenotypic_data(data, standardize=False, one_hot_encode=True):
     sites : array-like of shape (n_subjects)
             The site IDs for each subject.
 
-    phenotypes : pd.DataFrame of shape (n_subjects, n_selected_phenotypes)
+    phenotypes : pd.DataFrame, np.ndarray or scipy.sparse.csr_matrix of shape (n_subjects, n_selected_phenotypes)
                 The processed selected phenotype data with imputed values.
     """
     # Avoid in-place modification
@@ -96,11 +443,9 @@ def preprocess_phenotypic_data(data, standardize=False, one_hot_encode=True):
 
     # Standardize FIQ and age by site
     if standardize == "site":
-        for site in data["SITE_ID"].unique():
-            mask = site == data["SITE_ID"]
-            values = data.loc[mask, ["AGE_AT_SCAN", "FIQ"]]
-            values = StandardScaler().fit_transform(values)
-            data.loc[mask, ["AGE_AT_SCAN", "FIQ"]] = values
+        values = data.loc[:, ["AGE_AT_SCAN", "FIQ"]]
+        values = SiteStandardScaler().fit_transform(values, data["SITE_ID"])
+        data.loc[:, ["AGE_AT_SCAN", "FIQ"]] = values
     elif standardize:
         values = data.loc[:, ["AGE_AT_SCAN", "FIQ"]]
         values = StandardScaler().fit_transform(values)
@@ -113,7 +458,8 @@ def preprocess_phenotypic_data(data, standardize=False, one_hot_encode=True):
     # 'AMBIDEXTROUS'. The rest of the values are mapped to 'LEFT' or 'RIGHT'
     # for 'L' or 'R' respectively.
     for key in MAPPING:
-        values = data[key].copy().map(MAPPING[key])
+        # Map the raw values, including missing ones, even if already categorical
+        values = data[key].astype(object).map(MAPPING[key])
         data[key] = values.astype("category")
 
     # Subsets the phenotypes
@@ -124,17 +470,29 @@ def preprocess_phenotypic_data(data, standardize=False, one_hot_encode=True):
     sites = data["SITE_ID"].to_numpy()
     phenotypes = data.drop(columns=["DX_GROUP"])
     # One-hot encode categorical valued phenotypes
-    if one_hot_encode:
+    if one_hot_encode in {"dense", "sparse"}:
+        encoder = PhenotypeEncoder(sparse_output=one_hot_encode == "sparse")
+        phenotypes = encoder.fit_transform(phenotypes)
+    elif one_hot_encode:
         phenotypes = pd.get_dummies(phenotypes)
 
     return labels, sites, phenotypes
 
 
+@profiled
 @validate_params(
-    {"data": ["array-like"], "measures": [list, tuple]},
+    {
+        "data": ["array-like"],
+        "measures": [list, tuple],
+        "n_jobs": [Integral, None],
+        "batch_size": [Interval(Integral, 2, None, closed="left"), None],
+        "dtype": "no_validation",
+    },
     prefer_skip_nested_validation=False,
 )
-def extract_functional_connectivity(data, measures=["pearson"]):
+def extract_functional_connectivity(
+    data, measures=["pearson"], n_jobs=None, batch_size=None, dtype=None
+):
     """Extract functional connectivity features from time series data.
 
     Parameters
@@ -148,25 +506,239 @@ def extract_functional_connectivity(data, measures=["pearson"]):
         Supported measures are "pearson", "partial", "tangent", "covariance", and "precision".
         Multiple measures can be specified as a list to compose a higher-order measure.
 
+    n_jobs : int or None, optional (default=None)
+        Number of processes the subjects are sharded across for the per-subject
+        estimators (-1: all CPUs). The group-level tangent reference is fitted
+        once on the gathered covariances. None means 1.
+
+    batch_size : int or None, optional (default=None)
+        Number of subjects per shard. If None, subjects are split evenly
+        across the `n_jobs` processes.
+
+    dtype : data-type or None, optional (default=None)
+        Data type of the returned features, e.g., `np.float32` or a
+        `DATASET.DTYPE` name like "float32". Each shard is cast before being
+        gathered. If None, the features are kept as float64.
+
     Returns
     -------
     features : array-like
         An array of shape (n_subjects, n_features) containing the extracted features.
         n_features is equal to `n_rois * (n_rois - 1) / 2` for each subjects.
     """
-    for i, k in enumerate(reversed(measures), 1):
-        try:
-            k = AVAILABLE_FC_MEASURES.get(k)
-        except KeyError:
+    for k in measures:
+        if k not in AVAILABLE_FC_MEASURES:
             raise ValueError(
                 f"Unsupported connectivity measure '{k}' in {measures}. "
                 f"Available options are: {', '.join(AVAILABLE_FC_MEASURES.keys())}."
             )
 
+    n_subjects = len(data)
+    n_jobs = effective_n_jobs(n_jobs)
+    if batch_size is None:
+        batch_size = -(-n_subjects // n_jobs)
+    # Tangent transforms need at least two subjects per shard
+    n_shards = max(1, min(n_subjects // 2, -(-n_subjects // batch_size)))
+    bounds = np.linspace(0, n_subjects, n_shards + 1).astype(int)
+    shards = [data[start:stop] for start, stop in zip(bounds[:-1], bounds[1:])]
+
+    parallel = Parallel(n_jobs=min(n_jobs, n_shards))
+
+    # Imported here as nilearn is slow to import and unused by the phenotype helpers
+    from nilearn.connectome import ConnectivityMeasure
+
+    # Chain the per-subject measures within each shard and only
+    # gather the shards when a group-level tangent reference is needed
+    stages = []
+    for i, k in enumerate(reversed(measures), 1):
         # If it is the last transformation, vectorize and discard the diagonal
         # of shape (n_rois * (n_rois - 1) / 2)
         islast = i == len(measures)
-        measure = ConnectivityMeasure(kind=k, vectorize=islast, discard_diagonal=islast)
-        data = measure.fit_transform(data)
+        kind = AVAILABLE_FC_MEASURES[k]
+
+        if kind != "tangent":
+            stages.append(
+                ConnectivityMeasure(
+                    kind=kind, vectorize=islast, discard_diagonal=islast
+                )
+            )
+            continue
+
+        stages.append(ConnectivityMeasure(kind="covariance"))
+        shards = parallel(delayed(_transform_shard)(x, stages) for x in shards)
+
+        measure = ConnectivityMeasure(
+            kind="tangent",
+            cov_estimator=_PrecomputedCovariance(),
+            vectorize=islast,
+            discard_diagonal=islast,
+        )
+        measure.fit(np.concatenate(shards))
+        stages = [measure]
+
+    shards = parallel(delayed(_transform_shard)(x, stages, dtype) for x in shards)
+
+    return np.concatenate(shards)
+
+
+@profiled
+@validate_params(
+    {
+        "source": [str, HasMethods(["__iter__"])],
+        "store_dir": [str],
+        "measures": [list, tuple],
+        "batch_size": [Interval(Integral, 1, None, closed="left")],
+        "dtype": "no_validation",
+        "sub_id_pattern": [str],
+        "n_jobs": [Integral, None],
+    },
+    prefer_skip_nested_validation=False,
+)
+def stream_functional_connectivity(
+    source,
+    store_dir,
+    measures=["pearson"],
+    batch_size=32,
+    dtype=np.float32,
+    sub_id_pattern=r"(\d{5,})",
+    n_jobs=None,
+):
+    """Extract functional connectivity features subject by subject into an on-disk store.
+
+    Time series are loaded and converted in batches of `batch_size` subjects,
+    so memory stays bounded regardless of the cohort size. The features are
+    appended to a feature store aligned to `SUB_ID`, and subjects already in
+    the store are skipped, so interrupted or extended runs only process the
+    new subjects.
+
+    Parameters
+    ----------
+    source : str or iterable of (int, array-like or str)
+        Either a directory of per-subject time series files (`.npy`, `.1D`,
+        or `.csv`) of shape (t, n_rois), or an iterable of `(sub_id, time_series)`
+        pairs where `time_series` is an array or a path to such a file.
+
+    store_dir : str
+        Directory of the feature store, see `helpers.store.read_feature_store`.
+
+    measures : list[str], optional (default=["pearson"])
+        A list of connectivity measures as in `extract_functional_connectivity`.
+        Only per-subject measures are supported since the tangent reference
+        depends on the whole cohort.
+
+    batch_size : int, optional (default=32)
+        Number of subjects loaded and converted at a time.
+
+    dtype : data-type, optional (default=np.float32)
+        Data type of the stored features.
+
+    sub_id_pattern : str, optional (default=r"(\d{5,})")
+        Regular expression whose first group extracts the subject ID from the
+        file names when `source` is a directory.
+
+    n_jobs : int or None, optional (default=None)
+        Number of processes used within each batch, see
+        `extract_functional_connectivity`.
+
+    Returns
+    -------
+    features : np.memmap of shape (n_subjects, n_features)
+        All features in the store.
+
+    sub_ids : np.ndarray of shape (n_subjects,)
+        Subject IDs aligned with the rows of `features`.
+    """
+    if "tangent" in measures:
+        raise ValueError(
+            "Tangent measures depend on the whole cohort and cannot be streamed, "
+            "use extract_functional_connectivity instead."
+        )
+
+    if isinstance(source, str):
+        source = _list_time_series(source, sub_id_pattern)
+
+    meta = {"measures": list(measures)}
+    _, stored, stored_meta = read_feature_store(store_dir)
+    if stored_meta.get("measures", meta["measures"]) != meta["measures"]:
+        raise ValueError(
+            f"Feature store {store_dir} holds {stored_meta['measures']} features, "
+            f"got measures={meta['measures']}."
+        )
+    stored = set(stored.tolist())
+
+    batch_ids, batch = [], []
+    for sub_id, time_series in source:
+        if sub_id in stored:
+            continue
+        if isinstance(time_series, str):
+            time_series = _load_time_series(time_series)
+
+        batch_ids.append(sub_id)
+        batch.append(np.asarray(time_series))
+        stored.add(sub_id)
+
+        if len(batch) == batch_size:
+            features = extract_functional_connectivity(
+                batch, measures, n_jobs=n_jobs, dtype=dtype
+            )
+            append_feature_store(store_dir, batch_ids, features, **meta)
+            batch_ids, batch = [], []
+
+    if batch:
+        features = extract_functional_connectivity(
+            batch, measures, n_jobs=n_jobs, dtype=dtype
+        )
+        append_feature_store(store_dir, batch_ids, features, **meta)
+
+    features, sub_ids, _ = read_feature_store(store_dir)
+    return features, sub_ids
+
+
+def _list_time_series(directory, sub_id_pattern):
+    """List the per-subject time series files of a directory with their subject IDs."""
+    pattern = re.compile(sub_id_pattern)
+    for name in sorted(os.listdir(directory)):
+        if os.path.splitext(name)[1].lower() not in {".npy", ".1d", ".csv"}:
+            continue
+        match = pattern.search(name)
+        if match is None:
+            raise ValueError(f"Cannot find a subject ID in file name '{name}'.")
+        yield int(match.group(1)), os.path.join(directory, name)
+
+
+def _load_time_series(path):
+    """Load a (t, n_rois) time series from a .npy, .1D, or .csv file."""
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".npy":
+        return np.load(path)
+    if ext == ".1d":
+        # AFNI .1D files are whitespace-delimited with a commented header
+        return np.loadtxt(path, comments="#", ndmin=2)
+    if ext == ".csv":
+        # Header rows, if any, are parsed as NaN and dropped
+        values = np.genfromtxt(path, delimiter=",", ndmin=2)
+        return values[~np.isnan(values).all(axis=1)]
+    raise ValueError(f"Unsupported time series file format: {path}")
+
+
+class _PrecomputedCovariance(BaseEstimator):
+    """Covariance "estimator" returning its input, used to fit the
+    tangent reference on covariances computed in parallel."""
+
+    def fit(self, X, y=None):
+        self.covariance_ = np.asarray(X)
+        return self
+
+
+def _transform_shard(data, stages, dtype=None):
+    """Apply a chain of connectivity measures to a shard of subjects."""
+    for measure in stages:
+        if hasattr(measure, "mean_"):
+            data = measure.transform(data)
+        else:
+            data = clone(measure).fit_transform(data)
+
+    if dtype is not None:
+        data = data.astype(dtype, copy=False)
 
     return data
@@ -0,0 +1,202 @@
+import functools
+import json
+import os
+import sys
+import time
+from contextlib import contextmanager
+
+import pandas as pd
+from scipy import sparse
+
+try:
+    import resource
+except ImportError:  # pragma: no cover - not available on Windows
+    resource = None
+
+__all__ = ["RunProfile", "profiled", "stage", "start_profiling", "stop_profiling"]
+
+# Profile being recorded, None when profiling is disabled
+_ACTIVE = None
+
+
+class RunProfile:
+    """Time and memory records of the helper calls of a run.
+
+    Each record holds the name of the call or stage, its nesting depth, its
+    start (in seconds since profiling started), wall and CPU times, the peak
+    resident set size of the process after the call and how much the call
+    raised it, and the size of its array inputs and outputs.
+
+    CPU time and memory are measured for the current process only, so work
+    done in worker processes (e.g., `n_jobs > 1`) only shows in the wall time.
+    """
+
+    def __init__(self):
+        self.records = []
+        self._origin = time.perf_counter()
+        self._depth = 0
+
+    def to_frame(self):
+        """Get the records as a `pd.DataFrame` with one row per call."""
+        return pd.DataFrame(self.records)
+
+    def save(self, path):
+        """Write the records to a JSON file, or a CSV file if `path` ends with ".csv".
+
+        Parameters
+        ----------
+        path : str
+            Output path, e.g., next to the saved results.
+        """
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        if path.endswith(".csv"):
+            self.to_frame().to_csv(path, index=False)
+            return
+        with open(path, "w") as f:
+            json.dump(self.records, f, indent=2)
+
+
+def start_profiling():
+    """Start recording the profiled helper calls into a new `RunProfile`.
+
+    Returns
+    -------
+    profile : RunProfile
+        The profile filled by the following calls until `stop_profiling`.
+    """
+    global _ACTIVE
+    _ACTIVE = RunProfile()
+    return _ACTIVE
+
+
+def stop_profiling():
+    """Stop recording the profiled helper calls.
+
+    Returns
+    -------
+    profile : RunProfile or None
+        The recorded profile, or None if profiling was not started.
+    """
+    global _ACTIVE
+    profile, _ACTIVE = _ACTIVE, None
+    return profile
+
+
+@contextmanager
+def stage(name, **arrays):
+    """Record a block of code as a named stage of the profile, e.g., the model fitting.
+
+    Does nothing when profiling is disabled.
+
+    Parameters
+    ----------
+    name : str
+        Name of the stage in the profile.
+
+    **arrays : array-like
+        Inputs of the stage whose size is recorded.
+    """
+    if _ACTIVE is None:
+        yield
+        return
+
+    with _measure(_ACTIVE, name, list(arrays.values())):
+        yield
+
+
+def profiled(func):
+    """Record the time and memory of every call of a function while profiling is enabled.
+
+    When profiling is disabled, the wrapper only checks a module global before
+    calling the function.
+    """
+    name = f"{func.__module__.rsplit('.', 1)[-1]}.{func.__qualname__}"
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if _ACTIVE is None:
+            return func(*args, **kwargs)
+
+        inputs = [*args, *kwargs.values()]
+        with _measure(_ACTIVE, name, inputs) as outputs:
+            result = func(*args, **kwargs)
+            outputs.append(result)
+        return result
+
+    return wrapper
+
+
+@contextmanager
+def _measure(profile, name, inputs):
+    """Time a call and record it in the profile once it returns."""
+    outputs = []
+    record = {
+        "name": name,
+        "depth": profile._depth,
+        "start": time.perf_counter() - profile._origin,
+    }
+    # Appended before the call, so that the records are ordered by start
+    profile.records.append(record)
+    peak_before = _peak_rss_mb()
+    cpu_start, wall_start = time.process_time(), time.perf_counter()
+    profile._depth += 1
+    try:
+        yield outputs
+    finally:
+        profile._depth -= 1
+        wall_time = time.perf_counter() - wall_start
+        cpu_time = time.process_time() - cpu_start
+        peak_after = _peak_rss_mb()
+
+        results = outputs[0] if outputs else ()
+        if not isinstance(results, tuple):
+            results = (results,)
+        record.update(
+            {
+                "wall_time": wall_time,
+                "cpu_time": cpu_time,
+                "peak_rss_mb": peak_after,
+                "peak_rss_increase_mb": (
+                    None if peak_after is None else peak_after - peak_before
+                ),
+                "input_bytes": sum(_nbytes(x) for x in inputs),
+                "output_bytes": sum(_nbytes(x) for x in results),
+                "output_shapes": [_shape(x) for x in results],
+            }
+        )
+
+
+def _peak_rss_mb():
+    """Peak resident set size of the process in MB, or None if unavailable."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Reported in bytes on macOS and in kilobytes on Linux
+    return peak / 1024**2 if sys.platform == "darwin" else peak / 1024
+
+
+def _nbytes(obj, depth=0):
+    """Size in bytes of an array, data frame, or a shallow container of them."""
+    if isinstance(obj, pd.DataFrame):
+        return int(obj.memory_usage(index=False).sum())
+    if sparse.issparse(obj):
+        return sum(
+            getattr(obj, attr).nbytes
+            for attr in ("data", "indices", "indptr")
+            if hasattr(obj, attr)
+        )
+    if hasattr(obj, "nbytes"):
+        return int(obj.nbytes)
+    if depth < 2 and isinstance(obj, (list, tuple)):
+        return sum(_nbytes(x, depth + 1) for x in obj)
+    if depth < 2 and isinstance(obj, dict):
+        return sum(_nbytes(x, depth + 1) for x in obj.values())
+    return 0
+
+
+def _shape(obj):
+    shape = getattr(obj, "shape", None)
+    return None if shape is None else list(shape)
@@ -0,0 +1,288 @@
+import os
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+from joblib import Parallel, delayed, hash as joblib_hash, parallel_config
+from sklearn.base import clone
+from sklearn.model_selection import ParameterGrid, ParameterSampler
+
+from .selection import edge_scores
+from .sweep import _fit_task, _format_results, fingerprint
+
+__all__ = ["search_candidates", "run_variants"]
+
+
+def search_candidates(trainer):
+    """
+    List the candidates the hyperparameter search of a trainer evaluates.
+
+    The candidates are drawn exactly as `AutoMIDAClassificationTrainer.fit`
+    draws them, i.e., the default (or given) classifier and MIDA grids are
+    merged and sampled with the same random state, so evaluating them one by
+    one reproduces the search of the trainer.
+
+    Parameters
+    ----------
+    trainer : AutoMIDAClassificationTrainer
+        Unfitted trainer with `search_strategy="grid"` or `"random"`.
+
+    Returns
+    -------
+    candidates : list of dict
+        Parameter candidates, in the order of the trainer's `cv_results_`.
+
+    Raises
+    ------
+    ValueError
+        If the trainer uses `classifier="auto"`, whose candidates are
+        classifier objects that cannot be evaluated one by one.
+    """
+    params = trainer.get_params()
+    if params["classifier"] == "auto":
+        raise ValueError(
+            "classifier='auto' is not supported, choose a classifier instead."
+        )
+
+    _, classifier_grid = trainer._get_classifier_and_grid()
+    param_grid = {**classifier_grid, **trainer._get_mida_and_grid()}
+
+    if params["search_strategy"] == "grid":
+        return list(ParameterGrid(param_grid))
+    return list(
+        ParameterSampler(
+            param_grid,
+            params["num_search_iter"],
+            random_state=params["random_state"],
+        )
+    )
+
+
+def run_variants(
+    variants,
+    x,
+    y,
+    groups=None,
+    n_jobs=-1,
+    inner_max_num_threads=1,
+    temp_folder=None,
+    verbose=0,
+    screener=None,
+    fold_cache=None,
+):
+    """
+    Fit several model variants with one process pool shared by all their tasks.
+
+    The (variant, candidate, fold) fits of all the variants are scheduled on
+    the same pool instead of one variant after another, so the cores stay busy
+    while a variant finishes its slowest folds. The features are passed to the
+    workers as a memory-mapped array (dumped once to `temp_folder` when given
+    in memory), so they are not pickled for every task, and the BLAS threads
+    of each worker are limited to avoid oversubscribing the cores. The best
+    candidate of every variant is then refitted on the same pool.
+
+    With a `screener`, the FC edges are screened in every fold on its training
+    subjects only, once per fold for all the variants and candidates, and the
+    trainers are fitted on the kept edges.
+
+    Parameters
+    ----------
+    variants : dict of str -> tuple of (estimator, dict)
+        Unfitted trainer of each variant, e.g., `AutoMIDAClassificationTrainer`,
+        and the extra arguments of its `fit`, e.g., `{"group_labels": sites}`.
+        The folds are taken from the `cv` of each trainer.
+
+    x : array-like of shape (n_subjects, n_features)
+        Features, e.g., a memory-mapped array from `load_data`.
+
+    y : array-like of shape (n_subjects,)
+        Labels.
+
+    groups : array-like of shape (n_subjects,) or None, optional (default=None)
+        Group labels used by the cross-validation, e.g., sites.
+
+    n_jobs : int, optional (default=-1)
+        Number of worker processes (-1: all CPUs).
+
+    inner_max_num_threads : int, optional (default=1)
+        Maximum number of BLAS threads in each worker.
+
+    temp_folder : str or None, optional (default=None)
+        Directory where in-memory features are dumped. If None, the default
+        temporary directory is used.
+
+    verbose : int, optional (default=0)
+        Verbosity level of the pool.
+
+    screener : EdgeScreener or None, optional (default=None)
+        Unfitted edge screening applied before the trainers. If None, all
+        the edges are used.
+
+    fold_cache : FoldCache or None, optional (default=None)
+        Cache of the screenings fitted in every fold and of the scores of
+        every (variant, candidate, fold) task, shared with later runs, so a
+        repeated or interrupted run only fits the tasks that have not
+        finished yet.
+
+    Returns
+    -------
+    trainers : dict of str -> estimator
+        Trainer of each variant refitted on all subjects with its best
+        candidate. Its own `cv_results_` only covers the first fold, hence
+        `cv_results` should be used to compare the variants. With a
+        `screener`, the screening fitted on all subjects is stored in its
+        `edge_screener_` attribute, whose `inverse_transform_coef` maps the
+        coefficients of the trainer back to all the edges.
+
+    cv_results : dict of str -> dict
+        Results of each variant over all candidates and folds, with the same
+        layout as `cv_results_`, which can be passed to `compile_results`.
+
+    timings : pd.DataFrame
+        One row per task with its variant, candidate, fold, stage ("cv",
+        "refit", or "cached" for the tasks loaded from `fold_cache`), worker
+        process, start and end (in seconds since the run started), wall
+        time, and CPU time. Cached tasks have no timing.
+    """
+    with tempfile.TemporaryDirectory(dir=temp_folder) as tmp_dir:
+        if not isinstance(x, np.memmap):
+            x = _dump(np.asarray(x), tmp_dir)
+
+        tasks, task_x, screened = [], [], {}
+        for name, (trainer, fit_params) in variants.items():
+            cv = trainer.get_params()["cv"]
+            splits = list(cv.split(x, y, groups)) if hasattr(cv, "split") else list(cv)
+            candidates = search_candidates(trainer)
+            tasks += [
+                (name, i, j, params, [split])
+                for i, params in enumerate(candidates)
+                for j, split in enumerate(splits)
+            ]
+            fold_x = [x] * len(splits)
+            if screener is not None:
+                # Variants sharing the same folds share their screened edges
+                for j, (train, _) in enumerate(splits):
+                    key = joblib_hash(train)
+                    if key not in screened:
+                        fold_screener = _fit_screener(screener, x, y, train, fold_cache)
+                        screened[key] = _dump(fold_screener.transform(x), tmp_dir)
+                    fold_x[j] = screened[key]
+            task_x += [fold_x[j] for _ in candidates for j in range(len(splits))]
+
+        if fold_cache is None:
+            jobs = (
+                delayed(_fit_task)(
+                    variants[name][0],
+                    params,
+                    task_cv,
+                    False,
+                    task_x[k],
+                    y,
+                    groups,
+                    **variants[name][1],
+                )
+                for k, (name, _, _, params, task_cv) in enumerate(tasks)
+            )
+        else:
+            # Fingerprint every feature array once, not in every task
+            fingerprints = {id(a): fingerprint(a, y, groups) for a in task_x}
+            jobs = (
+                delayed(fold_cache.fit_task)(
+                    variants[name][0],
+                    params,
+                    task_cv[0],
+                    task_x[k],
+                    y,
+                    groups,
+                    variants[name][1],
+                    data_key=joblib_hash(
+                        [fingerprints[id(task_x[k])], variants[name][1]]
+                    ),
+                )
+                for k, (name, _, _, params, task_cv) in enumerate(tasks)
+            )
+
+        origin = time.time()
+        with parallel_config(
+            backend="loky", inner_max_num_threads=inner_max_num_threads
+        ):
+            results = Parallel(n_jobs=n_jobs, verbose=verbose)(jobs)
+
+            cv_results, best = {}, {}
+            for name, (trainer, _) in variants.items():
+                indices = [k for k, task in enumerate(tasks) if task[0] == name]
+                variant_tasks = [tasks[k][1:] for k in indices]
+                scores = [results[k][:2] for k in indices]
+                n_candidates = max(i for i, *_ in variant_tasks) + 1
+                n_splits = max(j for _, j, *_ in variant_tasks) + 1
+                candidates = [None] * n_candidates
+                for i, _, params, _ in variant_tasks:
+                    candidates[i] = params
+
+                cv_results[name] = _format_results(
+                    candidates, n_splits, list(scores[0][0]), variant_tasks, scores
+                )
+                refit = trainer.get_params()["refit"]
+                refit = refit if isinstance(refit, str) else "score"
+                rank = cv_results[name][f"rank_test_{refit}"]
+                best[name] = (candidates[np.argmin(rank)], variant_tasks[0][3])
+
+            refit_x, refit_screener = x, None
+            if screener is not None:
+                refit_screener = _fit_screener(screener, x, y, np.arange(len(y)))
+                refit_x = _dump(refit_screener.transform(x), tmp_dir)
+
+            # The refit also evaluates the first fold, which is the only way
+            # for the trainer to pick its single candidate as the best one
+            refits = Parallel(n_jobs=n_jobs, verbose=verbose)(
+                delayed(_fit_task)(
+                    variants[name][0],
+                    params,
+                    task_cv,
+                    True,
+                    refit_x,
+                    y,
+                    groups,
+                    **variants[name][1],
+                )
+                for name, (params, task_cv) in best.items()
+            )
+
+    rows = [
+        # Tasks loaded from the fold cache were fitted before this run
+        (
+            {"variant": name, "candidate": i, "fold": j, "stage": "cv", **timing}
+            if timing["start"] >= origin
+            else {"variant": name, "candidate": i, "fold": j, "stage": "cached"}
+        )
+        for (name, i, j, *_), (*_, timing) in zip(tasks, results)
+    ]
+    rows += [
+        {"variant": name, "candidate": None, "fold": None, "stage": "refit", **timing}
+        for name, (*_, timing) in zip(best, refits)
+    ]
+    timings = pd.DataFrame(rows).astype({"candidate": "Int64", "fold": "Int64"})
+    timings[["start", "end"]] -= origin
+
+    trainers = {name: trainer for name, (trainer, *_) in zip(best, refits)}
+    if refit_screener is not None:
+        for trainer in trainers.values():
+            trainer.edge_screener_ = refit_screener
+    return trainers, cv_results, timings
+
+
+def _fit_screener(screener, x, y, indices, fold_cache=None):
+    """Screen the edges on the given subjects only, keeping the selection fold-safe."""
+    if fold_cache is not None:
+        return fold_cache.fit_transformer(screener, x, y, indices)
+    scores = edge_scores(x, y, screener.method, indices, screener.chunk_size)
+    return clone(screener).set_support(scores)
+
+
+def _dump(x, folder):
+    """Save features to a new file of the folder and open them as a memory map."""
+    fd, path = tempfile.mkstemp(suffix=".npy", dir=folder)
+    os.close(fd)
+    np.save(path, x)
+    return np.load(path, mmap_mode="r")
@@ -0,0 +1,190 @@
+import numpy as np
+from sklearn.base import BaseEstimator, TransformerMixin
+
+__all__ = ["edge_scores", "EdgeScreener"]
+
+SCREENING_METHODS = {"f_classif", "variance"}
+
+
+def edge_scores(x, y=None, method="f_classif", indices=None, chunk_size=1024):
+    """
+    Score every FC edge with a univariate statistic in one pass over the subjects.
+
+    The per-class sums and sums of squares of the edges are accumulated chunk
+    by chunk in float64, so memory-mapped features are never loaded as a
+    whole, and the statistics are derived from them with vectorized NumPy.
+
+    Parameters
+    ----------
+    x : array-like of shape (n_subjects, n_edges)
+        Vectorized FC features, e.g., a memory-mapped array.
+
+    y : array-like of shape (n_subjects,) or None, optional (default=None)
+        Labels. Required for "f_classif".
+
+    method : {"f_classif", "variance"}, optional (default="f_classif")
+        ANOVA F-statistic between the classes (as `sklearn.feature_selection.f_classif`)
+        or variance of each edge. Constant edges score zero.
+
+    indices : array-like of shape (n_selected,) or None, optional (default=None)
+        Subjects to use, e.g., the training subjects of a fold. If None, all
+        subjects are used.
+
+    chunk_size : int, optional (default=1024)
+        Number of subjects read at a time.
+
+    Returns
+    -------
+    scores : np.ndarray of shape (n_edges,)
+        Score of each edge, higher is more relevant.
+    """
+    if method not in SCREENING_METHODS:
+        raise ValueError(
+            f"method must be one of {sorted(SCREENING_METHODS)}, got '{method}' instead."
+        )
+    if method == "f_classif" and y is None:
+        raise ValueError("y is required to compute F-statistics.")
+
+    indices = np.arange(x.shape[0]) if indices is None else np.asarray(indices)
+    if y is None:
+        codes, n_classes = np.zeros(len(indices), dtype=int), 1
+    else:
+        classes, codes = np.unique(np.asarray(y)[indices], return_inverse=True)
+        n_classes = len(classes)
+
+    counts = np.bincount(codes, minlength=n_classes).astype(np.float64)
+    sums = np.zeros((n_classes, x.shape[1]))
+    sumsq = np.zeros(x.shape[1])
+    for start in range(0, len(indices), chunk_size):
+        chunk = np.asarray(x[indices[start : start + chunk_size]], dtype=np.float64)
+        chunk_codes = codes[start : start + chunk_size]
+        # One-hot class matrix turns the per-class sums into a matrix product
+        sums += np.eye(n_classes)[chunk_codes].T @ chunk
+        sumsq += np.einsum("ij,ij->j", chunk, chunk)
+
+    n_subjects = counts.sum()
+    total = sums.sum(axis=0)
+    ss_total = sumsq - total**2 / n_subjects
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        if method == "variance":
+            scores = ss_total / n_subjects
+        else:
+            ss_between = (sums**2 / counts[:, None]).sum(axis=0) - total**2 / n_subjects
+            ss_within = ss_total - ss_between
+            scores = (ss_between / (n_classes - 1)) / (
+                ss_within / (n_subjects - n_classes)
+            )
+
+    # Edges constant up to rounding errors carry no information
+    scores[ss_total <= np.finfo(np.float64).eps * sumsq] = 0.0
+    return np.nan_to_num(scores, nan=0.0, posinf=np.finfo(np.float64).max)
+
+
+class EdgeScreener(TransformerMixin, BaseEstimator):
+    """Keep the top K FC edges by a univariate statistic.
+
+    Fitted on the training subjects of each fold only, it makes the edge
+    selection fold-safe. The kept edges are sorted, so coefficients learned
+    on the screened features can be mapped back to the full edge space with
+    `inverse_transform_coef`, e.g., to plot them with `visualize_connectome`.
+
+    Parameters
+    ----------
+    method : {"f_classif", "variance"}, optional (default="f_classif")
+        Statistic used to rank the edges, see `edge_scores`.
+
+    num_features : int, optional (default=1000)
+        Number of edges kept. All edges are kept if there are fewer.
+
+    chunk_size : int, optional (default=1024)
+        Number of subjects read at a time when computing the statistic.
+
+    Attributes
+    ----------
+    scores_ : np.ndarray of shape (n_edges,)
+        Statistic of each edge.
+
+    support_ : np.ndarray of shape (n_kept,)
+        Sorted indices of the kept edges.
+    """
+
+    def __init__(self, method="f_classif", num_features=1000, chunk_size=1024):
+        self.method = method
+        self.num_features = num_features
+        self.chunk_size = chunk_size
+
+    def fit(self, X, y=None):
+        """Score the edges and select the top `num_features`.
+
+        Parameters
+        ----------
+        X : array-like of shape (n_subjects, n_edges)
+            Vectorized FC features.
+
+        y : array-like of shape (n_subjects,) or None, optional (default=None)
+            Labels. Required for "f_classif".
+
+        Returns
+        -------
+        self : EdgeScreener
+            The fitted screener.
+        """
+        scores = edge_scores(X, y, self.method, chunk_size=self.chunk_size)
+        return self.set_support(scores)
+
+    def set_support(self, scores):
+        """Select the top `num_features` edges from precomputed scores.
+
+        Parameters
+        ----------
+        scores : np.ndarray of shape (n_edges,)
+            Statistic of each edge, e.g., cached for a fold by `edge_scores`.
+
+        Returns
+        -------
+        self : EdgeScreener
+            The fitted screener.
+        """
+        self.scores_ = scores
+        self.n_features_in_ = len(scores)
+        k = min(self.num_features, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k] if k < len(scores) else slice(None)
+        self.support_ = np.sort(np.arange(len(scores))[top])
+        return self
+
+    def transform(self, X):
+        """Keep the selected edges.
+
+        Parameters
+        ----------
+        X : array-like of shape (n_subjects, n_edges)
+            Vectorized FC features.
+
+        Returns
+        -------
+        X_screened : np.ndarray of shape (n_subjects, n_kept)
+            The selected edges.
+        """
+        return np.asarray(X)[:, self.support_]
+
+    def inverse_transform_coef(self, coef):
+        """Map coefficients of the screened edges back to all the edges.
+
+        Parameters
+        ----------
+        coef : array-like of shape (..., n_kept + n_extra)
+            Coefficients learned on the screened edges, optionally followed
+            by coefficients of extra features (e.g., phenotypes), which are
+            appended unchanged.
+
+        Returns
+        -------
+        coef_full : np.ndarray of shape (..., n_edges + n_extra)
+            Coefficients with zeros for the edges that were not selected.
+        """
+        coef = np.asarray(coef)
+        n_kept = len(self.support_)
+        full = np.zeros(coef.shape[:-1] + (self.n_features_in_,), dtype=coef.dtype)
+        full[..., self.support_] = coef[..., :n_kept]
+        return np.concatenate([full, coef[..., n_kept:]], axis=-1)
@@ -0,0 +1,130 @@
+import io
+import json
+import os
+import tempfile
+
+import numpy as np
+
+__all__ = ["read_feature_store", "append_feature_store"]
+
+FEATURES_FILE = "features.bin"
+SUB_IDS_FILE = "sub_ids.npy"
+META_FILE = "meta.json"
+
+
+def read_feature_store(store_dir, mmap_mode="r"):
+    """
+    Open an appendable feature store written by `append_feature_store`.
+
+    Parameters
+    ----------
+    store_dir : str
+        Directory of the feature store.
+
+    mmap_mode : {"r", "r+", "c"}, optional (default="r")
+        Memory-map mode used to open the features.
+
+    Returns
+    -------
+    features : np.memmap of shape (n_subjects, n_features) or None
+        Stored features, or None if the store is empty.
+
+    sub_ids : np.ndarray of shape (n_subjects,)
+        Subject IDs aligned with the rows of `features`.
+
+    meta : dict
+        Metadata recorded when the store was created.
+    """
+    meta = _read_meta(store_dir)
+    sub_ids_path = os.path.join(store_dir, SUB_IDS_FILE)
+    if meta is None or not os.path.exists(sub_ids_path):
+        return None, np.empty(0, dtype=np.int64), meta or {}
+
+    sub_ids = np.load(sub_ids_path)
+    if len(sub_ids) == 0:
+        return None, sub_ids, meta
+
+    features = np.memmap(
+        os.path.join(store_dir, FEATURES_FILE),
+        dtype=meta["dtype"],
+        mode=mmap_mode,
+        shape=(len(sub_ids), meta["n_features"]),
+    )
+    return features, sub_ids, meta
+
+
+def append_feature_store(store_dir, sub_ids, features, **meta):
+    """
+    Append the features of new subjects to a feature store.
+
+    Rows are appended to a raw binary file before the subject IDs are
+    atomically updated, so an interrupted append leaves the store in its
+    previous state and the trailing partial rows are discarded on the next
+    append.
+
+    Parameters
+    ----------
+    store_dir : str
+        Directory of the feature store, created if missing.
+
+    sub_ids : array-like of shape (n_subjects,)
+        Subject IDs of the appended rows.
+
+    features : np.ndarray of shape (n_subjects, n_features)
+        Features to append.
+
+    **meta : dict
+        JSON-serializable metadata recorded on creation and checked against
+        the existing metadata on later appends.
+
+    Raises
+    ------
+    ValueError
+        If the features or metadata do not match the existing store.
+    """
+    features = np.asarray(features)
+    sub_ids = np.asarray(sub_ids)
+    meta = {
+        **meta,
+        "dtype": features.dtype.str,
+        "n_features": int(features.shape[1]),
+    }
+
+    os.makedirs(store_dir, exist_ok=True)
+    existing = _read_meta(store_dir)
+    if existing is None:
+        _atomic_write(os.path.join(store_dir, META_FILE), json.dumps(meta).encode())
+    elif existing != meta:
+        raise ValueError(
+            f"Feature store {store_dir} was created with {existing}, got {meta}."
+        )
+
+    sub_ids_path = os.path.join(store_dir, SUB_IDS_FILE)
+    stored = np.load(sub_ids_path) if os.path.exists(sub_ids_path) else sub_ids[:0]
+
+    # Drop rows of a previously interrupted append before writing new ones
+    row_bytes = features.dtype.itemsize * features.shape[1]
+    with open(os.path.join(store_dir, FEATURES_FILE), "ab") as f:
+        f.truncate(len(stored) * row_bytes)
+        f.write(np.ascontiguousarray(features).tobytes())
+        f.flush()
+        os.fsync(f.fileno())
+
+    buffer = io.BytesIO()
+    np.save(buffer, np.concatenate([stored, sub_ids]))
+    _atomic_write(sub_ids_path, buffer.getvalue())
+
+
+def _read_meta(store_dir):
+    meta_path = os.path.join(store_dir, META_FILE)
+    if not os.path.exists(meta_path):
+        return None
+    with open(meta_path, "r") as f:
+        return json.load(f)
+
+
+def _atomic_write(path, content):
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    with os.fdopen(fd, "wb") as f:
+        f.write(content)
+    os.replace(tmp_path, path)
@@ -0,0 +1,560 @@
+import math
+import os
+import time
+
+import numpy as np
+from joblib import Memory, Parallel, delayed, hash as joblib_hash
+from scipy.stats import rankdata
+from sklearn.base import clone
+from sklearn.metrics import get_scorer
+from sklearn.utils import _safe_indexing, check_random_state
+from sklearn.utils.validation import _num_samples
+
+__all__ = ["fingerprint", "FoldCache", "successive_halving"]
+
+
+def fingerprint(*arrays):
+    """
+    Compute a content fingerprint of the given arrays.
+
+    Parameters
+    ----------
+    *arrays : array-like or None
+        Arrays (e.g., features, labels, and groups) identifying a dataset.
+
+    Returns
+    -------
+    fingerprint : str
+        Hexadecimal hash of the array contents.
+    """
+    return joblib_hash([np.asarray(a) if a is not None else None for a in arrays])
+
+
+class FoldCache:
+    """
+    On-disk memoization of cross-validation folds, per-fold fitted transforms,
+    and per-(candidate, fold) scores shared across model variants.
+
+    Everything is keyed by the data fingerprint and the cross-validation
+    configuration, so model variants trained on the same data reuse the same
+    folds and preprocessing, and repeated or interrupted sweeps only compute
+    the (candidate, fold) pairs that have not finished yet.
+
+    Parameters
+    ----------
+    cache_dir : str
+        Directory of the joblib cache.
+
+    verbose : int, optional (default=0)
+        Verbosity level of the joblib cache.
+    """
+
+    def __init__(self, cache_dir, verbose=0):
+        self.cache_dir = cache_dir
+        self.verbose = verbose
+        self._memory = Memory(cache_dir, verbose=verbose)
+        self._split = self._memory.cache(_split, ignore=["cv", "x", "y", "groups"])
+        self._fit_transformer = self._memory.cache(
+            _fit_transformer, ignore=["x", "y", "train"]
+        )
+        self._evaluate = self._memory.cache(
+            _evaluate, ignore=["x", "y", "train", "test", "fit_params"]
+        )
+        self._fit_task = self._memory.cache(
+            _fit_cv_task, ignore=["x", "y", "groups", "fit_params"]
+        )
+
+    def splits(self, cv, x, y=None, groups=None):
+        """
+        Return the (train, test) indices of every fold, computed once per dataset.
+
+        The result can be passed as `cv` to the trainers so that all model
+        variants share identical folds.
+
+        Parameters
+        ----------
+        cv : cross-validation generator
+            E.g., `RepeatedStratifiedKFold` or `LeavePGroupsOut`. Its
+            representation must capture its configuration, including the
+            random state.
+
+        x : array-like of shape (n_samples, n_features)
+            Features.
+
+        y : array-like of shape (n_samples,) or None, optional (default=None)
+            Labels.
+
+        groups : array-like of shape (n_samples,) or None, optional (default=None)
+            Group labels, e.g., sites.
+
+        Returns
+        -------
+        splits : list of tuple of (np.ndarray, np.ndarray)
+            The train and test indices of every fold.
+        """
+        key = (fingerprint(x, y, groups), repr(cv))
+        return self._split(key, cv, x, y, groups)
+
+    def fit_transformer(self, transformer, x, y, train, fit_params=None):
+        """
+        Fit a transformer on the training indices of a fold, or load it if already fitted.
+
+        Parameters
+        ----------
+        transformer : estimator
+            Unfitted transformer, e.g., `SiteStandardScaler`.
+
+        x : array-like of shape (n_samples, n_features)
+            Features.
+
+        y : array-like of shape (n_samples,) or None
+            Labels.
+
+        train : np.ndarray
+            Training indices of the fold.
+
+        fit_params : dict or None, optional (default=None)
+            Extra arguments passed to `fit`, sliced to the training samples
+            if they have one value per sample.
+
+        Returns
+        -------
+        transformer : estimator
+            The fitted transformer.
+        """
+        fit_params = fit_params or {}
+        key = (fingerprint(x, y, *fit_params.values()), joblib_hash(train))
+        return self._fit_transformer(key, transformer, x, y, train, fit_params)
+
+    def fit_task(
+        self, trainer, params, split, x, y, groups=None, fit_params=None, data_key=None
+    ):
+        """
+        Fit a trainer on a single candidate and fold, or load its scores if already fitted.
+
+        Unlike `search`, the trainer runs its own (one-point) search on the
+        fold, so trainers such as `AutoMIDAClassificationTrainer` that handle
+        their `fit` arguments themselves can be resumed per (candidate, fold).
+
+        Parameters
+        ----------
+        trainer : estimator
+            Unfitted trainer, e.g., `AutoMIDAClassificationTrainer`.
+
+        params : dict
+            Parameter candidate, e.g., from `helpers.runner.search_candidates`.
+
+        split : tuple of (np.ndarray, np.ndarray)
+            Train and test indices of the fold.
+
+        x : array-like of shape (n_samples, n_features)
+            Features.
+
+        y : array-like of shape (n_samples,)
+            Labels.
+
+        groups : array-like of shape (n_samples,) or None, optional (default=None)
+            Group labels, e.g., sites.
+
+        fit_params : dict or None, optional (default=None)
+            Extra arguments passed to the `fit` of the trainer, e.g.,
+            `{"group_labels": sites}`.
+
+        data_key : str or None, optional (default=None)
+            Fingerprint of `x`, `y`, `groups`, and the values of `fit_params`.
+            If None, it is computed, which hashes the features on every call.
+
+        Returns
+        -------
+        scores : dict of str -> float
+            Test scores of the fold.
+
+        fit_time : float
+            Fit time of the trainer on the fold, in seconds.
+
+        timing : dict
+            Worker process, start and end times (in seconds since the epoch),
+            wall time, and CPU time of the task, from the run that fitted it.
+        """
+        fit_params = fit_params or {}
+        if data_key is None:
+            data_key = fingerprint(x, y, groups, *fit_params.values())
+        # The task only uses its own fold, whatever the other folds of the trainer
+        trainer = clone(trainer).set_params(cv=None)
+        return self._fit_task(
+            data_key, trainer, params, [tuple(split)], x, y, groups, fit_params
+        )
+
+    def search(
+        self,
+        estimator,
+        candidates,
+        x,
+        y,
+        cv,
+        groups=None,
+        scoring="accuracy",
+        fit_params=None,
+        n_jobs=None,
+        transformer=None,
+    ):
+        """
+        Evaluate parameter candidates on every fold, skipping finished pairs.
+
+        Parameters
+        ----------
+        estimator : estimator
+            Unfitted estimator or pipeline.
+
+        candidates : iterable of dict
+            Parameter candidates, e.g., from `sklearn.model_selection.ParameterSampler`.
+
+        x : array-like of shape (n_samples, n_features)
+            Features.
+
+        y : array-like of shape (n_samples,)
+            Labels.
+
+        cv : cross-validation generator or list of (train, test)
+            Cross-validation strategy or precomputed folds.
+
+        groups : array-like of shape (n_samples,) or None, optional (default=None)
+            Group labels, e.g., sites.
+
+        scoring : str or list of str, optional (default="accuracy")
+            Scoring metric names.
+
+        fit_params : dict or None, optional (default=None)
+            Extra arguments passed to `fit`, sliced to the training samples
+            if they have one value per sample.
+
+        n_jobs : int or None, optional (default=None)
+            Number of parallel jobs over the pending (candidate, fold) pairs.
+
+        transformer : estimator or None, optional (default=None)
+            Unfitted transformer applied before the estimator, e.g.,
+            `EdgeScreener`. It is fitted once per fold on the training samples
+            (and cached), then shared by all the candidates of that fold.
+
+        Returns
+        -------
+        cv_results : dict of str -> np.ndarray or list
+            Results with the same layout as `cv_results_` of scikit-learn
+            searches, which can be passed to `compile_results`.
+        """
+        scoring = [scoring] if isinstance(scoring, str) else list(scoring)
+        candidates = list(candidates)
+        fit_params = fit_params or {}
+
+        splits = cv if isinstance(cv, list) else self.splits(cv, x, y, groups)
+        splits_key = joblib_hash(splits)
+
+        data_key = fingerprint(x, y, *fit_params.values())
+        fold_x = [x] * len(splits)
+        transformer_key = None
+        if transformer is not None:
+            transformer_key = joblib_hash(transformer)
+            fold_x = [
+                self._fit_transformer(
+                    (data_key, joblib_hash(train)), transformer, x, y, train, fit_params
+                ).transform(x)
+                for train, _ in splits
+            ]
+
+        tasks = [
+            (i, j, params, train, test)
+            for i, params in enumerate(candidates)
+            for j, (train, test) in enumerate(splits)
+        ]
+        results = Parallel(n_jobs=n_jobs)(
+            delayed(self._evaluate)(
+                (data_key, splits_key, j, transformer_key),
+                estimator,
+                params,
+                tuple(scoring),
+                fold_x[j],
+                y,
+                train,
+                test,
+                fit_params,
+            )
+            for _, j, params, train, test in tasks
+        )
+
+        return _format_results(candidates, len(splits), scoring, tasks, results)
+
+
+def successive_halving(
+    trainer,
+    x,
+    y,
+    groups=None,
+    factor=3,
+    resource="folds",
+    min_resources=None,
+    **fit_params,
+):
+    """
+    Fit a trainer with successive halving over its random search candidates.
+
+    The first round evaluates `trainer.num_search_iter` random candidates on a
+    small budget, i.e., a subset of the cross-validation folds or a fraction of
+    the training subjects of every fold. Each following round keeps the top
+    `1 / factor` of the candidates (ranked by the `refit` metric) and
+    multiplies the budget by `factor`. The survivors are scored one candidate
+    and fold at a time, as in `run_variants`, and the last round evaluates
+    them on the full cross-validation before the best one is refitted.
+
+    Parameters
+    ----------
+    trainer : estimator
+        Unfitted trainer with `cv`, `num_search_iter`, `refit`, `param_grid`,
+        and `search_strategy` parameters, e.g., `AutoMIDAClassificationTrainer`
+        with `search_strategy="random"`.
+
+    x : array-like of shape (n_samples, n_features)
+        Features.
+
+    y : array-like of shape (n_samples,)
+        Labels.
+
+    groups : array-like of shape (n_samples,) or None, optional (default=None)
+        Group labels used by the cross-validation, e.g., sites.
+
+    factor : int, optional (default=3)
+        Proportion of candidates discarded, and budget growth, at each round.
+
+    resource : {"folds", "subjects"}, optional (default="folds")
+        Budget growing over the rounds: the number of folds evaluated, or the
+        fraction of training subjects used in every fold.
+
+    min_resources : int, float, or None, optional (default=None)
+        Budget of the first round, in folds or as a fraction of subjects. If
+        None, the budget is chosen so that the last round uses the full budget.
+
+    **fit_params : dict
+        Extra arguments passed to `trainer.fit`, e.g., `group_labels`.
+
+    Returns
+    -------
+    trainer : estimator
+        The trainer refitted on all subjects with the best candidate, with an
+        extra `halving_results_` attribute listing the number of candidates
+        and the budget of each round. With more than one round, its own
+        `cv_results_` only covers the first fold, hence `cv_results` should be
+        used to compare the candidates.
+
+    cv_results : dict of str -> np.ndarray or list
+        Results of the last round over its candidates and all the folds, with
+        the same layout as `cv_results_`, which can be passed to `compile_results`.
+    """
+    if resource not in {"folds", "subjects"}:
+        raise ValueError(
+            f"resource must be 'folds' or 'subjects', got '{resource}' instead."
+        )
+
+    params = trainer.get_params()
+    cv, refit, n_jobs = params["cv"], params["refit"], params["n_jobs"]
+    splits = list(cv.split(x, y, groups)) if hasattr(cv, "split") else list(cv)
+    rng = check_random_state(params.get("random_state"))
+    rank = f"rank_test_{refit if isinstance(refit, str) else 'score'}"
+
+    max_resources = len(splits) if resource == "folds" else 1.0
+    n_rounds = 1 + math.floor(math.log(params["num_search_iter"], factor))
+    if min_resources is None:
+        min_resources = max_resources / factor ** (n_rounds - 1)
+        if resource == "folds":
+            min_resources = max(1, math.floor(min_resources))
+        else:
+            # Too few subjects per fold would leave classes unrepresented
+            min_resources = max(0.1, min_resources)
+    n_rounds = min(
+        n_rounds, 1 + math.floor(math.log(max_resources / min_resources, factor))
+    )
+
+    candidates, history = None, []
+    for i in range(n_rounds):
+        last = i == n_rounds - 1
+        budget = (
+            max_resources if last else min(max_resources, min_resources * factor**i)
+        )
+
+        if resource == "folds":
+            round_splits = splits[: int(budget)]
+        else:
+            round_splits = [
+                (_subsample(train, budget, rng), test) for train, test in splits
+            ]
+
+        if candidates is None:
+            # The trainer draws the random candidates of the first round itself
+            round_trainer = clone(trainer).set_params(
+                cv=round_splits, refit=refit if last else False
+            )
+            round_trainer.fit(x, y, groups=groups, **fit_params)
+            results = round_trainer.cv_results_
+        else:
+            tasks = [
+                (k, j, candidate, [split])
+                for k, candidate in enumerate(candidates)
+                for j, split in enumerate(round_splits)
+            ]
+            scores = Parallel(n_jobs=n_jobs)(
+                delayed(_fit_task)(
+                    trainer, candidate, task_cv, False, x, y, groups, **fit_params
+                )
+                for _, _, candidate, task_cv in tasks
+            )
+            scores = [task_scores[:2] for task_scores in scores]
+            results = _format_results(
+                candidates, len(round_splits), list(scores[0][0]), tasks, scores
+            )
+
+        history.append(
+            {"round": i, "n_candidates": len(results["params"]), "budget": budget}
+        )
+        if last:
+            break
+
+        n_keep = max(1, math.ceil(len(results["params"]) / factor))
+        best = np.argsort(results[rank], kind="stable")[:n_keep]
+        candidates = [results["params"][k] for k in best]
+
+    if n_rounds > 1:
+        # The refit also evaluates the first fold, which is the only way for
+        # the trainer to pick its single candidate as the best one
+        best = results["params"][np.argmin(results[rank])]
+        round_trainer, *_ = _fit_task(
+            trainer, best, splits[:1], True, x, y, groups, **fit_params
+        )
+
+    round_trainer.halving_results_ = history
+    return round_trainer, results
+
+
+def _fit_task(trainer, params, cv, refit, x, y, groups, **fit_params):
+    """Fit a trainer on a single candidate and fold, timing the task."""
+    start, cpu_start = time.time(), time.process_time()
+
+    trainer = clone(trainer).set_params(
+        **_single_candidate(trainer, params),
+        search_strategy="grid",
+        cv=cv,
+        refit=trainer.get_params()["refit"] if refit else False,
+        n_jobs=1,
+        verbose=0,
+    )
+    trainer.fit(x, y, groups=groups, **fit_params)
+
+    results = trainer.cv_results_
+    prefix = "split0_test_"
+    scores = {k[len(prefix) :]: results[k][0] for k in results if k.startswith(prefix)}
+    end = time.time()
+    timing = {
+        "pid": os.getpid(),
+        "start": start,
+        "end": end,
+        "wall_time": end - start,
+        "cpu_time": time.process_time() - cpu_start,
+    }
+    return (trainer if refit else scores), results["mean_fit_time"][0], timing
+
+
+def _single_candidate(trainer, params):
+    """Parameters of a trainer evaluating exactly one candidate of its search.
+
+    With `classifier="auto"`, which does not accept a custom grid, the
+    classifier object of the candidate is replaced by its name. The "loss"
+    candidates of an `IncrementalTrainer` are kept in its one-point grid.
+    """
+    params = dict(params)
+    if trainer.get_params()["classifier"] != "auto" or "classifier" not in params:
+        return {"param_grid": {param: [value] for param, value in params.items()}}
+
+    from kale.pipeline.multi_domain_adapter import CLASSIFIERS
+
+    classifier = params.pop("classifier")
+    name = next(k for k, v in CLASSIFIERS.items() if type(v) is type(classifier))
+    param_grid = {
+        param.removeprefix("classifier__"): [value] for param, value in params.items()
+    }
+    return {"classifier": name, "param_grid": param_grid}
+
+
+def _fit_cv_task(key, trainer, params, cv, x, y, groups, fit_params):
+    return _fit_task(trainer, params, cv, False, x, y, groups, **fit_params)
+
+
+def _subsample(indices, fraction, rng):
+    """Randomly keep a fraction of the indices, preserving their order."""
+    n_keep = max(1, math.ceil(fraction * len(indices)))
+    return np.sort(rng.choice(indices, n_keep, replace=False))
+
+
+def _split(key, cv, x, y, groups):
+    return [(train, test) for train, test in cv.split(x, y, groups)]
+
+
+def _slice_params(fit_params, n_samples, indices):
+    """Slice the fit parameters with one value per sample to the given indices."""
+    return {
+        k: (
+            _safe_indexing(v, indices)
+            if hasattr(v, "__len__")
+            and not isinstance(v, str)
+            and _num_samples(v) == n_samples
+            else v
+        )
+        for k, v in fit_params.items()
+    }
+
+
+def _fit_transformer(key, transformer, x, y, train, fit_params):
+    fit_params = _slice_params(fit_params, _num_samples(x), train)
+    y_train = None if y is None else _safe_indexing(y, train)
+    return clone(transformer).fit(_safe_indexing(x, train), y_train, **fit_params)
+
+
+def _evaluate(key, estimator, params, scoring, x, y, train, test, fit_params):
+    fit_params = _slice_params(fit_params, _num_samples(x), train)
+    estimator = clone(estimator).set_params(**params)
+
+    start = time.perf_counter()
+    estimator.fit(_safe_indexing(x, train), _safe_indexing(y, train), **fit_params)
+    fit_time = time.perf_counter() - start
+
+    x_test, y_test = _safe_indexing(x, test), _safe_indexing(y, test)
+    scores = {name: get_scorer(name)(estimator, x_test, y_test) for name in scoring}
+    return scores, fit_time
+
+
+def _format_results(candidates, n_splits, scoring, tasks, results):
+    """Arrange per-(candidate, fold) scores in the layout of `cv_results_`."""
+    n_candidates = len(candidates)
+    scores = {name: np.empty((n_candidates, n_splits)) for name in scoring}
+    fit_times = np.empty((n_candidates, n_splits))
+    for (i, j, *_), (fold_scores, fit_time) in zip(tasks, results):
+        for name in scoring:
+            scores[name][i, j] = fold_scores[name]
+        fit_times[i, j] = fit_time
+
+    cv_results = {
+        "params": candidates,
+        "mean_fit_time": fit_times.mean(axis=1),
+        "std_fit_time": fit_times.std(axis=1),
+    }
+    for name in sorted({k for params in candidates for k in params}):
+        cv_results[f"param_{name}"] = np.ma.masked_array(
+            [params.get(name) for params in candidates],
+            mask=[name not in params for params in candidates],
+            dtype=object,
+        )
+    for name in scoring:
+        for j in range(n_splits):
+            cv_results[f"split{j}_test_{name}"] = scores[name][:, j]
+        mean = scores[name].mean(axis=1)
+        cv_results[f"mean_test_{name}"] = mean
+        cv_results[f"std_test_{name}"] = scores[name].std(axis=1)
+        cv_results[f"rank_test_{name}"] = rankdata(-mean, method="min").astype(np.int32)
+
+    return cv_results
@@ -1,11 +1,43 @@
-import seaborn as sns
-import matplotlib.pyplot as plt
+import os
+from functools import lru_cache, wraps
+
 import pandas as pd
-from sklearn.utils._param_validation import validate_params, Interval, Integral
-from nilearn.connectome import vec_to_sym_matrix
+from joblib import Parallel, delayed
+from sklearn.utils._param_validation import (
+    validate_params,
+    Interval,
+    Integral,
+    StrOptions,
+)
 import numpy as np
 
-sns.set_theme(style="whitegrid", font_scale=1.5)
+# Seaborn theme applied while the plotting functions run
+THEME = {"style": "whitegrid", "font_scale": 1.5}
+
+
+@lru_cache(maxsize=None)
+def _plotting_modules():
+    """Import matplotlib and seaborn on first use, as both are slow to import."""
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+
+    return plt, sns
+
+
+def _themed(func):
+    """Apply `THEME` to the figures created by `func` only."""
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        plt, sns = _plotting_modules()
+        rc = {
+            **sns.axes_style(THEME["style"]),
+            **sns.plotting_context("notebook", font_scale=THEME["font_scale"]),
+        }
+        with plt.rc_context(rc):
+            return func(*args, **kwargs)
+
+    return wrapper
 
 
 @validate_params(
@@ -16,6 +48,7 @@ sns.set_theme(style="whitegrid", font_scale=1.5)
     },
     prefer_skip_nested_validation=False,
 )
+@_themed
 def plot_phenotypic_distribution(*values, ncols=2, figsize=(16, 20), title=None):
     """
     Plot distribution of phenotypic variables in a grid layout.
@@ -48,6 +81,8 @@ def plot_phenotypic_distribution(*values, ncols=2, figsize=(16, 20), title=None)
     if len(values) == 0:
         raise ValueError("At least one value must be provided for plotting.")
 
+    plt, sns = _plotting_modules()
+
     nrows = len(values) // ncols + (len(values) % ncols > 0)
     fig, axs = plt.subplots(
         figsize=figsize,
@@ -113,11 +148,21 @@ def plot_phenotypic_distribution(*values, ncols=2, figsize=(16, 20), title=None)
         "title": [str, None],
         "figsize": [tuple],
         "annotate": ["boolean"],
+        "renderer": [StrOptions({"heatmap", "imshow"})],
+        "downsample": [None, Interval(Integral, 1, None, closed="left")],
     },
     prefer_skip_nested_validation=False,
 )
+@_themed
 def plot_connectivity_matrix(
-    fc, labels, title=None, figsize=(12, 12), annotate=False, **kwargs
+    fc,
+    labels,
+    title=None,
+    figsize=(12, 12),
+    annotate=False,
+    renderer="heatmap",
+    downsample=None,
+    **kwargs,
 ):
     """
     Plot a functional connectivity matrix as a heatmap.
@@ -141,8 +186,18 @@ def plot_connectivity_matrix(
     annotate : bool, default=False
         If True, show labels on x and y axes.
 
+    renderer : {"heatmap", "imshow"}, default="heatmap"
+        Backend drawing the matrices. "imshow" is a fast path drawing
+        rasterized images, with the lower triangle of the right plot masked
+        instead of copied, which keeps vector outputs (SVG/PDF) small.
+
+    downsample : int or None, default=None
+        If given, average the matrix over blocks of `downsample` x `downsample`
+        ROIs before drawing, e.g., for very large atlases. Only every
+        `downsample`-th label is shown when annotating.
+
     **kwargs : dict
-        Additional keyword arguments passed to `sns.heatmap`.
+        Additional keyword arguments passed to `sns.heatmap` or `plt.imshow`.
 
     Returns
     -------
@@ -171,6 +226,8 @@ def plot_connectivity_matrix(
         )
 
     if fc.ndim == 1:
+        from nilearn.connectome import vec_to_sym_matrix
+
         try:
             fc = vec_to_sym_matrix(fc, np.zeros(len(labels)))
         except ValueError as e:
@@ -178,13 +235,125 @@ def plot_connectivity_matrix(
                 "The vectorized FC length must be equal to n*(n-1)/2"
             ) from e
 
+    if downsample is not None and downsample > 1:
+        fc = _block_mean(fc, downsample)
+        labels = labels[::downsample][: len(fc)]
+
+    plt, _ = _plotting_modules()
     fig, axs = plt.subplots(
         figsize=figsize, ncols=2, gridspec_kw={"width_ratios": [1, 1], "wspace": 0.02}
     )
     fig.suptitle(title)
 
-    vmin = kwargs.get("vmin", np.min(fc))
-    vmax = kwargs.get("vmax", np.max(fc))
+    # Only compute the color limits when they are not given
+    vmin = kwargs.pop("vmin", None)
+    vmax = kwargs.pop("vmax", None)
+    vmin = np.min(fc) if vmin is None else vmin
+    vmax = np.max(fc) if vmax is None else vmax
+
+    if renderer == "imshow":
+        im = _imshow_connectivity(fc, axs, vmin, vmax, **kwargs)
+    else:
+        im = _heatmap_connectivity(fc, axs, vmin, vmax, **kwargs)
+
+    # Add shared colorbar to the right of both subplots
+    cbar = fig.colorbar(im, ax=axs, orientation="vertical", fraction=0.02, pad=0.02)
+    cbar.ax.tick_params(labelsize=12)
+
+    if annotate:
+        # Left: add both x and y tick labels
+        axs[0].set_xticks(np.arange(len(labels)))
+        axs[0].set_xticklabels(labels, rotation=90, fontsize=10)
+        axs[0].set_yticks(np.arange(len(labels)))
+        axs[0].set_yticklabels(labels, fontsize=10)
+
+        # Right: remove all tick labels (to save space)
+        axs[1].set_xticks(np.arange(len(labels)))
+        axs[1].set_xticklabels(labels, rotation=90, fontsize=10)
+
+    return fig, axs
+
+
+@validate_params(
+    {
+        "fcs": ["array-like"],
+        "labels": ["array-like"],
+        "output_dir": [str],
+        "names": [list, None],
+        "fmt": [StrOptions({"png", "svg", "pdf", "jpg"})],
+        "dpi": [Interval(Integral, 1, None, closed="left")],
+        "n_jobs": [Integral, None],
+    },
+    prefer_skip_nested_validation=False,
+)
+def save_connectivity_matrices(
+    fcs, labels, output_dir, names=None, fmt="png", dpi=100, n_jobs=None, **kwargs
+):
+    """
+    Plot and save the connectivity matrices of many subjects in parallel.
+
+    Parameters
+    ----------
+    fcs : array-like of shape (n_subjects, n, n) or (n_subjects, n*(n-1)/2)
+        Functional connectivity matrices or their vectorized upper triangles.
+
+    labels : list of str
+        Labels for each ROI, see `plot_connectivity_matrix`.
+
+    output_dir : str
+        Directory where the figures are written.
+
+    names : list of str or None, default=None
+        File name (without extension) of each figure. If None, the subject
+        index is used.
+
+    fmt : {"png", "svg", "pdf", "jpg"}, default="png"
+        Output file format.
+
+    dpi : int, default=100
+        Resolution of the rasterized images.
+
+    n_jobs : int or None, default=None
+        Number of worker processes (-1: all CPUs). None means 1.
+
+    **kwargs : dict
+        Additional keyword arguments passed to `plot_connectivity_matrix`,
+        which defaults to the "imshow" renderer here.
+
+    Returns
+    -------
+    paths : list of str
+        Paths of the written figures.
+    """
+    if names is None:
+        names = [str(i) for i in range(len(fcs))]
+    if len(names) != len(fcs):
+        raise ValueError("The number of names must match the number of subjects.")
+
+    os.makedirs(output_dir, exist_ok=True)
+    paths = [os.path.join(output_dir, f"{name}.{fmt}") for name in names]
+    kwargs.setdefault("renderer", "imshow")
+
+    Parallel(n_jobs=n_jobs)(
+        delayed(_save_connectivity_matrix)(
+            np.asarray(fc), labels, path, dpi, title=name, **kwargs
+        )
+        for fc, name, path in zip(fcs, names, paths)
+    )
+
+    return paths
+
+
+def _save_connectivity_matrix(fc, labels, path, dpi, **kwargs):
+    """Plot one connectivity matrix, save it, and release the figure."""
+    fig, _ = plot_connectivity_matrix(fc, labels, **kwargs)
+    fig.savefig(path, dpi=dpi)
+    _plotting_modules()[0].close(fig)
+
+
+def _heatmap_connectivity(fc, axs, vmin, vmax, **kwargs):
+    """Draw the full and upper triangle matrices with `sns.heatmap`."""
+    _, sns = _plotting_modules()
 
     # Left plot
     sns.heatmap(
@@ -214,20 +383,41 @@ def plot_connectivity_matrix(
     )
     axs[1].set_title("Upper Triangle of Connectivity Matrix")
 
-    # Add shared colorbar to the right of both subplots
-    im = axs[1].get_children()[0]  # Get the QuadMesh image
-    cbar = fig.colorbar(im, ax=axs, orientation="vertical", fraction=0.02, pad=0.02)
-    cbar.ax.tick_params(labelsize=12)
+    return axs[1].get_children()[0]  # Get the QuadMesh image
 
-    if annotate:
-        # Left: add both x and y tick labels
-        axs[0].set_xticks(np.arange(len(labels)))
-        axs[0].set_xticklabels(labels, rotation=90, fontsize=10)
-        axs[0].set_yticks(np.arange(len(labels)))
-        axs[0].set_yticklabels(labels, fontsize=10)
 
-        # Right: remove all tick labels (to save space)
-        axs[1].set_xticks(np.arange(len(labels)))
-        axs[1].set_xticklabels(labels, rotation=90, fontsize=10)
+def _imshow_connectivity(fc, axs, vmin, vmax, **kwargs):
+    """Draw the full and masked upper triangle matrices as rasterized images."""
+    kwargs = {"interpolation": "nearest", "rasterized": True, **kwargs}
+    # Pixel centers are shifted to match the cell layout of `sns.heatmap`
+    extent = (0, len(fc), len(fc), 0)
 
-    return fig, axs
+    # Left plot
+    axs[0].imshow(fc, vmin=vmin, vmax=vmax, extent=extent, **kwargs)
+    axs[0].set_title("Full Connectivity Matrix")
+
+    # Right plot, masking the lower triangle and diagonal without copying the values
+    lower = np.tri(len(fc), dtype=bool)
+    im = axs[1].imshow(
+        np.ma.masked_array(fc, mask=lower),
+        vmin=vmin,
+        vmax=vmax,
+        extent=extent,
+        **kwargs,
+    )
+    axs[1].set_title("Upper Triangle of Connectivity Matrix")
+
+    for ax in axs:
+        ax.set_xticks([])
+        ax.set_yticks([])
+        ax.grid(False)
+
+    return im
+
+
+def _block_mean(fc, block_size):
+    """Average a square matrix over non-overlapping blocks, trimming the remainder."""
+    n_blocks = len(fc) // block_size
+    n = n_blocks * block_size
+    blocks = fc[:n, :n].reshape(n_blocks, block_size, n_blocks, block_size)
+    return blocks.mean(axis=(1, 3))
@@ -0,0 +1,197 @@
+"""
+Benchmark the validation and test passes of DrugBAN with and without the embedding cache.
+
+Synthetic target test pairs, in which many pairs share a target, are
+featurized once into a `helpers.store` store. A `DrugbanTrainer` is then
+trained for a few epochs with `pl.Trainer`, validated on the same data
+loader after every epoch, and its best checkpoint is tested on that loader,
+as in the tutorial, first as is and then with `helpers.caching.cache_embeddings`
+and `KeepBestEmbeddings`. With the cache, drugs and proteins are encoded
+once per validation pass, and the test pass reuses the embeddings kept from
+the validation of the best epoch. The throughput of the validation and test
+passes on the CPU, the share of embeddings reused in each, and the largest
+difference of the test metrics are shown.
+
+Usage (from the tutorial directory)::
+
+    python benchmarks/bench_embedding_cache.py --n-pairs 2000 --epochs 3
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+import warnings
+
+import pytorch_lightning as pl
+import torch
+from pytorch_lightning.callbacks import Callback, ModelCheckpoint
+from kale.embed.model_lib.drugban import DrugBAN
+from kale.loaddata.molecular_datasets import graph_collate_func
+from kale.pipeline.drugban_trainer import DrugbanTrainer
+from rdkit import RDLogger
+from torch.utils.data import DataLoader
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from configs import get_cfg_defaults  # noqa: E402
+from helpers.batching import get_dataloader  # noqa: E402
+from helpers.caching import KeepBestEmbeddings, cache_embeddings  # noqa: E402
+from helpers.store import PackedDTIDataset, build_dti_store  # noqa: E402
+from synthetic import write_split  # noqa: E402
+
+
+def make_model(cfg, seed):
+    """Create an untrained `DrugbanTrainer` with the settings of a config."""
+    torch.manual_seed(seed)
+    return DrugbanTrainer(
+        model=DrugBAN(cfg),
+        solver_lr=cfg.SOLVER.LEARNING_RATE,
+        num_classes=cfg.DECODER.BINARY,
+        batch_size=cfg.SOLVER.BATCH_SIZE,
+        is_da=cfg.DA.USE,
+        solver_da_lr=cfg.SOLVER.DA_LEARNING_RATE,
+        da_init_epoch=cfg.DA.INIT_EPOCH,
+        da_method=cfg.DA.METHOD,
+        original_random=cfg.DA.ORIGINAL_RANDOM,
+        use_da_entropy=cfg.DA.USE_ENTROPY,
+        da_random_layer=cfg.DA.RANDOM_LAYER,
+        da_random_dim=cfg.DA.RANDOM_DIM,
+        decoder_in_dim=cfg.DECODER.IN_DIM,
+    )
+
+
+class PassTimer(Callback):
+    """Time the validation passes and count the embeddings they reuse."""
+
+    def __init__(self, caches=None):
+        self.caches = caches or {}
+        self.elapsed = 0.0
+        self.hits = self.lookups = 0
+
+    def on_validation_start(self, trainer, pl_module):
+        self.start = time.perf_counter()
+        self.counts = [(c.hits, c.misses) for c in self.caches.values()]
+
+    def on_validation_end(self, trainer, pl_module):
+        self.elapsed += time.perf_counter() - self.start
+        for cache, (hits, misses) in zip(self.caches.values(), self.counts):
+            self.hits += cache.hits - hits
+            self.lookups += cache.hits + cache.misses - hits - misses
+
+
+def evaluate(model, batches, epochs, folder, caches=None):
+    """Pairs per second of the validation and test passes, and the test metrics."""
+    checkpoint = ModelCheckpoint(
+        dirpath=folder, monitor="valid_BinaryAUROC", mode="max"
+    )
+    timer = PassTimer(caches)
+    callbacks = [checkpoint, timer]
+    if caches is not None:
+        callbacks.append(KeepBestEmbeddings(caches, checkpoint))
+    trainer = pl.Trainer(
+        accelerator="cpu",
+        max_epochs=epochs,
+        num_sanity_val_steps=0,
+        callbacks=callbacks,
+        logger=False,
+        enable_progress_bar=False,
+        enable_model_summary=False,
+    )
+    n_pairs = sum(len(label) for _, _, label in batches)
+    trainer.fit(model, train_dataloaders=batches, val_dataloaders=batches)
+    valid = n_pairs * epochs / timer.elapsed
+
+    timer = PassTimer(caches)
+    start = time.perf_counter()
+    timer.on_validation_start(trainer, model)
+    (metrics,) = trainer.test(
+        model, dataloaders=batches, ckpt_path="best", verbose=False
+    )
+    timer.on_validation_end(trainer, model)
+    test = n_pairs / (time.perf_counter() - start)
+    return valid, test, metrics, checkpoint.best_model_path, timer
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--n-pairs", type=int, default=2000)
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--epochs", type=int, default=3)
+    parser.add_argument("--bucketing", action="store_true")
+    parser.add_argument("--max-megabytes", type=float, default=1024)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    RDLogger.DisableLog("rdApp.*")
+    warnings.filterwarnings("ignore")
+    cfg = get_cfg_defaults()
+    cfg.DECODER.BINARY = 1
+    max_drug_nodes = 0 if args.bucketing else cfg.DRUG.MAX_NODES
+
+    with tempfile.TemporaryDirectory() as data_folder:
+        write_split(data_folder, args.n_pairs, splits=("target_test",), fractions=(1,))
+        store = build_dti_store(
+            data_folder,
+            os.path.join(data_folder, "store"),
+            splits=("target_test",),
+            max_protein_length=cfg.PROTEIN.MAX_LENGTH,
+            verbose=False,
+        )
+        pairs = store.pairs("target_test")
+        print(
+            f"{len(pairs)} pairs, {len(set(pairs['drug']))} drugs, "
+            f"{len(set(pairs['protein']))} proteins\n"
+        )
+
+        loader = get_dataloader(
+            PackedDTIDataset(store, "target_test", max_drug_nodes),
+            max_protein_length=cfg.PROTEIN.MAX_LENGTH,
+            # Evaluation pads to the fixed sizes, as in the tutorial
+            max_drug_nodes=cfg.DRUG.MAX_NODES if args.bucketing else None,
+            batch_size=args.batch_size,
+            shuffle=False,
+            collate_fn=graph_collate_func,
+        )
+        # Featurize once, so the passes only differ by the model
+        batches = DataLoader(list(loader), batch_size=None)
+        valid, test, metrics, _, _ = evaluate(
+            make_model(cfg, args.seed),
+            batches,
+            args.epochs,
+            os.path.join(data_folder, "uncached"),
+        )
+        model = make_model(cfg, args.seed)
+        caches = cache_embeddings(model, args.max_megabytes)
+        valid_cached, test_cached, metrics_cached, best, timer = evaluate(
+            model,
+            batches,
+            args.epochs,
+            os.path.join(data_folder, "cached"),
+            caches,
+        )
+        best = os.path.basename(best)
+
+    header = f"{'pass':<20}{'uncached':>12}{'cached':>12}{'speedup':>10}"
+    print(header)
+    print("-" * len(header))
+    for name, uncached, cached in (
+        ("validation", valid, valid_cached),
+        ("test", test, test_cached),
+    ):
+        print(f"{name:<20}{uncached:>12.1f}{cached:>12.1f}{cached / uncached:>9.1f}x")
+
+    print(f"\nPairs/s on the CPU over {args.epochs} epochs, best checkpoint: {best}")
+    print(f"Share of embeddings reused by the test: {timer.hits / timer.lookups:.1%}")
+    for name, cache in caches.items():
+        reused = cache.hits / (cache.hits + cache.misses)
+        print(
+            f"  {name:<10}{reused:.1%} overall ({cache.n_bytes / 2**20:.0f} MB cached)"
+        )
+    difference = max(abs(metrics[k] - metrics_cached[k]) for k in metrics)
+    print(f"Largest difference of the test metrics: {difference:.2e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,188 @@
+"""
+Benchmark screening a compound library against targets with a DrugBAN checkpoint.
+
+A checkpoint of an untrained model and a synthetic library are written to
+a temporary folder. The pairs per second on the CPU are then compared
+between the interpretation path of the tutorial (`DTIDataset` pairs run
+one at a time through the full model), the same path with larger batches,
+and `helpers.screening.screen_library`, which encodes each batch of
+compounds once and folds each target once, with and without padding.
+The first two are timed on `--n-baseline` pairs only. Both screening modes
+are also run on a library one compound longer than a batch, whose last
+batch holds a single compound, with `--batch-size` and with batches of 2,
+and the script exits with a non-zero status if a compound is not scored or
+if its score depends on the batch size. The output layer of the model is
+scaled down so that its scores are not saturated.
+
+Usage (from the tutorial directory)::
+
+    python benchmarks/bench_screening.py --n-compounds 2000 --n-targets 2
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import pandas as pd
+import pytorch_lightning as pl
+import torch
+from kale.embed.model_lib.drugban import DrugBAN
+from kale.loaddata.molecular_datasets import DTIDataset, graph_collate_func
+from kale.pipeline.drugban_trainer import DrugbanTrainer
+from rdkit import RDLogger
+from torch import nn
+from torch.utils.data import DataLoader
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from configs import get_cfg_defaults  # noqa: E402
+from helpers.screening import load_drugban, screen_library  # noqa: E402
+from synthetic import make_proteins, make_smiles  # noqa: E402
+
+
+def write_checkpoint(cfg, path, seed):
+    """Save the checkpoint of an untrained `DrugbanTrainer`."""
+    torch.manual_seed(seed)
+    net = DrugBAN(cfg)
+    # Untrained logits are large enough to saturate the scores
+    linear = [m for m in net.mlp_classifier.modules() if isinstance(m, nn.Linear)]
+    with torch.no_grad():
+        linear[-1].weight.mul_(1e-3)
+    model = DrugbanTrainer(
+        model=net,
+        solver_lr=cfg.SOLVER.LEARNING_RATE,
+        num_classes=cfg.DECODER.BINARY,
+        batch_size=cfg.SOLVER.BATCH_SIZE,
+        is_da=cfg.DA.USE,
+        solver_da_lr=cfg.SOLVER.DA_LEARNING_RATE,
+        da_init_epoch=cfg.DA.INIT_EPOCH,
+        da_method=cfg.DA.METHOD,
+        original_random=cfg.DA.ORIGINAL_RANDOM,
+        use_da_entropy=cfg.DA.USE_ENTROPY,
+        da_random_layer=cfg.DA.RANDOM_LAYER,
+        da_random_dim=cfg.DA.RANDOM_DIM,
+        decoder_in_dim=cfg.DECODER.IN_DIM,
+    )
+    trainer = pl.Trainer(accelerator="cpu", logger=False, enable_progress_bar=False)
+    trainer.strategy.connect(model)
+    trainer.save_checkpoint(path)
+
+
+def per_pair(model, smiles, proteins, batch_size, max_drug_nodes):
+    """Pairs per second of running every pair through the full model."""
+    pairs = pd.DataFrame(
+        [(s, p) for p in proteins for s in smiles], columns=["SMILES", "Protein"]
+    )
+    pairs["Y"] = 0
+    loader = DataLoader(
+        DTIDataset(pairs.index.values, pairs, max_drug_nodes),
+        batch_size=batch_size,
+        collate_fn=graph_collate_func,
+    )
+    start = time.perf_counter()
+    with torch.inference_mode():
+        for drug, protein, _ in loader:
+            model.model(drug, protein, mode="eval")
+    return len(pairs) / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--n-compounds", type=int, default=2000)
+    parser.add_argument("--n-targets", type=int, default=1)
+    parser.add_argument("--n-baseline", type=int, default=100)
+    parser.add_argument("--batch-size", type=int, default=128)
+    parser.add_argument("--num-workers", type=int, default=0)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    RDLogger.DisableLog("rdApp.*")
+    cfg = get_cfg_defaults()
+    cfg.merge_from_file(
+        os.path.join(os.path.dirname(__file__), "..", "configs", "DA_cross_domain.yaml")
+    )
+    smiles = make_smiles(args.n_compounds, seed=args.seed)
+    proteins = make_proteins(args.n_targets, seed=args.seed)
+    n_pairs = args.n_compounds * args.n_targets
+
+    with tempfile.TemporaryDirectory() as folder:
+        checkpoint = os.path.join(folder, "model.ckpt")
+        write_checkpoint(cfg, checkpoint, args.seed)
+        model = load_drugban(checkpoint, cfg)
+        library = os.path.join(folder, "library.csv")
+        pd.DataFrame({"SMILES": smiles}).to_csv(library, index=False)
+
+        failures, differences = [], {}
+        n_baseline = max(1, args.n_baseline // args.n_targets)
+        results = {
+            "per pair, batch of 1": per_pair(
+                model, smiles[:n_baseline], proteins, 1, cfg.DRUG.MAX_NODES
+            ),
+            f"per pair, batch of {args.batch_size}": per_pair(
+                model,
+                smiles[: max(n_baseline, args.batch_size)],
+                proteins,
+                args.batch_size,
+                cfg.DRUG.MAX_NODES,
+            ),
+        }
+        for name, max_drug_nodes in (
+            ("screening, fixed padding", cfg.DRUG.MAX_NODES),
+            ("screening, unpadded", None),
+        ):
+            start = time.perf_counter()
+            screen_library(
+                model,
+                library,
+                proteins,
+                os.path.join(folder, "screening.csv"),
+                batch_size=args.batch_size,
+                max_drug_nodes=max_drug_nodes,
+                num_workers=args.num_workers,
+                verbose=False,
+            )
+            results[name] = n_pairs / (time.perf_counter() - start)
+
+            # A last batch of one compound
+            small_library = os.path.join(folder, "small_library.csv")
+            small_smiles = make_smiles(args.batch_size + 1, seed=args.seed)
+            pd.DataFrame({"SMILES": small_smiles}).to_csv(small_library, index=False)
+            scores = []
+            for batch_size in (args.batch_size, 2):
+                small = screen_library(
+                    model,
+                    small_library,
+                    proteins,
+                    os.path.join(folder, "small_screening.csv"),
+                    batch_size=batch_size,
+                    max_drug_nodes=max_drug_nodes,
+                    verbose=False,
+                )
+                scores.append(small.set_index(["target", "ID"])["score"].sort_index())
+            difference = (scores[0] - scores[1]).abs().max()
+            differences[name] = difference
+            if scores[0].isna().any() or not difference <= 1e-5:
+                failures.append(name)
+
+    header = f"{'setting':<32}{'pairs/s':>10}{'speedup':>10}"
+    print(f"{args.n_compounds} compounds x {args.n_targets} targets\n")
+    print(header)
+    print("-" * len(header))
+    baseline = results["per pair, batch of 1"]
+    for name, pairs_per_second in results.items():
+        print(
+            f"{name:<32}{pairs_per_second:>10.1f}{pairs_per_second / baseline:>9.1f}x"
+        )
+
+    print(f"\nLargest score difference between batches of {args.batch_size} and 2:")
+    for name, difference in differences.items():
+        print(f"  {name:<32}{difference:.2e}")
+    if failures:
+        print(f"\nScores missing or depending on the batch size: {', '.join(failures)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""
+Benchmark building and reading data splits from a single table of interactions.
+
+A synthetic BindingDB-shaped table is written to a temporary folder, and
+`helpers.splits.build_splits` builds the cross-domain split (clustering
+the drugs and proteins) and then the in-domain split, which reuses the
+converted table. The time of every stage on the CPU, the size of the split
+index against copies of the pairs in CSV files, and the time to read all
+the pair files of the split from the index (with `read_split`) or from the
+CSV files (with `pd.read_csv`) are shown.
+
+Usage (from the tutorial directory)::
+
+    python benchmarks/bench_splits.py --n-pairs 200000 --n-jobs -1
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import pandas as pd
+from rdkit import RDLogger
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from helpers.splits import (  # noqa: E402
+    SPLIT_FILES,
+    build_splits,
+    cluster_fingerprints,
+    drug_fingerprints,
+    protein_sketches,
+    read_split,
+)
+from synthetic import make_pairs  # noqa: E402
+
+
+def timed(func, *args, **kwargs):
+    """Result and duration in seconds of a call."""
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def folder_size(folder):
+    """Total size in bytes of the files directly in a folder."""
+    return sum(entry.stat().st_size for entry in os.scandir(folder) if entry.is_file())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--n-pairs", type=int, default=200000)
+    parser.add_argument("--n-jobs", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    RDLogger.DisableLog("rdApp.*")
+    pairs = make_pairs(args.n_pairs, seed=args.seed)
+    n_drugs, n_proteins = pairs["SMILES"].nunique(), pairs["Protein"].nunique()
+    print(f"{len(pairs)} pairs, {n_drugs} drugs, {n_proteins} proteins\n")
+
+    with tempfile.TemporaryDirectory() as folder:
+        table_path = os.path.join(folder, "interactions.csv")
+        pairs.to_csv(table_path, index=False)
+        dataset_dir = os.path.join(folder, "bindingdb")
+        stages = {}
+
+        # Stages of the cross-domain split, timed on their own
+        smiles, sequences = pairs["SMILES"].unique(), pairs["Protein"].unique()
+        fingerprints, stages["drug fingerprints"] = timed(
+            drug_fingerprints, smiles, n_jobs=args.n_jobs
+        )
+        sketches, stages["protein sketches"] = timed(
+            protein_sketches, sequences, n_jobs=args.n_jobs
+        )
+        _, stages["drug clustering"] = timed(
+            cluster_fingerprints, fingerprints, 0.5, seed=args.seed
+        )
+        _, stages["protein clustering"] = timed(
+            cluster_fingerprints, sketches, 0.3, seed=args.seed
+        )
+
+        for name, cross_domain, split in (
+            ("cross-domain split", True, "cluster"),
+            ("in-domain split", False, "random"),
+        ):
+            _, stages[name] = timed(
+                build_splits,
+                table_path,
+                dataset_dir,
+                split,
+                cross_domain=cross_domain,
+                n_jobs=args.n_jobs,
+                seed=args.seed,
+                verbose=False,
+            )
+
+        header = f"{'stage':<24}{'seconds':>10}{'pairs/s':>12}"
+        print(header)
+        print("-" * len(header))
+        for name, seconds in stages.items():
+            print(f"{name:<24}{seconds:>10.2f}{len(pairs) / seconds:>12.0f}")
+
+        data_folder = os.path.join(dataset_dir, "cluster")
+        frames, index_read = timed(
+            lambda: [read_split(data_folder, s) for s in SPLIT_FILES[True]]
+        )
+
+        # The CSV files of the same split, as in the downloaded data
+        csv_folder = os.path.join(folder, "csv")
+        os.makedirs(csv_folder)
+        for split, frame in zip(SPLIT_FILES[True], frames):
+            frame.to_csv(os.path.join(csv_folder, f"{split}.csv"), index=False)
+
+        _, csv_read = timed(
+            lambda: [
+                pd.read_csv(os.path.join(csv_folder, f"{s}.csv"))
+                for s in SPLIT_FILES[True]
+            ]
+        )
+        index_size = folder_size(data_folder)
+        table_size = os.path.getsize(os.path.join(dataset_dir, "interactions.npz"))
+        csv_size = folder_size(csv_folder)
+
+    print(
+        f"\nCross-domain split: index {index_size / 2**20:.2f} MB "
+        f"(+ {table_size / 2**20:.1f} MB shared table) "
+        f"vs {csv_size / 2**20:.1f} MB of CSV files"
+    )
+    print(
+        f"Reading its pair files: {index_read:.2f} s from the index "
+        f"vs {csv_read:.2f} s from the CSV files"
+    )
+
+
+if __name__ == "__main__":
+    main()
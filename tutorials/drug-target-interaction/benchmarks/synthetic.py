@@ -0,0 +1,93 @@
+"""
+Synthetic BindingDB-shaped inputs shared by the benchmarks.
+
+Molecules are random chains of common fragments, with sizes drawn around
+the typical 20-40 heavy atoms of drug-like compounds and a long tail up to
+`DRUG.MAX_NODES`, and protein lengths follow a log-normal distribution
+around 450 residues. Pairs reuse drugs and, even more, targets, as in the
+real datasets. The generated files follow the layout of the data folders
+of the tutorial, so the benchmarks run offline.
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+
+# Fragments chained into molecules, with their number of heavy atoms
+FRAGMENTS = [
+    ("C", 1),
+    ("N", 1),
+    ("O", 1),
+    ("C(=O)", 2),
+    ("C(F)(F)", 3),
+    ("S(=O)(=O)", 3),
+    ("c1ccc(cc1)", 6),
+    ("C1CCN(CC1)", 6),
+    ("c1ccc2ccccc2c1", 10),
+]
+
+AMINO_ACIDS = np.array(list("ACDEFGHIKLMNPQRSTVWY"))
+
+
+def make_smiles(n_drugs, max_atoms=290, seed=0):
+    """Generate valid SMILES strings of random chains of fragments."""
+    rng = np.random.default_rng(seed)
+    sizes = np.clip(rng.lognormal(np.log(28), 0.45, n_drugs), 3, max_atoms - 10)
+    weights = np.array([4, 2, 2, 2, 1, 1, 2, 1, 0.3])
+    weights = weights / weights.sum()
+
+    smiles = []
+    for size in sizes:
+        parts, n_atoms = ["C"], 1
+        while n_atoms < size:
+            fragment, atoms = FRAGMENTS[rng.choice(len(FRAGMENTS), p=weights)]
+            parts.append(fragment)
+            n_atoms += atoms
+        parts.append("C")
+        smiles.append("".join(parts))
+    return smiles
+
+
+def make_proteins(n_proteins, seed=0):
+    """Generate protein sequences with log-normal lengths."""
+    rng = np.random.default_rng(seed)
+    lengths = np.clip(rng.lognormal(np.log(450), 0.6, n_proteins), 30, 3000)
+    return ["".join(rng.choice(AMINO_ACIDS, int(n))) for n in lengths]
+
+
+def make_pairs(n_pairs, drugs_per_pair=0.25, proteins_per_pair=0.02, seed=0):
+    """Generate a table of drug-target pairs with the columns of the tutorial CSV files."""
+    rng = np.random.default_rng(seed)
+    smiles = make_smiles(max(1, int(n_pairs * drugs_per_pair)), seed=seed)
+    proteins = make_proteins(max(1, int(n_pairs * proteins_per_pair)), seed=seed)
+
+    # Popular targets appear in many more pairs than others
+    target_weights = np.minimum(rng.zipf(1.5, len(proteins)), 1000).astype(float)
+    target_weights /= target_weights.sum()
+    return pd.DataFrame(
+        {
+            "SMILES": rng.choice(np.array(smiles, dtype=object), n_pairs),
+            "Protein": rng.choice(
+                np.array(proteins, dtype=object), n_pairs, p=target_weights
+            ),
+            "Y": rng.integers(0, 2, n_pairs),
+        }
+    )
+
+
+def write_split(
+    data_folder,
+    n_pairs,
+    splits=("source_train", "target_train", "target_test"),
+    fractions=(0.6, 0.2, 0.2),
+    seed=0,
+):
+    """Write the pair files of a data split from one table of `make_pairs`."""
+    os.makedirs(data_folder, exist_ok=True)
+    pairs = make_pairs(n_pairs, seed=seed)
+    bounds = (np.cumsum((0,) + tuple(fractions)) * n_pairs).astype(int)
+    for split, start, stop in zip(splits, bounds[:-1], bounds[1:]):
+        pairs.iloc[start:stop].to_csv(
+            os.path.join(data_folder, f"{split}.csv"), index=False
+        )
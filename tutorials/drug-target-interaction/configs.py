@@ -8,6 +8,8 @@ _C = CfgNode()
 _C.DATA = CfgNode()
 _C.DATA.DATASET = None  # Name of the dataset to use
 _C.DATA.SPLIT = None  # Data splitting strategy
+_C.DATA.PRECOMPUTE = False  # Whether to featurize unique drugs and proteins once into a memory-mapped store
+_C.DATA.STORE_DIR = "data/drug-target-interaction/store"  # Root of the stores, one per dataset and split
 
 # ---------------------------------------------------------------------------- #
 # Drug feature extractor
@@ -18,6 +20,9 @@ _C.DRUG.NODE_IN_EMBEDDING = (
     128  # Dimensionality of input node features after linear transformation
 )
 _C.DRUG.PADDING = True  # Whether to apply padding
+_C.DRUG.BUCKETING = False  # Whether to batch training pairs of similar sizes and pad them to the largest drug and protein of each batch instead of MAX_NODES
+# Not neutral for DrugBAN, whose attention pools over the padding: a prediction depends on its batch,
+# so the evaluation loaders keep padding to MAX_NODES, and the model sees different padding in training
 _C.DRUG.HIDDEN_LAYERS = [
     128,
     128,
@@ -37,6 +42,7 @@ _C.PROTEIN.NUM_FILTERS = [
 _C.PROTEIN.KERNEL_SIZE = [3, 6, 9]  # Kernel size for each convolutional layer
 _C.PROTEIN.EMBEDDING_DIM = 128  # Dimension of character embedding for amino acids
 _C.PROTEIN.PADDING = True  # Whether to apply zero-padding to the embedding
+_C.PROTEIN.MAX_LENGTH = 1200  # Number of residues encoded per protein sequence
 
 # ---------------------------------------------------------------------------- #
 # BCN setting
@@ -61,6 +67,7 @@ _C.SOLVER = CfgNode()
 _C.SOLVER.MAX_EPOCH = 100  # Total number of training epochs
 _C.SOLVER.BATCH_SIZE = 64  # Batch size for training and evaluation
 _C.SOLVER.NUM_WORKERS = 0  # Number of subprocesses for data loading
+_C.SOLVER.EMBEDDING_CACHE_MB = 0  # Memory bound of the LRU cache of drug and protein embeddings in evaluation, 0 to disable it
 _C.SOLVER.LEARNING_RATE = 5e-5  # Learning rate for the main model
 _C.SOLVER.DA_LEARNING_RATE = (
     1e-3  # Learning rate for the domain adaptation (if DA is enabled)
@@ -0,0 +1,324 @@
+from functools import partial
+
+import numpy as np
+import torch
+from rdkit import Chem
+from torch.utils.data import DataLoader, Sampler
+from torch_geometric.data import Batch, Data
+
+from .store import PackedDTIDataset
+
+__all__ = [
+    "LengthBucketSampler",
+    "batch_graphs",
+    "batch_max_collate_func",
+    "fixed_size_collate_func",
+    "get_dataloader",
+    "pair_lengths",
+]
+
+
+class LengthBucketSampler(Sampler):
+    """
+    Batch sampler grouping drug-target pairs of similar sizes.
+
+    When shuffling, the samples are randomly split into pools of
+    `bucket_batches` batches, each pool is sorted by length, and the batches
+    cut from the pools are yielded in random order, so a batch mixes random
+    pairs of close sizes. Without shuffling, all the samples are sorted by
+    length, which minimizes padding for evaluation. Pass it as the
+    `batch_sampler` of a `DataLoader`, with `batch_max_collate_func` as
+    `collate_fn`.
+
+    Parameters
+    ----------
+    lengths : array-like of shape (n_samples,) or (n_samples, n_keys)
+        Sizes of the samples, e.g., from `pair_lengths`. With several
+        columns, samples are sorted by the first one, then the next ones.
+
+    batch_size : int
+        Number of samples per batch.
+
+    shuffle : bool, optional (default=True)
+        Whether to draw random pools and batch orders at every epoch.
+
+    drop_last : bool, optional (default=False)
+        Whether to drop the last batch if it is incomplete.
+
+    bucket_batches : int, optional (default=50)
+        Number of batches per pool sorted together when shuffling. Larger
+        pools reduce padding but make batches less random.
+
+    seed : int or None, optional (default=None)
+        Seed of the shuffling. If None, it is drawn from the torch random
+        generator, so `pl.seed_everything` makes it reproducible.
+    """
+
+    def __init__(
+        self,
+        lengths,
+        batch_size,
+        shuffle=True,
+        drop_last=False,
+        bucket_batches=50,
+        seed=None,
+    ):
+        lengths = np.asarray(lengths)
+        self.lengths = lengths.reshape(len(lengths), -1)
+        self.batch_size = batch_size
+        self.shuffle = shuffle
+        self.drop_last = drop_last
+        self.bucket_batches = bucket_batches
+        self.seed = seed
+        self._epoch = 0
+
+    def __len__(self):
+        n_samples = len(self.lengths)
+        if self.drop_last:
+            return n_samples // self.batch_size
+        return -(-n_samples // self.batch_size)
+
+    def __iter__(self):
+        # Sort keys for np.lexsort, the primary key last
+        keys = self.lengths.T[::-1]
+        if not self.shuffle:
+            order = np.lexsort(keys)
+        else:
+            seed = self.seed
+            if seed is None:
+                seed = int(torch.empty((), dtype=torch.int64).random_().item())
+            rng = np.random.default_rng([seed, self._epoch])
+            self._epoch += 1
+
+            order = rng.permutation(len(self.lengths))
+            pool_size = self.batch_size * self.bucket_batches
+            order = np.concatenate(
+                [
+                    pool[np.lexsort(keys[:, pool])]
+                    for pool in np.split(order, range(pool_size, len(order), pool_size))
+                ]
+            )
+
+        batches = np.split(order, range(self.batch_size, len(order), self.batch_size))
+        if self.drop_last and len(batches[-1]) < self.batch_size:
+            batches = batches[:-1]
+        if self.shuffle:
+            batches = [batches[i] for i in rng.permutation(len(batches))]
+        for batch in batches:
+            yield batch.tolist()
+
+
+def pair_lengths(dataset, max_protein_length=1200):
+    """
+    Get the protein length and number of drug atoms of every pair of a dataset.
+
+    Parameters
+    ----------
+    dataset : PackedDTIDataset or kale.loaddata.molecular_datasets.DTIDataset
+        Dataset of drug-target pairs. For a `DTIDataset`, each unique SMILES
+        string is parsed once to count its atoms.
+
+    max_protein_length : int, optional (default=1200)
+        Length the protein sequences are truncated to.
+
+    Returns
+    -------
+    lengths : np.ndarray of shape (n_pairs, 2)
+        Protein lengths and numbers of drug atoms.
+    """
+    if isinstance(dataset, PackedDTIDataset):
+        arrays = dataset.store.arrays
+        drug_nodes = np.diff(arrays["drug_node_ptr"])[dataset.pairs["drug"]]
+        protein_lengths = np.diff(arrays["protein_ptr"])[dataset.pairs["protein"]]
+    else:
+        rows = dataset.df.iloc[dataset.list_ids]
+        smiles = rows["SMILES"].unique()
+        n_atoms = {s: Chem.MolFromSmiles(s).GetNumAtoms() for s in smiles}
+        drug_nodes = rows["SMILES"].map(n_atoms).to_numpy()
+        protein_lengths = rows["Protein"].str.len().to_numpy()
+
+    protein_lengths = np.minimum(protein_lengths, max_protein_length)
+    return np.stack([protein_lengths, drug_nodes], axis=1)
+
+
+def batch_max_collate_func(x, min_protein_length=16):
+    """
+    Batch drug-target pairs, padding them to the largest drug and protein of the batch.
+
+    Replaces `kale.loaddata.molecular_datasets.graph_collate_func` in training
+    for datasets built without virtual nodes (`max_drug_nodes=0`). Each
+    molecular graph is padded with zero-feature virtual nodes to the largest
+    number of atoms in the batch, as the GCN of DrugBAN expects graphs of
+    equal sizes, and the protein codes are cut after the longest sequence of
+    the batch. As the bilinear attention of DrugBAN pools over all the nodes
+    and residues, padding included, the prediction of a pair then depends on
+    the other pairs of its batch, so evaluation loaders should use
+    `fixed_size_collate_func` instead.
+
+    Parameters
+    ----------
+    x : list of tuples
+        Each tuple contains (drug_graph, protein_codes, label).
+
+    min_protein_length : int, optional (default=16)
+        Minimum length of the protein codes, which must be longer than the
+        total shrinkage of the protein CNN, i.e., `sum(KERNEL_SIZE) - len(KERNEL_SIZE)`.
+        Use `functools.partial` to change it.
+
+    Returns
+    -------
+    drug : torch_geometric.data.Batch
+        Batched molecular graphs with the same number of nodes each.
+
+    protein : torch.Tensor of shape (batch_size, sequence_length)
+        Protein codes, padded with zeros.
+
+    label : torch.Tensor of shape (batch_size,)
+        Labels.
+    """
+    drug, protein, label = zip(*x)
+
+    protein = np.array(protein)
+    # Codes are 0 after the end of the sequences
+    nonzero = protein.any(axis=0)
+    length = len(nonzero) - np.argmax(nonzero[::-1]) if nonzero.any() else 0
+    protein = protein[:, : max(length, min_protein_length)]
+
+    return batch_graphs(drug), torch.tensor(protein), torch.tensor(label)
+
+
+def fixed_size_collate_func(x, max_drug_nodes=290):
+    """
+    Batch drug-target pairs, padding every drug to the same fixed number of nodes.
+
+    For datasets built without virtual nodes (`max_drug_nodes=0`), this gives
+    the same batches as `kale.loaddata.molecular_datasets.graph_collate_func`
+    on a dataset padded to `max_drug_nodes`, with the proteins kept at their
+    full encoded length, so the prediction of a pair does not depend on the
+    other pairs of its batch. Use `functools.partial` to set `max_drug_nodes`.
+
+    Parameters
+    ----------
+    x : list of tuples
+        Each tuple contains (drug_graph, protein_codes, label).
+
+    max_drug_nodes : int, optional (default=290)
+        Number of nodes each molecular graph is padded to, e.g., `cfg.DRUG.MAX_NODES`.
+
+    Returns
+    -------
+    drug : torch_geometric.data.Batch
+        Batched molecular graphs with `max_drug_nodes` nodes each.
+
+    protein : torch.Tensor of shape (batch_size, max_protein_length)
+        Protein codes, padded with zeros.
+
+    label : torch.Tensor of shape (batch_size,)
+        Labels.
+    """
+    drug, protein, label = zip(*x)
+    return (
+        batch_graphs(drug, max_drug_nodes),
+        torch.tensor(np.array(protein)),
+        torch.tensor(label),
+    )
+
+
+def batch_graphs(graphs, n_nodes=None):
+    """
+    Batch molecular graphs, padding each with zero-feature virtual nodes to the same size.
+
+    Parameters
+    ----------
+    graphs : list of torch_geometric.data.Data
+        Molecular graphs, e.g., from `smiles_to_graph(smiles, max_drug_nodes=0)`.
+
+    n_nodes : int or None, optional (default=None)
+        Number of nodes to pad the graphs to, e.g., `cfg.DRUG.MAX_NODES`. If
+        None, the graphs are padded to the largest one.
+
+    Returns
+    -------
+    drug : torch_geometric.data.Batch
+        Batched graphs with `n_nodes` nodes each.
+    """
+    if n_nodes is None:
+        n_nodes = max(graph.x.size(0) for graph in graphs)
+
+    padded = []
+    for graph in graphs:
+        node_x = graph.x
+        if node_x.size(0) < n_nodes:
+            padding = node_x.new_zeros(n_nodes - node_x.size(0), node_x.size(1))
+            node_x = torch.cat([node_x, padding])
+        padded.append(
+            Data(
+                x=node_x,
+                edge_index=graph.edge_index,
+                edge_attr=graph.edge_attr,
+                num_nodes=n_nodes,
+            )
+        )
+    return Batch.from_data_list(padded)
+
+
+def get_dataloader(
+    dataset,
+    bucketing=False,
+    max_protein_length=1200,
+    min_protein_length=16,
+    max_drug_nodes=None,
+    **params,
+):
+    """
+    Create a `DataLoader`, batching pairs by length if enabled.
+
+    Parameters
+    ----------
+    dataset : PackedDTIDataset or kale.loaddata.molecular_datasets.DTIDataset
+        Dataset of drug-target pairs. With bucketing, it must be built with
+        `max_drug_nodes=0`.
+
+    bucketing : bool, optional (default=False)
+        Whether to batch pairs with a `LengthBucketSampler` and pad them with
+        `batch_max_collate_func`, e.g., `cfg.DRUG.BUCKETING`.
+
+    max_protein_length : int, optional (default=1200)
+        Length the protein sequences are truncated to.
+
+    min_protein_length : int, optional (default=16)
+        Minimum length of the protein codes of a batch.
+
+    max_drug_nodes : int or None, optional (default=None)
+        If given, the pairs are not bucketed but batched in order with
+        `fixed_size_collate_func`, padding the graphs of a dataset built with
+        `max_drug_nodes=0` to this number of nodes, e.g., `cfg.DRUG.MAX_NODES`
+        for the evaluation loaders of a model trained with bucketing.
+
+    **params : dict
+        Parameters of `DataLoader`. With bucketing, `batch_size`, `shuffle`,
+        and `drop_last` are passed to the sampler, and `collate_fn` is replaced.
+
+    Returns
+    -------
+    dataloader : DataLoader
+        Data loader of the dataset, also usable in `MultiDataLoader`.
+    """
+    if max_drug_nodes is not None:
+        params["collate_fn"] = partial(
+            fixed_size_collate_func, max_drug_nodes=max_drug_nodes
+        )
+        return DataLoader(dataset, **params)
+    if not bucketing:
+        return DataLoader(dataset, **params)
+
+    sampler = LengthBucketSampler(
+        pair_lengths(dataset, max_protein_length),
+        params.pop("batch_size", 1),
+        shuffle=params.pop("shuffle", False),
+        drop_last=params.pop("drop_last", False),
+    )
+    params["collate_fn"] = partial(
+        batch_max_collate_func, min_protein_length=min_protein_length
+    )
+    return DataLoader(dataset, batch_sampler=sampler, **params)
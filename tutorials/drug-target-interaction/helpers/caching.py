@@ -0,0 +1,224 @@
+import hashlib
+from collections import OrderedDict
+from itertools import chain
+
+import numpy as np
+import torch
+from pytorch_lightning.callbacks import Callback
+from torch_geometric.data import Batch
+
+__all__ = ["EmbeddingCache", "KeepBestEmbeddings", "cache_embeddings"]
+
+
+class EmbeddingCache:
+    """
+    LRU cache of the embeddings of a DrugBAN encoder in evaluation.
+
+    Installed in place of the `forward` of an encoder by `cache_embeddings`.
+    In training mode, or with gradients enabled, the encoder runs as usual.
+    Otherwise, each drug or protein of a batch is looked up by a hash of its
+    inputs, which identifies the molecule or sequence, and of the current
+    weights of the encoder, so embeddings are reused as long as the weights
+    are the same, and are never reused after the weights change. Only the
+    drugs or proteins missing from the cache are encoded, in one smaller
+    batch, and the least recently used embeddings are evicted beyond
+    `max_megabytes`. The embeddings of given weights, e.g., of the best
+    validated epoch, can be kept apart from the eviction with `keep`, so the
+    test of its checkpoint reuses them after later epochs.
+
+    Parameters
+    ----------
+    encoder : torch.nn.Module
+        `molecular_extractor` or `protein_extractor` of a DrugBAN model.
+
+    max_megabytes : float, optional (default=512)
+        Memory bound of the cached embeddings, which are kept on the device
+        of the encoder. The embeddings set apart by `keep` are held on top.
+    """
+
+    def __init__(self, encoder, max_megabytes=512):
+        self.encoder = encoder
+        self.max_bytes = int(max_megabytes * 2**20)
+        self.n_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._kept = {}
+        self._versions = None
+        self._weights = None
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __call__(self, inputs):
+        if self.encoder.training or torch.is_grad_enabled():
+            return self._encode(inputs)
+
+        weights = self._weights_key()
+        keys = [(weights, key) for key in _input_keys(inputs)]
+        embeddings, missing = {}, {}
+        for i, key in enumerate(keys):
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                embeddings[key] = self._entries[key]
+            elif key in self._kept:
+                embeddings[key] = self._kept[key]
+            else:
+                missing.setdefault(key, i)
+        self.hits += len(keys) - len(missing)
+        self.misses += len(missing)
+
+        if missing:
+            encoded = self._encode(_select(inputs, list(missing.values())))
+            for key, embedding in zip(missing, encoded):
+                # Copies, so the cache does not keep the whole batch alive
+                embeddings[key] = embedding.clone()
+                self._add(key, embeddings[key])
+        return torch.stack([embeddings[key] for key in keys])
+
+    def keep(self):
+        """Set apart the embeddings cached with the current weights, replacing the ones kept before."""
+        weights = self._weights_key()
+        self._kept = {k: v for k, v in self._entries.items() if k[0] == weights}
+
+    def clear(self):
+        """Remove all the cached embeddings and reset the counts of hits and misses."""
+        self._entries.clear()
+        self._kept.clear()
+        self.n_bytes = self.hits = self.misses = 0
+
+    def _encode(self, inputs):
+        return type(self.encoder).forward(self.encoder, inputs)
+
+    def _add(self, key, embedding):
+        self._entries[key] = embedding
+        self.n_bytes += embedding.numel() * embedding.element_size()
+        while self.n_bytes > self.max_bytes and self._entries:
+            _, evicted = self._entries.popitem(last=False)
+            self.n_bytes -= evicted.numel() * evicted.element_size()
+
+    def _weights_key(self):
+        tensors = list(chain(self.encoder.parameters(), self.encoder.buffers()))
+        # In-place updates, e.g., optimizer steps or loading a checkpoint, bump the versions
+        versions = [(t.data_ptr(), t._version) for t in tensors]
+        if versions != self._versions:
+            self._weights = _digest(*(t.detach().cpu().numpy() for t in tensors))
+            self._versions = versions
+        return self._weights
+
+
+def cache_embeddings(model, max_megabytes=1024):
+    """
+    Cache the drug and protein embeddings of a DrugBAN model in evaluation.
+
+    Drugs and proteins shared by many pairs, e.g., targets in BindingDB, are
+    then encoded once per evaluation pass instead of once per pair, and
+    passes with the same weights share the embeddings. With
+    `KeepBestEmbeddings`, the test of the best checkpoint on the validation
+    data reuses those of its validation pass. The weights and checkpoints of
+    the model are unchanged.
+
+    Parameters
+    ----------
+    model : DrugBAN or DrugbanTrainer
+        Model whose GCN and CNN encoders are cached.
+
+    max_megabytes : float, optional (default=1024)
+        Memory bound of all the cached embeddings, split equally between the
+        drugs and the proteins.
+
+    Returns
+    -------
+    caches : dict
+        `EmbeddingCache` of the drugs and of the proteins, keyed by "drug" and
+        "protein".
+    """
+    net = getattr(model, "model", model)
+    caches = {}
+    for name, encoder in (
+        ("drug", net.molecular_extractor),
+        ("protein", net.protein_extractor),
+    ):
+        caches[name] = EmbeddingCache(encoder, max_megabytes / 2)
+        # An instance attribute, so the modules and their state dicts are unchanged
+        encoder.forward = caches[name]
+    return caches
+
+
+class KeepBestEmbeddings(Callback):
+    """
+    Keep the cached embeddings of the best validated epoch for the test pass.
+
+    After every validation, the embedding caches set apart the embeddings of
+    the current weights if the epoch is the best one so far by the metric
+    and mode of the checkpoint callback, which saves the same epoch. Testing
+    the best checkpoint on the validation data, as in the tutorial, then
+    reuses all the embeddings of its validation pass even if later epochs
+    were validated since.
+
+    Parameters
+    ----------
+    caches : dict
+        `EmbeddingCache` of the drugs and of the proteins, as returned by
+        `cache_embeddings`.
+
+    checkpoint : ModelCheckpoint
+        Callback saving the best checkpoint, whose `monitor` and `mode` are
+        followed.
+    """
+
+    def __init__(self, caches, checkpoint):
+        self.caches = caches
+        self.checkpoint = checkpoint
+        self.best_score = None
+
+    def on_validation_end(self, trainer, pl_module):
+        score = trainer.callback_metrics.get(self.checkpoint.monitor)
+        if trainer.sanity_checking or score is None or torch.isnan(score):
+            return
+
+        score = score.item()
+        # Only strict improvements, as `ModelCheckpoint` keeps the first best epoch
+        improved = self.best_score is None or (
+            score > self.best_score
+            if self.checkpoint.mode == "max"
+            else score < self.best_score
+        )
+        if improved:
+            self.best_score = score
+            for cache in self.caches.values():
+                cache.keep()
+
+
+def _digest(*arrays):
+    digest = hashlib.blake2b(digest_size=16)
+    for array in arrays:
+        digest.update(str((array.dtype, array.shape)).encode())
+        digest.update(np.ascontiguousarray(array).tobytes())
+    return digest.digest()
+
+
+def _input_keys(inputs):
+    """Hash every molecular graph of a batch, or every row of protein codes."""
+    if not isinstance(inputs, Batch):
+        return [_digest(row) for row in inputs.cpu().numpy()]
+
+    # The GCN only uses the node features and the edges
+    ptr = inputs.ptr.cpu().numpy()
+    x = inputs.x.cpu().numpy()
+    edge_index = inputs.edge_index.cpu().numpy()
+    # Edges are stored graph by graph
+    edge_graph = np.searchsorted(ptr, edge_index[0], side="right") - 1
+    edge_ptr = np.searchsorted(edge_graph, np.arange(len(ptr)))
+    return [
+        _digest(x[start:stop], edge_index[:, edge_start:edge_stop] - start)
+        for start, stop, edge_start, edge_stop in zip(
+            ptr[:-1], ptr[1:], edge_ptr[:-1], edge_ptr[1:]
+        )
+    ]
+
+
+def _select(inputs, index):
+    if isinstance(inputs, Batch):
+        return Batch.from_data_list(inputs.index_select(index))
+    return inputs[index]
@@ -0,0 +1,359 @@
+import os
+
+import numpy as np
+import pandas as pd
+import torch
+import torch.nn.functional as F
+from kale.embed.model_lib.drugban import DrugBAN
+from kale.loaddata.molecular_datasets import smiles_to_graph
+from kale.pipeline.drugban_trainer import DrugbanTrainer
+from kale.prepdata.chem_transform import integer_label_protein
+from rdkit import Chem
+from torch.utils.data import DataLoader, IterableDataset, get_worker_info
+
+from .batching import batch_graphs
+
+__all__ = ["load_drugban", "read_targets", "screen_library"]
+
+
+def load_drugban(checkpoint_path, cfg, map_location="cpu"):
+    """
+    Load a `DrugbanTrainer` checkpoint with the model and solver settings of a config.
+
+    Parameters
+    ----------
+    checkpoint_path : str
+        Path of the checkpoint, e.g., "checkpoint/best.ckpt".
+
+    cfg : CfgNode
+        Tutorial config the checkpoint was trained with.
+
+    map_location : str or torch.device, optional (default="cpu")
+        Device the weights are loaded to.
+
+    Returns
+    -------
+    model : DrugbanTrainer
+        The trained model, in evaluation mode.
+    """
+    model = DrugbanTrainer.load_from_checkpoint(
+        checkpoint_path=checkpoint_path,
+        map_location=map_location,
+        model=DrugBAN(cfg),
+        solver_lr=cfg.SOLVER.LEARNING_RATE,
+        num_classes=cfg.DECODER.BINARY,
+        batch_size=cfg.SOLVER.BATCH_SIZE,
+        is_da=cfg.DA.USE,
+        solver_da_lr=cfg.SOLVER.DA_LEARNING_RATE,
+        da_init_epoch=cfg.DA.INIT_EPOCH,
+        da_method=cfg.DA.METHOD,
+        original_random=cfg.DA.ORIGINAL_RANDOM,
+        use_da_entropy=cfg.DA.USE_ENTROPY,
+        da_random_layer=cfg.DA.RANDOM_LAYER,
+        da_random_dim=cfg.DA.RANDOM_DIM,
+        decoder_in_dim=cfg.DECODER.IN_DIM,
+    )
+    return model.eval()
+
+
+def read_targets(targets):
+    """
+    Read the protein sequences to screen against.
+
+    Parameters
+    ----------
+    targets : str, list of str, or dict
+        Path of a FASTA file or of a text file with one sequence per line, a
+        single sequence, a list of sequences, or sequences keyed by name.
+
+    Returns
+    -------
+    targets : dict
+        Sequences keyed by name, taken from the FASTA headers, or "target_0",
+        "target_1", etc.
+    """
+    if isinstance(targets, dict):
+        return dict(targets)
+    if isinstance(targets, str) and os.path.isfile(targets):
+        with open(targets, "r") as f:
+            lines = [line.strip() for line in f if line.strip()]
+        if lines and lines[0].startswith(">"):
+            sequences = {}
+            for line in lines:
+                if line.startswith(">"):
+                    name = line[1:].split()[0]
+                    sequences[name] = ""
+                else:
+                    sequences[name] += line
+            return sequences
+        targets = lines
+    if isinstance(targets, str):
+        targets = [targets]
+    return {f"target_{i}": sequence for i, sequence in enumerate(targets)}
+
+
+class _LibraryBatches(IterableDataset):
+    """Featurized batches of a compound library, read in chunks and split across workers."""
+
+    def __init__(self, path, batch_size, max_drug_nodes, smiles_column, id_column):
+        self.path = path
+        self.batch_size = batch_size
+        self.max_drug_nodes = max_drug_nodes
+        self.smiles_column = smiles_column
+        self.id_column = id_column
+
+    def _chunks(self):
+        if self.path.endswith((".smi", ".smiles", ".txt")):
+            # One SMILES string per line, optionally followed by an ID, which
+            # is only read if the first line has one
+            with open(self.path, "r") as f:
+                first = next((line for line in f if line.strip()), "")
+            names = [self.smiles_column, "ID"][: len(first.split()[:2])]
+            reader = pd.read_csv(
+                self.path,
+                sep=r"\s+",
+                header=None,
+                names=names,
+                usecols=range(len(names)),
+                chunksize=self.batch_size,
+            )
+            id_column = "ID" if len(names) > 1 else None
+        else:
+            reader = pd.read_csv(self.path, chunksize=self.batch_size)
+            id_column = self.id_column
+
+        start = 0
+        for chunk in reader:
+            # Compounds without an ID are named by their row number
+            ids = np.arange(start, start + len(chunk)).astype(object)
+            if id_column is not None:
+                named = chunk[id_column].notna().to_numpy()
+                ids[named] = chunk[id_column].to_numpy()[named]
+            yield ids, chunk[self.smiles_column].to_numpy()
+            start += len(chunk)
+
+    def __iter__(self):
+        worker = get_worker_info()
+        for i, (ids, smiles) in enumerate(self._chunks()):
+            if worker is not None and i % worker.num_workers != worker.id:
+                continue
+
+            graphs, valid = [], np.zeros(len(smiles), dtype=bool)
+            for j, s in enumerate(smiles):
+                mol = Chem.MolFromSmiles(s) if isinstance(s, str) else None
+                # Larger molecules do not fit the fixed padding of the model
+                if mol is None or mol.GetNumAtoms() > (self.max_drug_nodes or np.inf):
+                    continue
+                graphs.append(smiles_to_graph(s, max_drug_nodes=0))
+                valid[j] = True
+
+            drug = batch_graphs(graphs, self.max_drug_nodes) if graphs else None
+            yield ids, smiles, valid, drug
+
+
+def screen_library(
+    model,
+    library,
+    targets,
+    output,
+    batch_size=128,
+    max_drug_nodes=290,
+    max_protein_length=1200,
+    top_k=None,
+    num_workers=0,
+    smiles_column="SMILES",
+    id_column=None,
+    device="cpu",
+    verbose=True,
+):
+    """
+    Score every compound of a library against one or more targets, and rank them.
+
+    The library is streamed in batches of `batch_size` compounds, which are
+    featurized (in `num_workers` processes) and encoded by the GCN once for
+    all the targets. The protein CNN embedding of each target is computed
+    once and shared by all the compounds. As the attention maps are not
+    needed, the protein side of the bilinear attention is also folded once
+    per target into a matrix independent of the sequence length (see
+    `_encode_target`), which gives the same scores as the full model. Scores
+    are appended to `output + ".partial"` after each batch, so progress is
+    kept if the run is interrupted, and the ranked results are written to
+    `output` at the end.
+    No batch is dropped: compounds that cannot be parsed or have more than
+    `max_drug_nodes` atoms are kept with a missing score.
+
+    Parameters
+    ----------
+    model : DrugbanTrainer or DrugBAN
+        Trained model, e.g., from `load_drugban`.
+
+    library : str
+        Path of a CSV file with a SMILES column, or of a `.smi` file with one
+        SMILES string and an optional ID per line. Compounds without an ID
+        are named by their row number.
+
+    targets : str, list of str, or dict
+        Protein sequences, as accepted by `read_targets`.
+
+    output : str
+        Path of the CSV file of ranked results, with the columns "ID",
+        "SMILES", "target", "score", and "rank" (per target).
+
+    batch_size : int, optional (default=128)
+        Number of compounds per batch.
+
+    max_drug_nodes : int or None, optional (default=290)
+        Number of nodes each molecular graph is padded to, as in evaluation
+        (`cfg.DRUG.MAX_NODES`). If None, graphs are padded to the largest of
+        each batch, but the padding is left out of the bilinear attention,
+        so each compound is scored as if it were not padded, independently
+        of the other compounds of its batch. This is faster, but the scores
+        differ from those with fixed padding.
+
+    max_protein_length : int, optional (default=1200)
+        Length the protein sequences are truncated (and padded) to.
+
+    top_k : int or None, optional (default=None)
+        Number of best compounds kept per target. If None, all are kept.
+
+    num_workers : int, optional (default=0)
+        Number of processes featurizing the compounds.
+
+    smiles_column : str, optional (default="SMILES")
+        Column of the SMILES strings in a CSV library.
+
+    id_column : str or None, optional (default=None)
+        Column of the compound IDs in a CSV library. If None, row numbers are used.
+
+    device : str or torch.device, optional (default="cpu")
+        Device running the model.
+
+    verbose : bool, optional (default=True)
+        Whether to print the progress.
+
+    Returns
+    -------
+    results : pd.DataFrame
+        The ranked results written to `output`.
+    """
+    net = getattr(model, "model", model).to(device).eval()
+    targets = read_targets(targets)
+    directory = os.path.dirname(output)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    dataset = _LibraryBatches(
+        library, batch_size, max_drug_nodes, smiles_column, id_column
+    )
+    loader = DataLoader(dataset, batch_size=None, num_workers=num_workers)
+    partial_path = output + ".partial"
+    columns = ["ID", "SMILES", "target", "score"]
+    pd.DataFrame(columns=columns).to_csv(partial_path, index=False)
+
+    n_scored = 0
+    with torch.inference_mode():
+        targets_ = {}
+        for name, sequence in targets.items():
+            codes = integer_label_protein(sequence, max_protein_length)
+            codes = torch.tensor(codes, device=device).unsqueeze(0)
+            targets_[name] = _encode_target(net.bcn, net.protein_extractor(codes))
+
+        for ids, smiles, valid, drug in loader:
+            # The loader turns the validity mask into a tensor, which indexes as an
+            # integer when it has a single element
+            valid = np.asarray(valid)
+            drug_features = mask = None
+            if drug is not None:
+                drug = drug.to(device)
+                drug_features = net.molecular_extractor(drug)
+                if max_drug_nodes is None:
+                    # Virtual nodes have no atomic number
+                    mask = (drug.x[:, 0] != 0).view(len(drug_features), -1)
+
+            frames = []
+            for name, target in targets_.items():
+                scores = np.full(len(smiles), np.nan)
+                if drug_features is not None:
+                    score = net.mlp_classifier(
+                        _fuse(net.bcn, drug_features, target, mask)
+                    )
+                    if score.size(1) == 1:
+                        score = torch.sigmoid(score[:, 0])
+                    else:
+                        score = F.softmax(score, dim=1)[:, 1]
+                    scores[valid] = score.cpu().numpy()
+                frames.append(
+                    pd.DataFrame(
+                        {"ID": ids, "SMILES": smiles, "target": name, "score": scores}
+                    )
+                )
+
+            pd.concat(frames).to_csv(partial_path, mode="a", header=False, index=False)
+            n_scored += len(smiles)
+            if verbose:
+                print(f"\r{n_scored} compounds scored", end="", flush=True)
+
+    if verbose:
+        print()
+    results = pd.read_csv(partial_path, dtype={"ID": str, "SMILES": str, "target": str})
+    results = results.sort_values(
+        ["target", "score"], ascending=[True, False], na_position="last", kind="stable"
+    )
+    results["rank"] = results.groupby("target").cumcount() + 1
+    if top_k is not None:
+        results = results[results["rank"] <= top_k]
+    results.to_csv(output, index=False)
+    os.remove(partial_path)
+    return results.reset_index(drop=True)
+
+
+def _encode_target(bcn, protein_features):
+    """
+    Precompute the protein side of a `BANLayer` for all the drugs screened against it.
+
+    Without softmax, the pooled logits of the bilinear attention of drug
+    features `v` and protein features `q` (after `v_net` and `q_net`) are
+    `sum_l h[l] (v^T v)[k, l] (q^T q)[k, l] + b sum(v[:, k]) sum(q[:, k])`,
+    with `h` and `b` the sums of the attention weights and biases over the
+    heads. The protein terms are computed once here, so scoring a drug no
+    longer depends on the length of the protein or needs the attention maps.
+    """
+    if not hasattr(bcn, "h_mat"):
+        # Layers with many heads use a different attention, run as is
+        return protein_features
+
+    q = bcn.q_net(protein_features)[0]
+    gram = (q.T @ q) * bcn.h_mat.sum(dim=1).view(1, -1)
+    return gram, q.sum(dim=0) * bcn.h_bias.sum()
+
+
+def _fuse(bcn, drug_features, target, mask=None):
+    """
+    Joint representations of drugs and a target encoded by `_encode_target`.
+
+    With a `mask` of the atoms among the nodes, the padded nodes are left out
+    of the attention, which gives the representations of unpadded drugs.
+    """
+    if not isinstance(target, tuple):
+        if mask is not None:
+            # The attention is normalized over all the nodes, so drugs are
+            # fused one at a time with their atoms only
+            return torch.cat(
+                [
+                    _fuse(bcn, f[m].unsqueeze(0), target)
+                    for f, m in zip(drug_features, mask)
+                ]
+            )
+        logits, _ = bcn(drug_features, target.expand(len(drug_features), -1, -1))
+        return logits
+
+    gram, bias = target
+    v = bcn.v_net(drug_features)
+    if mask is not None:
+        # Nodes only add up in the pooled logits
+        v = v * mask.unsqueeze(-1)
+    logits = (v * (v @ gram.T)).sum(dim=1) + v.sum(dim=1) * bias
+    if 1 < bcn.num_att_maps:
+        # Sum-pooling over the attention maps, as in `BANLayer.attention_pooling`
+        logits = bcn.p_net(logits.unsqueeze(1)).squeeze(1) * bcn.num_att_maps
+    return bcn.bn(logits)
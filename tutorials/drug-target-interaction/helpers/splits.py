@@ -0,0 +1,558 @@
+import json
+import os
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+from joblib import Parallel, delayed
+from rdkit import Chem
+from rdkit.Chem import rdFingerprintGenerator
+from sklearn.utils._param_validation import Integral, Interval, Real, validate_params
+
+__all__ = [
+    "SPLIT_FILES",
+    "build_splits",
+    "cluster_fingerprints",
+    "drug_fingerprints",
+    "protein_sketches",
+    "read_split",
+    "split_source",
+]
+
+# Interaction table of a dataset, shared by its splits
+TABLE_FILE = "interactions.npz"
+
+# Rows of the interaction table in each pair file of a split
+INDEX_FILE = "splits.npz"
+
+META_FILE = "splits.json"
+
+# Pair files of the cross-domain (True) and in-domain (False) tasks
+SPLIT_FILES = {
+    True: ("source_train", "target_train", "target_test"),
+    False: ("train", "val", "test"),
+}
+
+
+@validate_params(
+    {
+        "smiles": ["array-like"],
+        "radius": [Interval(Integral, 0, None, closed="left")],
+        "n_bits": [Interval(Integral, 8, None, closed="left")],
+        "n_jobs": [None, Integral],
+    },
+    prefer_skip_nested_validation=False,
+)
+def drug_fingerprints(smiles, radius=2, n_bits=1024, n_jobs=None):
+    """
+    Compute the Morgan (ECFP) fingerprints of drugs, packed into bytes.
+
+    Parameters
+    ----------
+    smiles : array-like of str
+        SMILES strings of the drugs.
+
+    radius : int, optional (default=2)
+        Radius of the circular substructures, 2 for ECFP4.
+
+    n_bits : int, optional (default=1024)
+        Length of the fingerprints, a multiple of 8.
+
+    n_jobs : int or None, optional (default=None)
+        Number of processes, as in `joblib.Parallel`.
+
+    Returns
+    -------
+    fingerprints : np.ndarray of shape (n_drugs, n_bits // 8)
+        Fingerprints packed with `np.packbits`, all zeros for SMILES strings
+        that cannot be parsed.
+    """
+    smiles = np.asarray(smiles, dtype=object)
+    chunks = np.array_split(smiles, max(1, len(smiles) // 5000))
+    fingerprints = Parallel(n_jobs=n_jobs)(
+        delayed(_morgan_fingerprints)(chunk, radius, n_bits) for chunk in chunks
+    )
+    return np.concatenate(fingerprints)
+
+
+@validate_params(
+    {
+        "sequences": ["array-like"],
+        "k": [Interval(Integral, 1, None, closed="left")],
+        "n_bits": [Interval(Integral, 8, None, closed="left")],
+        "n_jobs": [None, Integral],
+    },
+    prefer_skip_nested_validation=False,
+)
+def protein_sketches(sequences, k=4, n_bits=8192, n_jobs=None):
+    """
+    Sketch the k-mer content of protein sequences into fixed-length bit vectors.
+
+    Every k-mer of a sequence is hashed to one of `n_bits` bits, so the
+    Tanimoto similarity of two sketches estimates the Jaccard similarity of
+    the k-mer sets of the proteins, as fingerprints do for drugs. All the
+    sequences of a chunk are sketched at once with array operations. Sketches
+    fill up for sequences with many more k-mers than `n_bits`, which then
+    look alike, so use more bits for datasets of very long proteins.
+
+    Parameters
+    ----------
+    sequences : array-like of str
+        Amino acid sequences.
+
+    k : int, optional (default=4)
+        Length of the k-mers.
+
+    n_bits : int, optional (default=8192)
+        Length of the sketches, a multiple of 8.
+
+    n_jobs : int or None, optional (default=None)
+        Number of processes, as in `joblib.Parallel`.
+
+    Returns
+    -------
+    sketches : np.ndarray of shape (n_proteins, n_bits // 8)
+        Sketches packed with `np.packbits`.
+    """
+    sequences = np.asarray(sequences, dtype=object)
+    chunks = np.array_split(sequences, max(1, len(sequences) // 2000))
+    sketches = Parallel(n_jobs=n_jobs)(
+        delayed(_kmer_sketches)(chunk, k, n_bits) for chunk in chunks
+    )
+    return np.concatenate(sketches)
+
+
+@validate_params(
+    {
+        "fingerprints": [np.ndarray],
+        "threshold": [Interval(Real, 0, 1, closed="both")],
+        "batch_size": [Interval(Integral, 1, None, closed="left")],
+        "seed": [None, Integral],
+    },
+    prefer_skip_nested_validation=False,
+)
+def cluster_fingerprints(fingerprints, threshold, batch_size=4096, seed=None):
+    """
+    Cluster packed binary fingerprints by Tanimoto similarity with leader clustering.
+
+    Fingerprints are visited in random order in batches. Each one joins the
+    most similar cluster leader of the previous batches if their similarity
+    is at least `threshold`, and otherwise becomes the leader of a new
+    cluster, which the next fingerprints of its batch above the threshold
+    join. Similarities are computed by matrix products of whole batches
+    against the leaders, so the cost grows with the number of fingerprints
+    times the number of clusters, unlike hierarchical clustering, which
+    needs all the pairwise similarities.
+
+    Parameters
+    ----------
+    fingerprints : np.ndarray of shape (n_samples, n_bytes)
+        Fingerprints packed with `np.packbits`, e.g., from `drug_fingerprints`
+        or `protein_sketches`.
+
+    threshold : float
+        Minimum Tanimoto similarity of a fingerprint to its cluster leader.
+
+    batch_size : int, optional (default=4096)
+        Number of fingerprints compared to as many leaders at once.
+
+    seed : int or None, optional (default=None)
+        Seed of the order of the fingerprints.
+
+    Returns
+    -------
+    labels : np.ndarray of shape (n_samples,)
+        Cluster of every fingerprint, numbered from 0.
+    """
+    order = np.random.default_rng(seed).permutation(len(fingerprints))
+    labels = np.empty(len(fingerprints), dtype=np.int32)
+    # Leaders are kept packed, and unpacked block by block when compared
+    leaders, leader_counts = [], []
+    n_leaders = 0
+
+    for batch in np.split(order, range(batch_size, len(order), batch_size)):
+        x = np.unpackbits(fingerprints[batch], axis=1).astype(np.float32)
+        counts = x.sum(axis=1)
+        assigned = np.full(len(batch), -1)
+
+        if n_leaders:
+            if len(leaders) > 1:
+                leaders = [np.concatenate(leaders)]
+                leader_counts = [np.concatenate(leader_counts)]
+            nearest = np.zeros(len(batch), dtype=np.int64)
+            best = np.full(len(batch), -1.0, dtype=np.float32)
+            for start in range(0, n_leaders, batch_size):
+                stop = start + batch_size
+                y = np.unpackbits(leaders[0][start:stop], axis=1).astype(np.float32)
+                similarity = _tanimoto(x, counts, y, leader_counts[0][start:stop])
+                block_nearest = similarity.argmax(axis=1)
+                block_best = similarity[np.arange(len(batch)), block_nearest]
+                better = block_best > best
+                nearest[better] = block_nearest[better] + start
+                best[better] = block_best[better]
+            close = best >= threshold
+            assigned[close] = nearest[close]
+
+        rest = np.flatnonzero(assigned < 0)
+        if len(rest):
+            similarity = _tanimoto(x[rest], counts[rest], x[rest], counts[rest])
+            new_leaders = []
+            for i in range(len(rest)):
+                if assigned[rest[i]] >= 0:
+                    continue
+                # Joined by the next unassigned fingerprints close enough
+                members = (similarity[i, i:] >= threshold) & (assigned[rest[i:]] < 0)
+                assigned[rest[i:][members]] = n_leaders
+                assigned[rest[i]] = n_leaders
+                new_leaders.append(rest[i])
+                n_leaders += 1
+            leaders.append(fingerprints[batch[new_leaders]])
+            leader_counts.append(counts[new_leaders])
+
+        labels[batch] = assigned
+    return labels
+
+
+@validate_params(
+    {
+        "table_path": [str],
+        "dataset_dir": [str],
+        "split": [str],
+        "cross_domain": ["boolean"],
+        "drug_threshold": [Interval(Real, 0, 1, closed="both")],
+        "protein_threshold": [Interval(Real, 0, 1, closed="both")],
+        "source_fraction": [Interval(Real, 0, 1, closed="neither")],
+        "test_fraction": [Interval(Real, 0, 1, closed="neither")],
+        "val_fraction": [Interval(Real, 0, 1, closed="left")],
+        "n_jobs": [None, Integral],
+        "seed": [None, Integral],
+        "overwrite": ["boolean"],
+        "verbose": ["boolean"],
+    },
+    prefer_skip_nested_validation=False,
+)
+def build_splits(
+    table_path,
+    dataset_dir,
+    split,
+    cross_domain=True,
+    drug_threshold=0.5,
+    protein_threshold=0.3,
+    source_fraction=0.6,
+    test_fraction=0.2,
+    val_fraction=0.1,
+    n_jobs=None,
+    seed=None,
+    overwrite=False,
+    verbose=True,
+):
+    """
+    Split a table of drug-target interactions into the pair files of a task.
+
+    The table is converted once into `dataset_dir/interactions.npz`, with
+    the unique SMILES strings and sequences packed into bytes and every pair
+    reduced to drug and protein indexes and its label, and only converted
+    again when it changes. The split is written to `dataset_dir/split` as the
+    rows of the table in every pair file (`splits.npz`), read with
+    `read_split`, instead of copies of the pairs in CSV files.
+
+    In the cross-domain task, drugs are clustered by their ECFP4 fingerprints
+    and proteins by their 4-mer sketches with `cluster_fingerprints`, and
+    `source_fraction` of the drug clusters and of the protein clusters are
+    drawn at random. As in DrugBAN, pairs of a source drug and a source
+    protein form the source domain ("source_train"), pairs of the other
+    drugs and proteins form the target domain, of which `test_fraction` is
+    held out ("target_test", the rest being "target_train"), and the other
+    pairs are left out. In the in-domain task, pairs are split at random
+    into "train", "val" (`val_fraction`), and "test" (`test_fraction`).
+
+    Parameters
+    ----------
+    table_path : str
+        CSV file of the interactions, with the columns "SMILES", "Protein",
+        and "Y", e.g., `full.csv` of a dataset.
+
+    dataset_dir : str
+        Folder of the dataset, e.g., "data/drug-target-interaction/bindingdb".
+
+    split : str
+        Name of the split, e.g., `cfg.DATA.SPLIT`.
+
+    cross_domain : bool, optional (default=True)
+        Whether to build the cluster-based cross-domain task or the random
+        in-domain task, e.g., `cfg.DA.TASK`.
+
+    drug_threshold : float, optional (default=0.5)
+        Minimum Tanimoto similarity of the fingerprints of drugs in the same cluster.
+
+    protein_threshold : float, optional (default=0.3)
+        Minimum Tanimoto similarity of the sketches of proteins in the same cluster.
+
+    source_fraction : float, optional (default=0.6)
+        Fraction of the drug and protein clusters in the source domain.
+
+    test_fraction : float, optional (default=0.2)
+        Fraction of the target domain, or of all the pairs in the in-domain
+        task, held out for testing.
+
+    val_fraction : float, optional (default=0.1)
+        Fraction of the pairs used for validation in the in-domain task.
+
+    n_jobs : int or None, optional (default=None)
+        Number of processes computing the fingerprints and sketches.
+
+    seed : int or None, optional (default=None)
+        Seed of the clustering and of the split, e.g., `cfg.SOLVER.SEED`.
+
+    overwrite : bool, optional (default=False)
+        Whether to write the split into a folder that already has pair files
+        or an index. The index is read in place of the CSV pair files, so
+        this replaces a downloaded split, e.g., "cluster" of BindingDB.
+
+    verbose : bool, optional (default=True)
+        Whether to print the sizes of the clusters and pair files.
+
+    Returns
+    -------
+    data_folder : str
+        Folder of the split, to pass to `read_split`.
+
+    Raises
+    ------
+    FileExistsError
+        If the folder of the split already has pair files or an index and
+        `overwrite` is False.
+    """
+    data_folder = os.path.join(dataset_dir, split)
+    if not overwrite and os.path.isdir(data_folder):
+        existing = [
+            name
+            for name in sorted(os.listdir(data_folder))
+            if name.endswith(".csv") or name == INDEX_FILE
+        ]
+        if existing:
+            raise FileExistsError(
+                f"{data_folder} already has the pair files {', '.join(existing)}, "
+                "pass overwrite=True (--overwrite in make_splits.py) to replace them."
+            )
+
+    table = _convert_table(table_path, dataset_dir)
+    rng = np.random.default_rng(seed)
+    n_pairs = len(table["label"])
+
+    if cross_domain:
+        drug_clusters = cluster_fingerprints(
+            drug_fingerprints(_unpack(table, "smiles"), n_jobs=n_jobs),
+            drug_threshold,
+            seed=seed,
+        )
+        protein_clusters = cluster_fingerprints(
+            protein_sketches(_unpack(table, "sequences"), n_jobs=n_jobs),
+            protein_threshold,
+            seed=seed,
+        )
+        in_source = []
+        for clusters in (drug_clusters, protein_clusters):
+            n_clusters = clusters.max() + 1
+            n_source = round(source_fraction * n_clusters)
+            source = np.zeros(n_clusters, dtype=bool)
+            source[rng.permutation(n_clusters)[:n_source]] = True
+            in_source.append(source[clusters])
+        drug_source = in_source[0][table["drug"]]
+        protein_source = in_source[1][table["protein"]]
+
+        target = rng.permutation(np.flatnonzero(~drug_source & ~protein_source))
+        n_test = round(test_fraction * len(target))
+        rows = {
+            "source_train": np.flatnonzero(drug_source & protein_source),
+            "target_train": np.sort(target[n_test:]),
+            "target_test": np.sort(target[:n_test]),
+        }
+        clusters = {"drug_cluster": drug_clusters, "protein_cluster": protein_clusters}
+    else:
+        order = rng.permutation(n_pairs)
+        n_test, n_val = round(test_fraction * n_pairs), round(val_fraction * n_pairs)
+        rows = {
+            "train": np.sort(order[n_test + n_val :]),
+            "val": np.sort(order[n_test : n_test + n_val]),
+            "test": np.sort(order[:n_test]),
+        }
+        clusters = {}
+
+    os.makedirs(data_folder, exist_ok=True)
+    dtype = np.int32 if n_pairs < 2**31 else np.int64
+    np.savez(
+        os.path.join(data_folder, INDEX_FILE),
+        **{name: index.astype(dtype) for name, index in rows.items()},
+        **clusters,
+    )
+    meta = {
+        "table": os.path.abspath(table_path),
+        "cross_domain": cross_domain,
+        "seed": seed,
+        "n_pairs": {name: len(index) for name, index in rows.items()},
+    }
+    if cross_domain:
+        meta.update(
+            drug_threshold=drug_threshold,
+            protein_threshold=protein_threshold,
+            source_fraction=source_fraction,
+            n_drug_clusters=int(drug_clusters.max()) + 1,
+            n_protein_clusters=int(protein_clusters.max()) + 1,
+        )
+    with open(os.path.join(data_folder, META_FILE), "w") as f:
+        json.dump(meta, f, indent=2)
+
+    if verbose:
+        if cross_domain:
+            print(
+                f"{meta['n_drug_clusters']} drug clusters and "
+                f"{meta['n_protein_clusters']} protein clusters"
+            )
+        print(", ".join(f"{name}: {n} pairs" for name, n in meta["n_pairs"].items()))
+    return data_folder
+
+
+def read_split(data_folder, split):
+    """
+    Read a pair file of a data split as a table.
+
+    Parameters
+    ----------
+    data_folder : str
+        Folder of the split, with the index written by `build_splits`, or
+        otherwise CSV pair files, as in the downloaded data.
+
+    split : str
+        Name of the pair file, e.g., "source_train".
+
+    Returns
+    -------
+    pairs : pd.DataFrame
+        Pairs with the columns "SMILES", "Protein", and "Y".
+    """
+    source = split_source(data_folder, split)
+    if source.endswith(".csv"):
+        return pd.read_csv(source)
+
+    with np.load(source) as index:
+        if split not in index.files:
+            raise KeyError(f"Split {split} is not in the index {source}.")
+        rows = index[split]
+    table_path = os.path.join(os.path.dirname(os.path.abspath(data_folder)), TABLE_FILE)
+    smiles, sequences, drug, protein, label = _read_table(
+        table_path, os.stat(table_path).st_mtime_ns
+    )
+    return pd.DataFrame(
+        {
+            "SMILES": smiles[drug[rows]],
+            "Protein": sequences[protein[rows]],
+            "Y": label[rows],
+        }
+    )
+
+
+def split_source(data_folder, split):
+    """File a pair file is read from: the index of the split if any, else its CSV file."""
+    index_path = os.path.join(data_folder, INDEX_FILE)
+    if os.path.exists(index_path):
+        return index_path
+    return os.path.join(data_folder, f"{split}.csv")
+
+
+def _convert_table(table_path, dataset_dir):
+    """Pack the interaction table into `TABLE_FILE`, unless it is up to date."""
+    stat = os.stat(table_path)
+    source = [os.path.abspath(table_path), stat.st_size, stat.st_mtime_ns]
+    path = os.path.join(dataset_dir, TABLE_FILE)
+    if os.path.exists(path):
+        with np.load(path) as table:
+            if table["source"].tolist() == [str(s) for s in source]:
+                return dict(table)
+
+    pairs = pd.read_csv(table_path, usecols=["SMILES", "Protein", "Y"])
+    drug, smiles = pd.factorize(pairs["SMILES"])
+    protein, sequences = pd.factorize(pairs["Protein"])
+    table = {
+        **_pack(smiles, "smiles"),
+        **_pack(sequences, "sequences"),
+        "drug": drug.astype(np.int32),
+        "protein": protein.astype(np.int32),
+        "label": pairs["Y"].to_numpy(),
+        "source": np.array([str(s) for s in source]),
+    }
+    os.makedirs(dataset_dir, exist_ok=True)
+    # Written under another name first, so a failed conversion keeps the old table
+    tmp_path = path[: -len(".npz")] + ".tmp.npz"
+    np.savez(tmp_path, **table)
+    os.replace(tmp_path, path)
+    return table
+
+
+@lru_cache(maxsize=4)
+def _read_table(path, mtime_ns):
+    """Unique SMILES strings and sequences, and the drugs, proteins, and labels."""
+    with np.load(path) as table:
+        table = dict(table)
+    return (
+        _unpack(table, "smiles"),
+        _unpack(table, "sequences"),
+        table["drug"],
+        table["protein"],
+        table["label"],
+    )
+
+
+def _pack(strings, name):
+    encoded = [s.encode() for s in strings]
+    return {
+        name: np.frombuffer(b"".join(encoded), dtype=np.uint8),
+        f"{name}_ptr": np.concatenate([[0], np.cumsum([len(s) for s in encoded])]),
+    }
+
+
+def _unpack(table, name):
+    text, ptr = table[name].tobytes(), table[f"{name}_ptr"]
+    strings = np.empty(len(ptr) - 1, dtype=object)
+    strings[:] = [text[a:b].decode() for a, b in zip(ptr[:-1], ptr[1:])]
+    return strings
+
+
+def _morgan_fingerprints(smiles, radius, n_bits):
+    generator = rdFingerprintGenerator.GetMorganGenerator(radius=radius, fpSize=n_bits)
+    fingerprints = np.zeros((len(smiles), n_bits), dtype=np.uint8)
+    for i, s in enumerate(smiles):
+        mol = Chem.MolFromSmiles(s)
+        if mol is not None:
+            fingerprints[i] = generator.GetFingerprintAsNumPy(mol)
+    return np.packbits(fingerprints, axis=1)
+
+
+def _kmer_sketches(sequences, k, n_bits):
+    lengths = np.array([len(s) for s in sequences])
+    residues = np.frombuffer("".join(sequences).upper().encode(), dtype=np.uint8)
+    residues = residues.astype(np.int64) % 32
+
+    # Code every window of k residues of the concatenated sequences in base 32
+    n_windows = max(len(residues) - k + 1, 0)
+    codes = np.zeros(n_windows, dtype=np.int64)
+    for offset in range(k):
+        codes = codes * 32 + residues[offset : offset + n_windows]
+
+    # Keep the windows inside a sequence, and hash them to bits
+    starts = np.concatenate([[0], np.cumsum(lengths)[:-1]])
+    owner = np.repeat(np.arange(len(sequences)), lengths)[:n_windows]
+    inside = np.arange(n_windows) - starts[owner] <= lengths[owner] - k
+    bits = (codes[inside] * 0x9E3779B1 >> 7) % n_bits
+
+    sketches = np.zeros((len(sequences), n_bits), dtype=np.uint8)
+    sketches[owner[inside], bits] = 1
+    return np.packbits(sketches, axis=1)
+
+
+def _tanimoto(x, x_counts, y, y_counts):
+    # Computed in place, as the matrices of batches against leaders are large
+    similarity = x @ y.T
+    union = x_counts[:, None] + y_counts[None, :]
+    union -= similarity
+    return np.divide(similarity, union, out=similarity, where=union > 0)
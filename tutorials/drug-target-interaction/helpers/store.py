@@ -0,0 +1,383 @@
+import json
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+import torch
+from joblib import Parallel, delayed
+from kale.loaddata.molecular_datasets import smiles_to_graph
+from kale.prepdata.chem_transform import integer_label_protein
+from sklearn.utils._param_validation import Integral, Interval, validate_params
+from torch.utils.data import Dataset
+from torch_geometric.data import Data
+
+from .splits import SPLIT_FILES, read_split, split_source
+
+__all__ = ["DTIStore", "PackedDTIDataset", "build_dti_store", "get_packed_datasets"]
+
+META_FILE = "meta.json"
+
+# Packed arrays of a store, with the offsets of each drug or protein in `*_ptr`
+ARRAYS = (
+    "drug_x",
+    "drug_node_ptr",
+    "drug_edge_index",
+    "drug_edge_attr",
+    "drug_edge_ptr",
+    "protein_codes",
+    "protein_ptr",
+)
+
+
+@validate_params(
+    {
+        "data_folder": [str],
+        "store_dir": [str],
+        "splits": ["array-like"],
+        "max_protein_length": [Interval(Integral, 1, None, closed="left")],
+        "n_jobs": [None, Integral],
+        "overwrite": ["boolean"],
+        "verbose": ["boolean"],
+    },
+    prefer_skip_nested_validation=False,
+)
+def build_dti_store(
+    data_folder,
+    store_dir,
+    splits=SPLIT_FILES[True],
+    max_protein_length=1200,
+    n_jobs=None,
+    overwrite=False,
+    verbose=True,
+):
+    """
+    Featurize every unique drug and protein of a data split once into a packed store.
+
+    The SMILES strings and protein sequences of all the pair files are
+    deduplicated, then each drug is converted to a molecular graph with
+    `kale.loaddata.molecular_datasets.smiles_to_graph` (without the virtual
+    nodes, which are added when reading) and each protein is encoded with
+    `kale.prepdata.chem_transform.integer_label_protein`. Node features,
+    edges, and residue codes are concatenated into flat `.npy` arrays with
+    offset indexes, and each pair file is reduced to drug and protein indexes
+    and its label. The store is only rebuilt when the pair files change.
+
+    Parameters
+    ----------
+    data_folder : str
+        Folder of the pair files, e.g., "data/drug-target-interaction/bindingdb/cluster",
+        as CSV files or as the index of `helpers.splits.build_splits`.
+
+    store_dir : str
+        Directory of the store, created if missing.
+
+    splits : array-like of str, optional (default=("source_train", "target_train", "target_test"))
+        Names of the pair files (without the ".csv" extension) to include.
+
+    max_protein_length : int, optional (default=1200)
+        Number of residues kept from each protein sequence.
+
+    n_jobs : int or None, optional (default=None)
+        Number of processes featurizing the drugs, as in `joblib.Parallel`.
+
+    overwrite : bool, optional (default=False)
+        Whether to rebuild the store even if it is up to date.
+
+    verbose : bool, optional (default=True)
+        Whether to print the number of unique drugs and proteins.
+
+    Returns
+    -------
+    store : DTIStore
+        The memory-mapped store.
+    """
+    splits = list(splits)
+    sources = {}
+    for split in splits:
+        stat = os.stat(split_source(data_folder, split))
+        sources[split] = [stat.st_size, stat.st_mtime_ns]
+    meta = {"sources": sources, "max_protein_length": max_protein_length}
+
+    if not overwrite and _read_meta(store_dir, meta.keys()) == meta:
+        return DTIStore(store_dir)
+
+    frames = [read_split(data_folder, s) for s in splits]
+    pairs = pd.concat(frames, ignore_index=True)
+    drug_ids, smiles = pd.factorize(pairs["SMILES"])
+    protein_ids, sequences = pd.factorize(pairs["Protein"])
+    if verbose:
+        print(
+            f"{len(pairs)} pairs: {len(smiles)} unique drugs "
+            f"and {len(sequences)} unique proteins"
+        )
+
+    # Written to a temporary directory first, so a failed build keeps the old store
+    tmp_dir = store_dir.rstrip(os.sep) + ".tmp"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+
+    chunks = np.array_split(np.asarray(smiles), max(1, len(smiles) // 1000))
+    graphs = Parallel(n_jobs=n_jobs)(delayed(_featurize_drugs)(c) for c in chunks)
+    graphs = [g for chunk in graphs for g in chunk]
+    n_nodes = [len(x) for x, _, _ in graphs]
+    n_edges = [e.shape[1] for _, e, _ in graphs]
+    arrays = {
+        "drug_x": np.concatenate([x for x, _, _ in graphs]),
+        "drug_node_ptr": np.concatenate([[0], np.cumsum(n_nodes)]),
+        "drug_edge_index": np.concatenate([e for _, e, _ in graphs], axis=1),
+        "drug_edge_attr": np.concatenate([a for _, _, a in graphs]),
+        "drug_edge_ptr": np.concatenate([[0], np.cumsum(n_edges)]),
+    }
+
+    codes = [
+        integer_label_protein(s, max_protein_length)[: len(s)].astype(np.uint8)
+        for s in sequences
+    ]
+    arrays["protein_codes"] = np.concatenate(codes)
+    arrays["protein_ptr"] = np.concatenate([[0], np.cumsum([len(c) for c in codes])])
+
+    for name, array in arrays.items():
+        np.save(os.path.join(tmp_dir, f"{name}.npy"), array)
+
+    start = 0
+    for split, frame in zip(splits, frames):
+        stop = start + len(frame)
+        split_pairs = np.empty(
+            len(frame),
+            dtype=[
+                ("drug", np.int32),
+                ("protein", np.int32),
+                ("label", frame["Y"].dtype),
+            ],
+        )
+        split_pairs["drug"] = drug_ids[start:stop]
+        split_pairs["protein"] = protein_ids[start:stop]
+        split_pairs["label"] = frame["Y"].to_numpy()
+        np.save(os.path.join(tmp_dir, f"pairs_{split}.npy"), split_pairs)
+        start = stop
+
+    meta.update(n_drugs=len(smiles), n_proteins=len(sequences), splits=splits)
+    with open(os.path.join(tmp_dir, META_FILE), "w") as f:
+        json.dump(meta, f, indent=2)
+
+    shutil.rmtree(store_dir, ignore_errors=True)
+    os.replace(tmp_dir, store_dir)
+    return DTIStore(store_dir)
+
+
+class DTIStore:
+    """
+    Read-only view of a store written by `build_dti_store`.
+
+    The arrays are memory-mapped on first access in each process, so the
+    store can be passed to `DataLoader` workers without copying them: forked
+    workers share the parent's mappings, and spawned workers only receive the
+    store directory and map the same files again.
+
+    Parameters
+    ----------
+    store_dir : str
+        Directory of the store.
+    """
+
+    def __init__(self, store_dir):
+        self.store_dir = store_dir
+        self.meta = _read_meta(store_dir)
+        if self.meta is None:
+            raise FileNotFoundError(f"No DTI store found in {store_dir}.")
+        self._arrays = None
+
+    def __getstate__(self):
+        # Workers map the files themselves instead of receiving copies
+        return {**self.__dict__, "_arrays": None}
+
+    @property
+    def arrays(self):
+        """Dictionary of the memory-mapped packed arrays."""
+        if self._arrays is None:
+            self._arrays = {
+                name: np.load(
+                    os.path.join(self.store_dir, f"{name}.npy"), mmap_mode="r"
+                )
+                for name in ARRAYS
+            }
+        return self._arrays
+
+    def pairs(self, split):
+        """
+        Get the drug indexes, protein indexes, and labels of a pair file.
+
+        Parameters
+        ----------
+        split : str
+            Name of the pair file, e.g., "source_train".
+
+        Returns
+        -------
+        pairs : np.ndarray of shape (n_pairs,)
+            Structured array with the fields "drug", "protein", and "label".
+        """
+        if split not in self.meta["splits"]:
+            raise KeyError(f"Split {split} is not in the store {self.store_dir}.")
+        return np.load(os.path.join(self.store_dir, f"pairs_{split}.npy"))
+
+    def drug_graph(self, index, max_drug_nodes=290):
+        """
+        Gather the molecular graph of a drug, padded like `smiles_to_graph`.
+
+        Parameters
+        ----------
+        index : int
+            Index of the drug in the store.
+
+        max_drug_nodes : int, optional (default=290)
+            Number of nodes to pad the graph to with zero-feature virtual
+            nodes. If 0, only the atoms are kept.
+
+        Returns
+        -------
+        graph : torch_geometric.data.Data
+            Graph with the same node features, edges, and number of nodes as
+            `smiles_to_graph(smiles, max_drug_nodes)` for molecules of up to
+            `max_drug_nodes` atoms.
+        """
+        arrays = self.arrays
+        node_start, node_stop = arrays["drug_node_ptr"][index : index + 2]
+        edge_start, edge_stop = arrays["drug_edge_ptr"][index : index + 2]
+
+        n_nodes = max(int(node_stop - node_start), max_drug_nodes)
+        x = torch.zeros(n_nodes, arrays["drug_x"].shape[1])
+        x[: node_stop - node_start] = torch.from_numpy(
+            np.array(arrays["drug_x"][node_start:node_stop])
+        )
+        edge_index = torch.from_numpy(
+            arrays["drug_edge_index"][:, edge_start:edge_stop].astype(np.int64)
+        )
+        edge_attr = torch.from_numpy(
+            np.array(arrays["drug_edge_attr"][edge_start:edge_stop])
+        )
+        return Data(x=x, edge_index=edge_index, edge_attr=edge_attr, num_nodes=n_nodes)
+
+    def protein(self, index):
+        """
+        Gather the encoded sequence of a protein, padded like `integer_label_protein`.
+
+        Parameters
+        ----------
+        index : int
+            Index of the protein in the store.
+
+        Returns
+        -------
+        protein : np.ndarray of shape (max_protein_length,)
+            Residue codes followed by zeros.
+        """
+        start, stop = self.arrays["protein_ptr"][index : index + 2]
+        protein = np.zeros(self.meta["max_protein_length"])
+        protein[: stop - start] = self.arrays["protein_codes"][start:stop]
+        return protein
+
+
+class PackedDTIDataset(Dataset):
+    """
+    Drug-target pairs read from a `DTIStore`, as a drop-in replacement of `DTIDataset`.
+
+    Items are gathered from the packed arrays by pair index instead of being
+    featurized from the SMILES strings and sequences, and are batched with
+    `graph_collate_func` in the same way.
+
+    Parameters
+    ----------
+    store : DTIStore
+        Store holding the featurized drugs and proteins.
+
+    split : str
+        Name of the pair file, e.g., "source_train".
+
+    max_drug_nodes : int, optional (default=290)
+        Number of nodes to pad each molecular graph to. Use 0 with
+        `helpers.batching.batch_max_collate_func`, which pads per batch, or
+        `fixed_size_collate_func`, which pads in the loader.
+    """
+
+    def __init__(self, store, split, max_drug_nodes=290):
+        self.store = store
+        self.split = split
+        self.max_drug_nodes = max_drug_nodes
+        self.pairs = store.pairs(split)
+
+    def __len__(self):
+        return len(self.pairs)
+
+    def __getitem__(self, index):
+        drug, protein, y = self.pairs[index]
+        return (
+            self.store.drug_graph(drug, self.max_drug_nodes),
+            self.store.protein(protein),
+            y,
+        )
+
+
+def get_packed_datasets(cfg, data_folder, splits=None, n_jobs=None):
+    """
+    Build or reuse the store of a data split and get a dataset per pair file.
+
+    The store is written to `cfg.DATA.STORE_DIR/cfg.DATA.DATASET/cfg.DATA.SPLIT`.
+
+    Parameters
+    ----------
+    cfg : CfgNode
+        Tutorial config, using `DATA.*`, `DRUG.MAX_NODES`, `DRUG.BUCKETING`,
+        and `PROTEIN.MAX_LENGTH`.
+
+    data_folder : str
+        Folder of the pair files, read with `helpers.splits.read_split`.
+
+    splits : list of str or None, optional (default=None)
+        Names of the pair files. If None, the files of the cross-domain or
+        in-domain task are used depending on `cfg.DA.TASK`.
+
+    n_jobs : int or None, optional (default=None)
+        Number of processes featurizing the drugs.
+
+    Returns
+    -------
+    datasets : list of PackedDTIDataset
+        One dataset per pair file, in the order of `splits`.
+    """
+    splits = SPLIT_FILES[bool(cfg.DA.TASK)] if splits is None else splits
+    store = build_dti_store(
+        data_folder,
+        os.path.join(cfg.DATA.STORE_DIR, cfg.DATA.DATASET, str(cfg.DATA.SPLIT)),
+        splits=splits,
+        max_protein_length=cfg.PROTEIN.MAX_LENGTH,
+        n_jobs=n_jobs,
+    )
+    # Graphs are padded by the collate function when batching by length
+    max_drug_nodes = 0 if cfg.DRUG.BUCKETING else cfg.DRUG.MAX_NODES
+    return [PackedDTIDataset(store, s, max_drug_nodes) for s in splits]
+
+
+def _featurize_drugs(smiles):
+    """Node features, edges, and edge features of molecular graphs without virtual nodes."""
+    graphs = []
+    for s in smiles:
+        graph = smiles_to_graph(s, max_drug_nodes=0)
+        graphs.append(
+            (
+                graph.x.numpy().astype(np.float32),
+                graph.edge_index.numpy().astype(np.int32),
+                graph.edge_attr.numpy().astype(np.float32),
+            )
+        )
+    return graphs
+
+
+def _read_meta(store_dir, keys=None):
+    meta_path = os.path.join(store_dir, META_FILE)
+    if not os.path.exists(meta_path):
+        return None
+    with open(meta_path, "r") as f:
+        meta = json.load(f)
+    return meta if keys is None else {k: meta.get(k) for k in keys}
@@ -0,0 +1,77 @@
+"""
+Build the data split of a config from a single table of drug-target interactions.
+
+The split `DATA.SPLIT` of the dataset `DATA.DATASET` is written to
+`data/drug-target-interaction/{DATA.DATASET}/{DATA.SPLIT}` as the rows of
+the table in every pair file, which the tutorial and `helpers.store` read
+in place of the CSV files of the downloaded data. With `DA.TASK: True`,
+drugs and proteins are clustered to build the cross-domain task, and
+otherwise pairs are split at random for the in-domain task. The table is
+`full.csv` of the dataset unless `--table` is given.
+
+As the index is read in place of the CSV files, the script refuses to write
+into a folder that already has pair files or an index, e.g., the downloaded
+`cluster` split of the tutorial config, unless `--overwrite` is given. Set
+`DATA.SPLIT` to a new name instead.
+
+Usage::
+
+    python make_splits.py --cfg configs/DA_cross_domain.yaml DATA.SPLIT cluster_2
+    python make_splits.py --cfg configs/DA_cross_domain.yaml --overwrite DATA.SPLIT cluster
+"""
+
+import argparse
+import os
+
+from rdkit import RDLogger
+
+from configs import get_cfg_defaults
+from helpers.splits import build_splits
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--cfg", required=True, help="YAML config of the split")
+    parser.add_argument(
+        "--table",
+        default=None,
+        help="CSV file with SMILES, Protein, and Y, by default full.csv of the dataset",
+    )
+    parser.add_argument("--data-root", default="data/drug-target-interaction")
+    parser.add_argument("--drug-threshold", type=float, default=0.5)
+    parser.add_argument("--protein-threshold", type=float, default=0.3)
+    parser.add_argument("--n-jobs", type=int, default=-1)
+    parser.add_argument(
+        "--overwrite",
+        action="store_true",
+        help="Replace the pair files or index already in the folder of the split",
+    )
+    parser.add_argument(
+        "opts",
+        nargs=argparse.REMAINDER,
+        help="Config options, e.g., DATA.SPLIT cluster_2",
+    )
+    args = parser.parse_args()
+
+    cfg = get_cfg_defaults()
+    cfg.merge_from_file(args.cfg)
+    cfg.merge_from_list(args.opts)
+    RDLogger.DisableLog("rdApp.*")
+
+    dataset_dir = os.path.join(args.data_root, cfg.DATA.DATASET)
+    data_folder = build_splits(
+        args.table or os.path.join(dataset_dir, "full.csv"),
+        dataset_dir,
+        str(cfg.DATA.SPLIT),
+        cross_domain=bool(cfg.DA.TASK),
+        drug_threshold=args.drug_threshold,
+        protein_threshold=args.protein_threshold,
+        n_jobs=args.n_jobs,
+        seed=cfg.SOLVER.SEED,
+        overwrite=args.overwrite,
+    )
+    print(f"Split written to {data_folder}")
+
+
+if __name__ == "__main__":
+    main()
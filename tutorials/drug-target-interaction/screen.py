@@ -0,0 +1,72 @@
+"""
+Screen a compound library against one or more targets with a trained DrugBAN checkpoint.
+
+Compounds are scored in large batches, the protein embedding of each target
+is computed once, and the ranked scores are written to a CSV file.
+
+Usage::
+
+    python screen.py --cfg configs/DA_cross_domain.yaml \
+        --checkpoint checkpoint/best.ckpt --library compounds.csv \
+        --targets target.fasta --output results/screening.csv
+"""
+
+import argparse
+
+import torch
+from rdkit import RDLogger
+
+from configs import get_cfg_defaults
+from helpers.screening import load_drugban, screen_library
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--cfg", required=True, help="YAML config of the checkpoint")
+    parser.add_argument("--checkpoint", required=True)
+    parser.add_argument("--library", required=True, help="CSV or .smi file")
+    parser.add_argument(
+        "--targets", required=True, nargs="+", help="FASTA file or sequences"
+    )
+    parser.add_argument("--output", default="results/screening.csv")
+    parser.add_argument("--batch-size", type=int, default=128)
+    parser.add_argument("--top-k", type=int, default=None)
+    parser.add_argument("--smiles-column", default="SMILES")
+    parser.add_argument("--id-column", default=None)
+    parser.add_argument(
+        "--unpadded",
+        action="store_true",
+        help="Leave the padding of the compounds out (faster, scores differ)",
+    )
+    parser.add_argument(
+        "opts",
+        nargs=argparse.REMAINDER,
+        help="Config options, e.g., DRUG.MAX_NODES 290",
+    )
+    args = parser.parse_args()
+
+    cfg = get_cfg_defaults()
+    cfg.merge_from_file(args.cfg)
+    cfg.merge_from_list(args.opts)
+    RDLogger.DisableLog("rdApp.*")
+
+    device = "cuda" if torch.cuda.is_available() else "cpu"
+    model = load_drugban(args.checkpoint, cfg, map_location=device)
+    screen_library(
+        model,
+        args.library,
+        args.targets[0] if len(args.targets) == 1 else args.targets,
+        args.output,
+        batch_size=args.batch_size,
+        max_drug_nodes=None if args.unpadded else cfg.DRUG.MAX_NODES,
+        max_protein_length=cfg.PROTEIN.MAX_LENGTH,
+        top_k=args.top_k,
+        num_workers=cfg.SOLVER.NUM_WORKERS,
+        smiles_column=args.smiles_column,
+        id_column=args.id_column,
+        device=device,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+"""
+Benchmark generating sweep configs with `ConfigLoader` against plain yacs.
+
+For the config module and a YAML file of every tutorial, a grid over some
+of its scalar keys is expanded into `--n-configs` variants, once the plain
+way (`get_cfg_defaults`, `merge_from_file`, and `merge_from_list` for every
+variant) and once with `ConfigLoader.expand`. A sample of the variants is
+checked to be identical in both cases.
+
+Usage (from the setup-config directory)::
+
+    python benchmarks/bench_config_loader.py --n-configs 10000
+"""
+
+import argparse
+import importlib.util
+import math
+import os
+import sys
+import time
+
+SETUP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TUTORIALS_DIR = os.path.dirname(SETUP_DIR)
+
+sys.path.insert(0, SETUP_DIR)
+
+from config_loader import ConfigLoader  # noqa: E402
+
+# Config module and YAML file of every tutorial
+CONFIGS = [
+    ("setup-config/config.py", "setup-config/configs/base.yml"),
+    (
+        "brain-disorder-diagnosis/config.py",
+        "brain-disorder-diagnosis/configs/lpgo/base.yml",
+    ),
+    (
+        "drug-target-interaction/configs.py",
+        "drug-target-interaction/configs/DA_cross_domain.yaml",
+    ),
+    (
+        "cardiac-abnormality-assessment/config_pretrain.py",
+        "cardiac-abnormality-assessment/configs/pretraining_base.yml",
+    ),
+    (
+        "cardiac-abnormality-assessment/config_finetune.py",
+        "cardiac-abnormality-assessment/configs/finetune_base.yml",
+    ),
+    (
+        "multiomics-cancer-classification/config.py",
+        "multiomics-cancer-classification/configs/BRCA.yaml",
+    ),
+]
+
+
+def import_config(path):
+    """Import a config module by path, since several share the name `config`."""
+    name = "_bench_" + path.replace("/", "_").replace("-", "_")[:-3]
+    spec = importlib.util.spec_from_file_location(
+        name, os.path.join(TUTORIALS_DIR, path)
+    )
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def make_grid(cfg, n_configs, max_keys=3):
+    """Vary up to `max_keys` scalar keys so the grid has at least `n_configs` points."""
+    leaves = []
+
+    def visit(node, prefix):
+        for key, value in node.items():
+            if hasattr(value, "items"):
+                visit(value, prefix + [key])
+            elif type(value) in (int, float, str):
+                leaves.append((".".join(prefix + [key]), value))
+
+    visit(cfg, [])
+    leaves = leaves[:max_keys]
+    size = math.ceil(n_configs ** (1 / len(leaves)))
+
+    grid = {}
+    for key, value in leaves:
+        if isinstance(value, str):
+            grid[key] = [f"{value}_{i}" for i in range(size)]
+        else:
+            grid[key] = [value + i for i in range(size)]
+    return grid
+
+
+def get(cfg, key):
+    """Value of a full key, e.g., "MODEL.NAME"."""
+    for part in key.split("."):
+        cfg = cfg[part]
+    return cfg
+
+
+def plain(get_cfg_defaults, yaml_path, overrides):
+    """Build every variant from scratch, as a sweep driver would with yacs alone."""
+    variants = []
+    for override in overrides:
+        cfg = get_cfg_defaults()
+        cfg.merge_from_file(yaml_path)
+        cfg.merge_from_list([item for pair in override.items() for item in pair])
+        cfg.freeze()
+        variants.append(cfg)
+    return variants
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--n-configs", type=int, default=10000)
+    parser.add_argument("--n-checked", type=int, default=100)
+    args = parser.parse_args()
+
+    header = (
+        f"{'config':<52}{'keys':>5}{'plain (s)':>11}{'loader (s)':>12}"
+        f"{'speedup':>9}{'configs/s':>12}"
+    )
+    print(header)
+    print("-" * len(header))
+
+    for module_path, yaml_path in CONFIGS:
+        get_cfg_defaults = import_config(module_path).get_cfg_defaults
+        yaml_path = os.path.join(TUTORIALS_DIR, yaml_path)
+
+        start = time.perf_counter()
+        loader = ConfigLoader(get_cfg_defaults)
+        grid = make_grid(loader.load(yaml_path), args.n_configs)
+        variants = loader.expand(yaml_path, grid)[: args.n_configs]
+        fast = time.perf_counter() - start
+
+        keys = list(grid)
+        overrides = [{key: get(variant, key) for key in keys} for variant in variants]
+        start = time.perf_counter()
+        expected = plain(get_cfg_defaults, yaml_path, overrides)
+        slow = time.perf_counter() - start
+
+        step = max(1, len(variants) // args.n_checked)
+        for i in range(0, len(variants), step):
+            if variants[i] != expected[i] or variants[i].dump() != expected[i].dump():
+                raise AssertionError(f"Variant {i} of {module_path} differs.")
+
+        print(
+            f"{module_path:<52}{len(keys):>5}{slow:>11.3f}{fast:>12.3f}"
+            f"{slow / fast:>9.1f}{len(variants) / fast:>12.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+"""
+Shared loader for the yacs configs of all the tutorials, with cached YAML
+parsing and copy-on-write variants for hyperparameter sweeps.
+"""
+
+import itertools
+import os
+
+from yacs.config import CfgNode, _check_and_coerce_cfg_value_type
+
+
+class ConfigLoader:
+    """Load yacs configs and derive sweep variants from them without deep copies.
+
+    The loader works with the `get_cfg_defaults` of any tutorial. Each YAML
+    file is merged into the defaults once, and the result is cached until
+    the file's modification time or size changes. Overrides are
+    copy-on-write: a variant only copies the nodes on the path to each
+    overridden key and shares every other subtree with its base. This is
+    safe because all configs returned by the loader are frozen. Call
+    `clone()` and then `defrost()` on a variant to get an independent,
+    mutable copy.
+
+    Outside this folder, add it to the import path first, e.g.,
+    `sys.path.insert(0, "../setup-config")`.
+
+    Args:
+        defaults (CfgNode or callable): Default config, or a function returning
+            it such as `get_cfg_defaults`.
+
+    Example:
+        >>> from config import get_cfg_defaults
+        >>> loader = ConfigLoader(get_cfg_defaults)
+        >>> cfg = loader.load("configs/base.yml")
+        >>> variants = loader.expand(cfg, {"MODEL.NAME": ["SVM", "MLP"]})
+    """
+
+    def __init__(self, defaults):
+        defaults = defaults() if callable(defaults) else defaults.clone()
+        defaults.freeze()
+        self.defaults = defaults
+        self._cache = {}
+
+    def load(self, path=None):
+        """Get the defaults merged with a YAML file, parsing the file only when it changed.
+
+        Args:
+            path (str or None): Path of the YAML file. If None, the defaults
+                are returned.
+
+        Returns:
+            CfgNode: The frozen merged config, shared by all callers.
+        """
+        if path is None:
+            return self.defaults
+
+        path = os.path.abspath(path)
+        stat = os.stat(path)
+        stamp = (stat.st_mtime_ns, stat.st_size)
+        cached = self._cache.get(path)
+        if cached is None or cached[0] != stamp:
+            cfg = self.defaults.clone()
+            cfg.defrost()
+            cfg.merge_from_file(path)
+            cfg.freeze()
+            self._cache[path] = cached = (stamp, cfg)
+        return cached[1]
+
+    def override(self, cfg, overrides):
+        """Derive a config with some values replaced, sharing the rest with `cfg`.
+
+        Values are checked and coerced like in `CfgNode.merge_from_list`
+        (e.g., lists become tuples where the default is a tuple). They are
+        used as given rather than decoded from strings.
+
+        Args:
+            cfg (CfgNode or str): Base config, or the path of a YAML file to load.
+            overrides (dict): New values keyed by full key (e.g., `"MODEL.NAME"`),
+                or nested dictionaries of them.
+
+        Returns:
+            CfgNode: The frozen variant.
+        """
+        cfg = self._base(cfg)
+        pairs = [
+            (keys, _coerce(cfg, keys, value)) for keys, value in _flatten(overrides)
+        ]
+        return _assign(cfg, pairs)
+
+    def expand(self, cfg, grid):
+        """Derive one config per combination of override values, in bulk.
+
+        Every distinct value is checked and coerced once for the whole grid,
+        and the variants only copy the nodes on the overridden paths.
+
+        Args:
+            cfg (CfgNode or str): Base config, or the path of a YAML file to load.
+            grid (dict or list of dict): Lists of values keyed by full key, as
+                in `sklearn.model_selection.ParameterGrid`. The combinations
+                of a list of grids are concatenated.
+
+        Returns:
+            list[CfgNode]: The frozen variants, the last key varying fastest.
+        """
+        cfg = self._base(cfg)
+        variants = []
+        for subgrid in [grid] if isinstance(grid, dict) else grid:
+            keys = [tuple(key.split(".")) for key in subgrid]
+            values = [
+                [_coerce(cfg, k, value) for value in subgrid[".".join(k)]] for k in keys
+            ]
+            variants += [
+                _assign(cfg, list(zip(keys, combination)))
+                for combination in itertools.product(*values)
+            ]
+        return variants
+
+    def _base(self, cfg):
+        """Load a path, or freeze a clone of a mutable config so it can be shared."""
+        if isinstance(cfg, str):
+            return self.load(cfg)
+        if not cfg.is_frozen():
+            cfg = cfg.clone()
+            cfg.freeze()
+        return cfg
+
+
+def _flatten(overrides, prefix=()):
+    """Yield (key path, value) pairs of possibly nested overrides."""
+    for key, value in overrides.items():
+        keys = prefix + tuple(key.split("."))
+        if isinstance(value, dict):
+            yield from _flatten(value, keys)
+        else:
+            yield keys, value
+
+
+def _coerce(cfg, keys, value):
+    """Check that a key exists and coerce its new value to the type of the old one."""
+    node = cfg
+    for i, key in enumerate(keys):
+        if not isinstance(node, CfgNode) or key not in node:
+            raise KeyError(f"Non-existent config key: {'.'.join(keys[: i + 1])}")
+        node = node[key]
+    return _check_and_coerce_cfg_value_type(value, node, keys[-1], ".".join(keys))
+
+
+def _assign(cfg, pairs):
+    """Copy the nodes on the paths of the keys and set the values."""
+    root = _shallow_copy(cfg)
+    copied = {(): root}
+    for keys, value in pairs:
+        node = root
+        for i in range(1, len(keys)):
+            path = keys[:i]
+            if path not in copied:
+                copied[path] = _shallow_copy(node[keys[i - 1]])
+                dict.__setitem__(node, keys[i - 1], copied[path])
+            node = copied[path]
+        dict.__setitem__(node, keys[-1], value)
+    return root
+
+
+def _shallow_copy(node):
+    """Copy a frozen node, sharing its children."""
+    copy = type(node).__new__(type(node))
+    dict.update(copy, node)
+    copy.__dict__.update(node.__dict__)
+    return copy